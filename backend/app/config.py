@@ -10,6 +10,69 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: str
     AWS_REGION: str = "us-east-2"
     S3_BUCKET_NAME: str
+    # Point S3 calls and presigned URLs at a stand-in such as a moto server
+    # (e.g. http://127.0.0.1:5000); empty means the regional AWS endpoint
+    S3_ENDPOINT_URL: str = ""
+    # Multipart uploads: default part size, and how old an unfinished
+    # upload must be before scripts/abort_stale_uploads.py aborts it
+    MULTIPART_PART_SIZE: int = 16 * 1024 * 1024
+    MULTIPART_MAX_AGE_SECONDS: int = 24 * 3600
+    # View URLs are signed at the start of a window this long, so the same
+    # object keeps a byte-identical URL (and browser cache entry) within it
+    VIEW_URL_BUCKET_SECONDS: int = 3600
+    VIEW_URL_CACHE_SIZE: int = 20000
+    # How long an album access decision may be reused without re-checking
+    ACCESS_CACHE_TTL_SECONDS: int = 30
+    # Trashed media and albums stay restorable this long before the purge
+    # worker deletes them for good; 0 purges on the worker's next pass,
+    # which leaves the restore endpoints nothing to restore
+    TRASH_RETENTION_SECONDS: int = 7 * 86400
+    # Image derivatives: POST /media renders at most this many at once in
+    # the API process and leaves the rest to scripts/process_derivatives.py
+    # (0 leaves them all to it); a claim older than DERIVATIVES_CLAIM_SECONDS
+    # belongs to a renderer that died and is requeued
+    DERIVATIVES_API_CONCURRENCY: int = 2
+    DERIVATIVES_CLAIM_SECONDS: int = 900
+    # Video processing (scripts/process_videos.py)
+    FFMPEG_PATH: str = "ffmpeg"
+    HLS_SEGMENT_SECONDS: int = 6
+    # A single ffmpeg run taking longer is killed and the video marked
+    # failed; a claim older than VIDEO_CLAIM_SECONDS belongs to a worker
+    # that died and is requeued
+    FFMPEG_TIMEOUT_SECONDS: float = 1800
+    VIDEO_CLAIM_SECONDS: int = 6 * 3600
+    # Signs API links used without a bearer token (HLS playlists, album
+    # ZIP downloads); falls back to SUPABASE_JWT_SECRET when empty
+    SIGNED_URL_SECRET: str = ""
+    # Upstream HTTP to PostgREST and Supabase Auth (app/utils/upstream.py).
+    # Queries are selects, counts and Auth lookups; mutations are writes
+    # and RPCs. Only queries are retried, with jittered exponential backoff
+    UPSTREAM_HTTP2: bool = True
+    UPSTREAM_MAX_CONNECTIONS: int = 50
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    UPSTREAM_KEEPALIVE_EXPIRY_SECONDS: float = 30
+    UPSTREAM_CONNECT_TIMEOUT_SECONDS: float = 3
+    UPSTREAM_POOL_TIMEOUT_SECONDS: float = 5
+    UPSTREAM_QUERY_TIMEOUT_SECONDS: float = 10
+    UPSTREAM_MUTATION_TIMEOUT_SECONDS: float = 30
+    UPSTREAM_QUERY_RETRIES: int = 2
+    UPSTREAM_RETRY_BACKOFF_SECONDS: float = 0.1
+    # This many failed calls in a row (transport errors, 502/503/504 once
+    # retries are spent; pool timeouts do not count) open an upstream's
+    # circuit: calls fail fast with 503 until a probe after the
+    # cooldown succeeds
+    UPSTREAM_BREAKER_FAILURES: int = 5
+    UPSTREAM_BREAKER_COOLDOWN_SECONDS: float = 10
+    # Per-request upstream call accounting (app/utils/request_trace.py):
+    # more round trips than the budget, or one query shape repeated this
+    # often, is logged as a warning; strict mode (for tests) fails the
+    # request instead. 0 disables a check
+    REQUEST_ROUNDTRIP_BUDGET: int = 20
+    REQUEST_REPEAT_THRESHOLD: int = 5
+    REQUEST_BUDGET_STRICT: bool = False
+    # Bearer token for the operator endpoints (/metrics, /health/auth);
+    # they answer 404 while it is empty
+    METRICS_TOKEN: str = ""
     RESEND_API_KEY: str = ""
     RESEND_FROM_EMAIL: str = "Family Album <onboarding@resend.dev>"
 
@@ -1,13 +1,35 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+import math
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+import httpx
 
 from app.config import settings
 from app.routers import albums, health, media, uploads
 from app.routers import invites
 from app.routers import family as family_router
 from app.routers import public as public_router
+from app.utils.metrics import InstrumentedThreadPool, MetricsMiddleware, instrument_anyio_limiter
+from app.utils.request_trace import RequestTraceMiddleware
+from app.utils.supabase_client import close_async_supabase_admin
+from app.utils.upstream import UpstreamUnavailable, close_async_upstream
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # asyncio.to_thread runs on this pool; it reports its saturation to /metrics
+    asyncio.get_running_loop().set_default_executor(InstrumentedThreadPool())
+    # Starlette's sync endpoints and background tasks use anyio's threads instead
+    instrument_anyio_limiter()
+    yield
+    await close_async_supabase_admin()
+    await close_async_upstream()
 
-app = FastAPI(title="Family Album API")
+
+app = FastAPI(title="Family Album API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,6 +38,26 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestTraceMiddleware)
+# Added last, so it is outermost and times CORS preflights and errors too
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable(request: Request, exc: UpstreamUnavailable):
+    # Circuit open: fail fast and tell clients when to come back
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service temporarily unavailable"},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
+
+@app.exception_handler(httpx.TransportError)
+async def upstream_unreachable(request: Request, exc: httpx.TransportError):
+    # Supabase could not be reached (connect error, timeout) after retries
+    return JSONResponse(status_code=503, content={"detail": "Service temporarily unavailable"})
+
 
 app.include_router(health.router, tags=["Health"])
 app.include_router(media.router, prefix="/media", tags=["Media"])
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, Query
+from urllib.parse import quote
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
 from app.dependencies import get_current_user
 from app.schemas.albums import (
     AlbumCreateRequest,
+    AlbumMediaAddResponse,
     AlbumMediaRequest,
     AlbumResponse,
     AlbumShareRequest,
@@ -14,16 +18,21 @@ from app.schemas.albums import (
     InviteCreateRequest,
     InviteResponse,
 )
-from app.schemas.media import MediaResponse
+from app.schemas.media import MediaPage, MediaResponse
 from app.services.album_service import (
     add_media_to_album,
+    auto_accept_pending_invites,
     create_album,
     create_folder,
     create_invite,
     delete_album,
     delete_folder,
     get_album,
+    get_album_access,
+    get_album_download_link,
+    get_album_zip_entries,
     list_album_media,
+    list_album_media_page,
     list_albums,
     list_collaborators,
     list_folders,
@@ -31,12 +40,16 @@ from app.services.album_service import (
     list_shared_albums,
     remove_collaborator,
     remove_media_from_album,
+    restore_album,
     revoke_invite,
     set_album_visibility,
     update_album,
     update_collaborator_role,
 )
-from app.utils.supabase_client import get_supabase_admin
+from app.utils.http_cache import PRIVATE_CACHE_CONTROL, album_etag, check_not_modified
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.utils.supabase_client import get_async_supabase_admin
+from app.utils.zip_stream import stream_zip
 
 router = APIRouter()
 folders_router = APIRouter()
@@ -45,192 +58,250 @@ folders_router = APIRouter()
 # ── Folders ──────────────────────────────────────────────────────────
 
 @folders_router.post("", response_model=FolderResponse, status_code=201)
-def create_folder_endpoint(
+async def create_folder_endpoint(
     body: FolderCreateRequest,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return create_folder(user_id, body, supabase)
+    supabase = get_async_supabase_admin()
+    return await create_folder(user_id, body, supabase)
 
 
 @folders_router.get("", response_model=list[FolderResponse])
-def list_folders_endpoint(
+async def list_folders_endpoint(
     parent_folder_id: str | None = Query(None),
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return list_folders(user_id, parent_folder_id, supabase)
+    supabase = get_async_supabase_admin()
+    return await list_folders(user_id, parent_folder_id, supabase)
 
 
 @folders_router.delete("/{folder_id}", status_code=204)
-def delete_folder_endpoint(
+async def delete_folder_endpoint(
     folder_id: str,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    delete_folder(user_id, folder_id, supabase)
+    supabase = get_async_supabase_admin()
+    await delete_folder(user_id, folder_id, supabase)
 
 
 # ── Albums — static paths first ──────────────────────────────────────
 
 @router.get("/shared", response_model=list[AlbumResponse])
-def list_shared_albums_endpoint(
+async def list_shared_albums_endpoint(
+    background_tasks: BackgroundTasks,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return list_shared_albums(user_id, supabase)
+    supabase = get_async_supabase_admin()
+    # Safety net for clients that never call POST /invites/auto-accept;
+    # runs after the response and at most once per user every ten minutes
+    background_tasks.add_task(auto_accept_pending_invites, user_id, supabase, False)
+    return await list_shared_albums(user_id, supabase)
 
 
 # ── Albums — CRUD ────────────────────────────────────────────────────
 
 @router.post("", response_model=AlbumResponse, status_code=201)
-def create_album_endpoint(
+async def create_album_endpoint(
     body: AlbumCreateRequest,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return create_album(user_id, body, supabase)
+    supabase = get_async_supabase_admin()
+    return await create_album(user_id, body, supabase)
 
 
 @router.get("", response_model=list[AlbumResponse])
-def list_albums_endpoint(
+async def list_albums_endpoint(
     folder_id: str | None = Query(None),
-    sort_by: str = Query("date", pattern="^(name|date)$"),
+    sort_by: str = Query("date", pattern="^(name|date|count|recent|size)$"),
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return list_albums(user_id, folder_id, sort_by, supabase)
+    supabase = get_async_supabase_admin()
+    return await list_albums(user_id, folder_id, sort_by, supabase)
 
 
 @router.get("/{album_id}", response_model=AlbumResponse)
-def get_album_endpoint(
+async def get_album_endpoint(
     album_id: str,
+    request: Request,
+    response: Response,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return get_album(user_id, album_id, supabase)
+    supabase = get_async_supabase_admin()
+    album, role = await get_album_access(user_id, album_id, supabase)
+    check_not_modified(request, response, album_etag(album, role), PRIVATE_CACHE_CONTROL)
+    return await get_album(user_id, album_id, supabase, access=(album, role))
 
 
 @router.patch("/{album_id}", response_model=AlbumResponse)
-def update_album_endpoint(
+async def update_album_endpoint(
     album_id: str,
     body: AlbumUpdateRequest,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return update_album(user_id, album_id, body, supabase)
+    supabase = get_async_supabase_admin()
+    return await update_album(user_id, album_id, body, supabase)
 
 
 @router.delete("/{album_id}", status_code=204)
-def delete_album_endpoint(
+async def delete_album_endpoint(
+    album_id: str,
+    user_id: str = Depends(get_current_user),
+):
+    supabase = get_async_supabase_admin()
+    await delete_album(user_id, album_id, supabase)
+
+
+@router.post("/{album_id}/restore", response_model=AlbumResponse)
+async def restore_album_endpoint(
     album_id: str,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    delete_album(user_id, album_id, supabase)
+    supabase = get_async_supabase_admin()
+    return await restore_album(user_id, album_id, supabase)
 
 
 # ── Sharing ───────────────────────────────────────────────────────────
 
 @router.post("/{album_id}/share", response_model=AlbumResponse)
-def set_album_visibility_endpoint(
+async def set_album_visibility_endpoint(
     album_id: str,
     body: AlbumShareRequest,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return set_album_visibility(user_id, album_id, body.visibility, supabase)
+    supabase = get_async_supabase_admin()
+    return await set_album_visibility(user_id, album_id, body.visibility, supabase)
 
 
 # ── Collaborators ─────────────────────────────────────────────────────
 
 @router.get("/{album_id}/collaborators", response_model=list[CollaboratorResponse])
-def list_collaborators_endpoint(
+async def list_collaborators_endpoint(
     album_id: str,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return list_collaborators(user_id, album_id, supabase)
+    supabase = get_async_supabase_admin()
+    return await list_collaborators(user_id, album_id, supabase)
 
 
 @router.patch("/{album_id}/collaborators/{target_user_id}", response_model=CollaboratorResponse)
-def update_collaborator_role_endpoint(
+async def update_collaborator_role_endpoint(
     album_id: str,
     target_user_id: str,
     body: CollaboratorUpdateRequest,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return update_collaborator_role(user_id, album_id, target_user_id, body.role, supabase)
+    supabase = get_async_supabase_admin()
+    return await update_collaborator_role(user_id, album_id, target_user_id, body.role, supabase)
 
 
 @router.delete("/{album_id}/collaborators/{target_user_id}", status_code=204)
-def remove_collaborator_endpoint(
+async def remove_collaborator_endpoint(
     album_id: str,
     target_user_id: str,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    remove_collaborator(user_id, album_id, target_user_id, supabase)
+    supabase = get_async_supabase_admin()
+    await remove_collaborator(user_id, album_id, target_user_id, supabase)
 
 
 # ── Invites ───────────────────────────────────────────────────────────
 
 @router.get("/{album_id}/invites", response_model=list[InviteResponse])
-def list_invites_endpoint(
+async def list_invites_endpoint(
     album_id: str,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return list_invites(user_id, album_id, supabase)
+    supabase = get_async_supabase_admin()
+    return await list_invites(user_id, album_id, supabase)
 
 
 @router.post("/{album_id}/invites", response_model=InviteResponse, status_code=201)
-def create_invite_endpoint(
+async def create_invite_endpoint(
     album_id: str,
     body: InviteCreateRequest,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return create_invite(user_id, album_id, body, supabase)
+    supabase = get_async_supabase_admin()
+    return await create_invite(user_id, album_id, body, supabase)
 
 
 @router.post("/{album_id}/invites/{invite_id}/revoke", status_code=204)
-def revoke_invite_endpoint(
+async def revoke_invite_endpoint(
     album_id: str,
     invite_id: str,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    revoke_invite(user_id, album_id, invite_id, supabase)
+    supabase = get_async_supabase_admin()
+    await revoke_invite(user_id, album_id, invite_id, supabase)
 
 
 # ── Album Media ──────────────────────────────────────────────────────
 
-@router.post("/{album_id}/media", status_code=204)
-def add_media_endpoint(
+@router.post("/{album_id}/media", response_model=AlbumMediaAddResponse)
+async def add_media_endpoint(
     album_id: str,
     body: AlbumMediaRequest,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    add_media_to_album(user_id, album_id, body, supabase)
+    supabase = get_async_supabase_admin()
+    return await add_media_to_album(user_id, album_id, body, supabase)
 
 
 @router.delete("/{album_id}/media/{media_id}", status_code=204)
-def remove_media_endpoint(
+async def remove_media_endpoint(
     album_id: str,
     media_id: str,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    remove_media_from_album(user_id, album_id, media_id, supabase)
+    supabase = get_async_supabase_admin()
+    await remove_media_from_album(user_id, album_id, media_id, supabase)
 
 
-@router.get("/{album_id}/media", response_model=list[MediaResponse])
-def list_album_media_endpoint(
+@router.get("/{album_id}/media", response_model=MediaPage | list[MediaResponse])
+async def list_album_media_endpoint(
     album_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None),
+    paginate: bool = Query(True, description="false returns the legacy unpaginated list"),
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return list_album_media(user_id, album_id, supabase)
+    supabase = get_async_supabase_admin()
+    # Also authorizes, so the listing below hits the access cache
+    album, _ = await get_album_access(user_id, album_id, supabase)
+    check_not_modified(request, response, album_etag(album, request.url.query), PRIVATE_CACHE_CONTROL)
+    if not paginate:
+        return await list_album_media(user_id, album_id, supabase)
+    return await list_album_media_page(user_id, album_id, limit, cursor, supabase)
+
+
+@router.get("/{album_id}/download")
+async def download_album(
+    album_id: str,
+    user_id: str = Depends(get_current_user),
+):
+    supabase = get_async_supabase_admin()
+    return await get_album_download_link(user_id, album_id, supabase)
+
+
+# Opened by the browser from the signed link above, so no bearer token
+@router.get("/{album_id}/download.zip")
+async def download_album_zip(
+    album_id: str,
+    user_id: str = Query(...),
+    expires: int = Query(...),
+    sig: str = Query(...),
+):
+    supabase = get_async_supabase_admin()
+    album, entries = await get_album_zip_entries(user_id, album_id, expires, sig, supabase)
+    name = album.get("name") or "album"
+    fallback = name.encode("ascii", "ignore").decode().replace('"', "") or "album"
+    return StreamingResponse(
+        stream_zip(entries),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename=\"{fallback}.zip\"; filename*=UTF-8''{quote(name)}.zip",
+            "Cache-Control": "no-store",
+        },
+    )
@@ -13,49 +13,49 @@ from app.services.album_service import (
     remove_family_member,
     update_family_member_role,
 )
-from app.utils.supabase_client import get_supabase_admin
+from app.utils.supabase_client import get_async_supabase_admin
 
 router = APIRouter()
 
 
 @router.get("", response_model=list[FamilyMemberResponse])
-def list_family_members_endpoint(user_id: str = Depends(get_current_user)):
-    supabase = get_supabase_admin()
-    return list_family_members(user_id, supabase)
+async def list_family_members_endpoint(user_id: str = Depends(get_current_user)):
+    supabase = get_async_supabase_admin()
+    return await list_family_members(user_id, supabase)
 
 
 @router.post("/invite", response_model=FamilyMemberResponse)
-def invite_family_member_endpoint(
+async def invite_family_member_endpoint(
     data: FamilyInviteRequest,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return invite_family_member(user_id, data.email, data.role, supabase)
+    supabase = get_async_supabase_admin()
+    return await invite_family_member(user_id, data.email, data.role, supabase)
 
 
 @router.patch("/{record_id}", response_model=FamilyMemberResponse)
-def update_family_member_role_endpoint(
+async def update_family_member_role_endpoint(
     record_id: str,
     data: FamilyMemberUpdateRequest,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return update_family_member_role(user_id, record_id, data.role, supabase)
+    supabase = get_async_supabase_admin()
+    return await update_family_member_role(user_id, record_id, data.role, supabase)
 
 
 @router.delete("/{record_id}", status_code=204)
-def remove_family_member_endpoint(
+async def remove_family_member_endpoint(
     record_id: str,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    remove_family_member(user_id, record_id, supabase)
+    supabase = get_async_supabase_admin()
+    await remove_family_member(user_id, record_id, supabase)
 
 
 @router.post("/invites/{token}/accept", response_model=FamilyMemberResponse)
-def accept_family_invite_endpoint(
+async def accept_family_invite_endpoint(
     token: str,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return accept_family_invite(user_id, token, supabase)
+    supabase = get_async_supabase_admin()
+    return await accept_family_invite(user_id, token, supabase)
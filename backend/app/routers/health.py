@@ -1,8 +1,39 @@
-from fastapi import APIRouter
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from app.config import settings
+from app.utils.jwt_verifier import get_jwt_verifier
 
 router = APIRouter()
 
+_operator_bearer = HTTPBearer(auto_error=False)
+
+
+async def require_metrics_token(
+    credentials: HTTPAuthorizationCredentials | None = Depends(_operator_bearer),
+) -> None:
+    """Operator endpoints expose routes and upstream state; hide them from everyone else."""
+    token = credentials.credentials if credentials else ""
+    # 404 rather than 401, so scanners cannot even tell they exist
+    if not settings.METRICS_TOKEN or not hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
 
 @router.get("/health")
-def health_check():
+async def health_check():
     return {"status": "ok"}
+
+
+@router.get("/health/auth", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+async def auth_cache_stats():
+    """JWT verifier counters, e.g. to confirm the token-cache hit rate."""
+    return get_jwt_verifier().stats()
+
+
+@router.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+async def metrics():
+    """Prometheus scrape target; scrape with `Authorization: Bearer $METRICS_TOKEN`."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
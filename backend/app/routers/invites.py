@@ -1,17 +1,26 @@
 from fastapi import APIRouter, Depends
 
 from app.dependencies import get_current_user
-from app.schemas.albums import CollaboratorResponse
-from app.services.album_service import accept_invite
-from app.utils.supabase_client import get_supabase_admin
+from app.schemas.albums import AutoAcceptResponse, CollaboratorResponse
+from app.services.album_service import accept_invite, auto_accept_pending_invites
+from app.utils.supabase_client import get_async_supabase_admin
 
 router = APIRouter()
 
 
+@router.post("/auto-accept", response_model=AutoAcceptResponse)
+async def auto_accept_invites_endpoint(
+    user_id: str = Depends(get_current_user),
+):
+    """Accept every pending invite addressed to the caller's email (call once after sign-in)."""
+    supabase = get_async_supabase_admin()
+    return await auto_accept_pending_invites(user_id, supabase)
+
+
 @router.post("/{token}/accept", response_model=CollaboratorResponse)
-def accept_invite_endpoint(
+async def accept_invite_endpoint(
     token: str,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return accept_invite(user_id, token, supabase)
+    supabase = get_async_supabase_admin()
+    return await accept_invite(user_id, token, supabase)
@@ -1,44 +1,92 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, Response
 
 from app.dependencies import get_current_user
-from app.schemas.media import MediaResponse, MediaCreateRequest
-from app.services.media_service import create_media, list_media, delete_media, get_download_url
-from app.utils.supabase_client import get_supabase_admin
+from app.schemas.media import MediaPage, MediaResponse, MediaCreateRequest
+from app.services.derivative_service import render_after_upload
+from app.services.media_service import (
+    create_media,
+    delete_media,
+    get_download_url,
+    get_hls_playlist,
+    list_media,
+    list_media_page,
+    restore_media,
+)
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.utils.supabase_client import get_async_supabase_admin, get_supabase_admin
 
 router = APIRouter()
 
 
-@router.get("", response_model=list[MediaResponse])
-def get_media(
+@router.get("", response_model=MediaPage | list[MediaResponse])
+async def get_media(
     type: str | None = Query(None, pattern="^(image|video)$"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None),
+    paginate: bool = Query(True, description="false returns the legacy unpaginated list"),
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return list_media(user_id, type, supabase)
+    supabase = get_async_supabase_admin()
+    if not paginate:
+        return await list_media(user_id, type, supabase)
+    return await list_media_page(user_id, type, limit, cursor, supabase)
 
 
 @router.post("", response_model=MediaResponse, status_code=201)
-def save_media(
+async def save_media(
     body: MediaCreateRequest,
+    background_tasks: BackgroundTasks,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return create_media(user_id, body, supabase)
+    supabase = get_async_supabase_admin()
+    record = await create_media(user_id, body, supabase)
+    if record.get("derivatives_status") == "pending":
+        # Runs in the threadpool after the response is sent, if a render
+        # slot is free; otherwise scripts/process_derivatives.py does it
+        background_tasks.add_task(render_after_upload, record["id"], get_supabase_admin())
+    return record
 
 
 @router.get("/{media_id}/download")
-def download_media(
+async def download_media(
     media_id: str,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    return get_download_url(user_id, media_id, supabase)
+    supabase = get_async_supabase_admin()
+    return await get_download_url(user_id, media_id, supabase)
+
+
+# Authorised by the signed query in hls_url rather than a bearer token:
+# video elements and native HLS players cannot send an Authorization header
+@router.get("/{media_id}/hls/{name}.m3u8")
+async def hls_playlist(
+    media_id: str,
+    name: str,
+    expires: int = Query(...),
+    sig: str = Query(...),
+):
+    supabase = get_async_supabase_admin()
+    playlist = await get_hls_playlist(media_id, name, expires, sig, supabase)
+    return Response(
+        playlist,
+        media_type="application/vnd.apple.mpegurl",
+        headers={"Cache-Control": "private, max-age=300"},
+    )
 
 
 @router.delete("/{media_id}", status_code=204)
-def remove_media(
+async def remove_media(
+    media_id: str,
+    user_id: str = Depends(get_current_user),
+):
+    supabase = get_async_supabase_admin()
+    await delete_media(user_id, media_id, supabase)
+
+
+@router.post("/{media_id}/restore", response_model=MediaResponse)
+async def restore_media_endpoint(
     media_id: str,
     user_id: str = Depends(get_current_user),
 ):
-    supabase = get_supabase_admin()
-    delete_media(user_id, media_id, supabase)
+    supabase = get_async_supabase_admin()
+    return await restore_media(user_id, media_id, supabase)
@@ -1,38 +1,58 @@
 """Public (unauthenticated) endpoints for shared albums and invite previews."""
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Request, Response
 
 from app.schemas.albums import AlbumResponse, FamilyInvitePreview, InvitePreviewResponse
-from app.schemas.media import MediaResponse
+from app.schemas.media import MediaPage, MediaResponse
 from app.services.album_service import (
     get_family_invite_preview,
     get_invite_preview,
     get_public_album,
+    get_public_album_row,
     list_public_album_media,
+    list_public_album_media_page,
 )
-from app.utils.supabase_client import get_supabase_admin
+from app.utils.http_cache import album_etag, check_not_modified, public_cache_control
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.utils.supabase_client import get_async_supabase_admin
 
 router = APIRouter()
 
 
-@router.get("/albums/{album_id}", response_model=AlbumResponse)
-def get_public_album_endpoint(album_id: str):
-    supabase = get_supabase_admin()
-    return get_public_album(album_id, supabase)
-
+# Album responses revalidate with one album read: a matching If-None-Match
+# returns 304 before any media is listed or URL presigned
 
-@router.get("/albums/{album_id}/media", response_model=list[MediaResponse])
-def list_public_album_media_endpoint(album_id: str):
-    supabase = get_supabase_admin()
-    return list_public_album_media(album_id, supabase)
+@router.get("/albums/{album_id}", response_model=AlbumResponse)
+async def get_public_album_endpoint(album_id: str, request: Request, response: Response):
+    supabase = get_async_supabase_admin()
+    album = await get_public_album_row(album_id, supabase)
+    check_not_modified(request, response, album_etag(album), public_cache_control())
+    return await get_public_album(album_id, supabase, album=album)
+
+
+@router.get("/albums/{album_id}/media", response_model=MediaPage | list[MediaResponse])
+async def list_public_album_media_endpoint(
+    album_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None),
+    paginate: bool = Query(True, description="false returns the legacy unpaginated list"),
+):
+    supabase = get_async_supabase_admin()
+    album = await get_public_album_row(album_id, supabase)
+    check_not_modified(request, response, album_etag(album, request.url.query), public_cache_control())
+    if not paginate:
+        return await list_public_album_media(album_id, supabase, album=album)
+    return await list_public_album_media_page(album_id, limit, cursor, supabase, album=album)
 
 
 @router.get("/invites/{token}", response_model=InvitePreviewResponse)
-def get_invite_preview_endpoint(token: str):
-    supabase = get_supabase_admin()
-    return get_invite_preview(token, supabase)
+async def get_invite_preview_endpoint(token: str):
+    supabase = get_async_supabase_admin()
+    return await get_invite_preview(token, supabase)
 
 
 @router.get("/family-invites/{token}", response_model=FamilyInvitePreview)
-def get_family_invite_preview_endpoint(token: str):
-    supabase = get_supabase_admin()
-    return get_family_invite_preview(token, supabase)
+async def get_family_invite_preview_endpoint(token: str):
+    supabase = get_async_supabase_admin()
+    return await get_family_invite_preview(token, supabase)
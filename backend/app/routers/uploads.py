@@ -1,16 +1,83 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
 from app.dependencies import get_current_user
-from app.schemas.media import PresignRequest, PresignResponse
-from app.utils.s3_client import generate_presigned_upload_url
+from app.schemas.media import (
+    MultipartCompleteRequest,
+    MultipartCompleteResponse,
+    MultipartCreateRequest,
+    MultipartCreateResponse,
+    MultipartPartsRequest,
+    PresignedPart,
+    PresignRequest,
+    PresignResponse,
+    UploadedPart,
+)
+from app.services.upload_service import (
+    cancel_multipart_upload,
+    finish_multipart_upload,
+    list_parts,
+    presign_parts,
+    presign_single_upload,
+    start_multipart_upload,
+)
+from app.utils.supabase_client import get_async_supabase_admin
 
 router = APIRouter()
 
 
 @router.post("/presign", response_model=PresignResponse)
-def presign_upload(
+async def presign_upload(
     body: PresignRequest,
     user_id: str = Depends(get_current_user),
 ):
-    result = generate_presigned_upload_url(user_id, body.filename, body.content_type)
-    return result
+    supabase = get_async_supabase_admin()
+    return await presign_single_upload(user_id, body, supabase)
+
+
+# ── Multipart ────────────────────────────────────────────────────────
+# create -> presign parts (in batches) -> PUT parts in parallel -> complete.
+# GET .../parts lists what S3 already has, so an interrupted upload resumes
+# by presigning only the missing part numbers.
+
+@router.post("/multipart", response_model=MultipartCreateResponse, status_code=201)
+async def create_multipart_upload_endpoint(
+    body: MultipartCreateRequest,
+    user_id: str = Depends(get_current_user),
+):
+    return await start_multipart_upload(user_id, body)
+
+
+@router.post("/multipart/{upload_id}/parts", response_model=list[PresignedPart])
+async def presign_parts_endpoint(
+    upload_id: str,
+    body: MultipartPartsRequest,
+    user_id: str = Depends(get_current_user),
+):
+    return presign_parts(user_id, body.s3_key, upload_id, body.part_numbers)
+
+
+@router.get("/multipart/{upload_id}/parts", response_model=list[UploadedPart])
+async def list_parts_endpoint(
+    upload_id: str,
+    s3_key: str = Query(...),
+    user_id: str = Depends(get_current_user),
+):
+    return await list_parts(user_id, s3_key, upload_id)
+
+
+@router.post("/multipart/{upload_id}/complete", response_model=MultipartCompleteResponse)
+async def complete_multipart_upload_endpoint(
+    upload_id: str,
+    body: MultipartCompleteRequest,
+    user_id: str = Depends(get_current_user),
+):
+    return await finish_multipart_upload(user_id, upload_id, body)
+
+
+@router.delete("/multipart/{upload_id}", status_code=204)
+async def abort_multipart_upload_endpoint(
+    upload_id: str,
+    s3_key: str = Query(...),
+    user_id: str = Depends(get_current_user),
+):
+    await cancel_multipart_upload(user_id, s3_key, upload_id)
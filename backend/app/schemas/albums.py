@@ -32,7 +32,11 @@ class AlbumResponse(BaseModel):
     name: str
     description: Optional[str] = None
     cover_url: Optional[str] = None
+    cover_thumb_url: Optional[str] = None
+    cover_preview_url: Optional[str] = None
     media_count: int = 0
+    total_bytes: int = 0
+    last_added_at: Optional[datetime] = None
     visibility: str = "private"
     my_role: Optional[str] = None  # 'owner' | 'viewer' | 'contributor'
     created_at: datetime
@@ -50,6 +54,11 @@ class AlbumMediaRequest(BaseModel):
     media_ids: list[UUID]
 
 
+class AlbumMediaAddResponse(BaseModel):
+    added: list[UUID]
+    already_present: list[UUID]
+
+
 # ── Sharing ───────────────────────────────────────────────────────────
 
 class AlbumShareRequest(BaseModel):
@@ -89,6 +98,12 @@ class InviteResponse(BaseModel):
     invite_link: str  # computed by service
 
 
+class AutoAcceptResponse(BaseModel):
+    album_invites_accepted: int
+    album_invites_expired: int
+    family_invites_accepted: int
+
+
 class InvitePreviewResponse(BaseModel):
     """Public-safe invite info — no email exposed."""
     album_id: UUID
@@ -1,19 +1,73 @@
 from datetime import datetime
-from typing import Literal
+from typing import Annotated, Literal
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+
+# Lowercase hex SHA-256 of the whole file
+Sha256Hex = Annotated[str, Field(pattern="^[0-9a-f]{64}$")]
 
 
 class PresignRequest(BaseModel):
     filename: str
     content_type: str
     type: Literal["image", "video"]
+    # Lets the server reuse an identical file already stored in the family
+    sha256: Sha256Hex | None = None
 
 
 class PresignResponse(BaseModel):
-    upload_url: str
+    # None when the content is already stored: skip the PUT and save s3_key
+    upload_url: str | None
+    s3_key: str
+    exists: bool = False
+    # Headers the PUT must send exactly as given (they are signed)
+    headers: dict[str, str] = {}
+
+
+# ── Multipart uploads ────────────────────────────────────────────────
+
+class MultipartCreateRequest(BaseModel):
+    filename: str
+    content_type: str
+    type: Literal["image", "video"]
+    size_bytes: int | None = Field(None, gt=0)  # lets the server pick the part size
+
+
+class MultipartCreateResponse(BaseModel):
+    upload_id: str
+    s3_key: str
+    part_size: int
+    part_count: int | None = None  # known when size_bytes was sent
+
+
+class MultipartPartsRequest(BaseModel):
     s3_key: str
+    part_numbers: list[int] = Field(min_length=1, max_length=1000)
+
+
+class PresignedPart(BaseModel):
+    part_number: int
+    url: str
+
+
+class UploadedPart(BaseModel):
+    part_number: int
+    etag: str
+    size: int | None = None
+
+
+class MultipartCompleteRequest(BaseModel):
+    s3_key: str
+    # Omit to complete with every part S3 has received; browsers often
+    # cannot read the ETag header of a part PUT
+    parts: list[UploadedPart] | None = None
+
+
+class MultipartCompleteResponse(BaseModel):
+    s3_key: str
+    etag: str
 
 
 class MediaCreateRequest(BaseModel):
@@ -22,6 +76,7 @@ class MediaCreateRequest(BaseModel):
     filename: str
     size_bytes: int
     content_type: str
+    sha256: Sha256Hex | None = None  # as sent to /uploads/presign
 
 
 class MediaResponse(BaseModel):
@@ -29,8 +84,18 @@ class MediaResponse(BaseModel):
     user_id: UUID
     s3_key: str
     view_url: str
+    # Downscaled WebP renditions; the original's URL until they are ready
+    thumb_url: str | None = None
+    preview_url: str | None = None
+    # Signed master playlist path, relative to the API; set once a video is packaged
+    hls_url: str | None = None
     type: Literal["image", "video"]
     filename: str | None = None
     size_bytes: int | None = None
     content_type: str | None = None
     created_at: datetime
+
+
+class MediaPage(BaseModel):
+    items: list[MediaResponse]
+    next_cursor: str | None = None  # pass back as ?cursor= for the next page
@@ -1,7 +1,8 @@
+import asyncio
 from datetime import datetime, timedelta, timezone
 import threading
+import time
 from fastapi import HTTPException, status
-import httpx
 import resend
 
 from app.schemas.albums import (
@@ -12,120 +13,92 @@ from app.schemas.albums import (
     InviteCreateRequest,
 )
 from app.config import settings
-from app.utils.s3_client import generate_presigned_view_url, delete_s3_object
-from app.utils.supabase_client import SupabaseDB
+from app.services.media_service import attach_media_urls
+from app.utils.http_cache import album_version
+from app.utils.pagination import encode_cursor, keyset_filter
+from app.utils.request_trace import paginated
+from app.utils.single_flight import single_flight
+from app.utils.supabase_client import AsyncSupabaseDB, Op
+from app.utils.ttl_cache import TTLCache
+from app.utils.url_signing import signed_query, verify_signed_query
+from app.utils.user_directory import get_user_directory
 
 
 # ── Access control helper ─────────────────────────────────────────────
 
-def _check_album_access(user_id: str, album_id: str, supabase: SupabaseDB) -> tuple[dict, str]:
+# (user_id, album_id) -> role. Only grants are cached; every write that can
+# change a grant invalidates the affected entries below.
+_access_cache = TTLCache(ttl=settings.ACCESS_CACHE_TTL_SECONDS)
+
+
+def _invalidate_access(user_id: str | None = None, album_id: str | None = None) -> None:
+    """Drop cached decisions for a user, an album, or one (user, album) pair."""
+    if user_id and album_id:
+        _access_cache.pop((user_id, album_id))
+    elif user_id:
+        _access_cache.discard_where(lambda key: key[0] == user_id)
+    elif album_id:
+        _access_cache.discard_where(lambda key: key[1] == album_id)
+
+
+async def _check_album_access(user_id: str, album_id: str, supabase: AsyncSupabaseDB) -> tuple[dict, str]:
     """Return (album, role) or raise HTTP 404/403.
 
     role is one of: 'owner' | 'contributor' | 'viewer'
     """
-    rows = supabase.select("albums", filters={"id": album_id})
+    rows = await supabase.select("albums", filters={"id": album_id, "deleted_at": None})
     if not rows:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Album not found")
     album = rows[0]
 
+    role = _access_cache.get((user_id, album_id))
+    if role is None:
+        role = await _resolve_album_role(user_id, album, supabase)
+        _access_cache.set((user_id, album_id), role)
+    return album, role
+
+
+async def _authorize_album(user_id: str, album_id: str, supabase: AsyncSupabaseDB) -> str:
+    """Return the caller's role for the album; no round trips on a cache hit."""
+    role = _access_cache.get((user_id, album_id))
+    if role is None:
+        _, role = await _check_album_access(user_id, album_id, supabase)
+    return role
+
+
+async def _resolve_album_role(user_id: str, album: dict, supabase: AsyncSupabaseDB) -> str:
     if album["user_id"] == user_id:
-        return album, "owner"
+        return "owner"
 
-    collabs = supabase.select(
+    collabs = await supabase.select(
         "album_collaborators",
-        filters={"album_id": album_id, "user_id": user_id},
+        filters={"album_id": album["id"], "user_id": user_id},
     )
     if collabs:
-        return album, collabs[0]["role"]  # 'viewer' | 'contributor'
+        return collabs[0]["role"]  # 'viewer' | 'contributor'
 
     # Check family membership — gives access to all owner's albums
-    family = supabase.select(
+    family = await supabase.select(
         "family_members",
         filters={"owner_id": album["user_id"], "member_id": user_id, "status": "accepted"},
     )
     if family:
-        return album, family[0]["role"]
+        return family[0]["role"]
 
     if album.get("visibility") == "public":
-        return album, "viewer"
+        return "viewer"
 
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
 
-def _require_owner(user_id: str, album_id: str, supabase: SupabaseDB) -> dict:
+async def _require_owner(user_id: str, album_id: str, supabase: AsyncSupabaseDB) -> dict:
     """Return album dict or raise 403/404 if caller is not the owner."""
-    rows = supabase.select("albums", filters={"id": album_id, "user_id": user_id})
+    rows = await supabase.select("albums", filters={"id": album_id, "user_id": user_id, "deleted_at": None})
     if not rows:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Album not found")
     return rows[0]
 
 
-def _get_user_email(user_id: str) -> str | None:
-    """Fetch user email from Supabase Auth admin API using service role key."""
-    try:
-        resp = httpx.get(
-            f"{settings.SUPABASE_URL}/auth/v1/admin/users/{user_id}",
-            headers={
-                "apikey": settings.SUPABASE_SERVICE_ROLE_KEY,
-                "Authorization": f"Bearer {settings.SUPABASE_SERVICE_ROLE_KEY}",
-            },
-            timeout=10,
-        )
-        resp.raise_for_status()
-        return resp.json().get("email")
-    except Exception:
-        return None
-
-
-def _auto_accept_pending_invites(user_id: str, email: str, supabase: SupabaseDB) -> None:
-    """Accept any pending, unexpired album invites and family invites matching this user's email."""
-    now = datetime.now(timezone.utc)
-
-    # Album invites
-    pending = supabase.select("album_invites", filters={"invited_email": email, "status": "pending"})
-    for invite in pending:
-        expires_at = datetime.fromisoformat(invite["expires_at"].replace("Z", "+00:00"))
-        if now > expires_at:
-            supabase.update("album_invites", values={"status": "expired"}, filters={"id": invite["id"]})
-            continue
-        album_id = invite["album_id"]
-        role = invite["role"]
-        existing = supabase.select("album_collaborators", filters={"album_id": album_id, "user_id": user_id})
-        if existing:
-            supabase.update(
-                "album_collaborators",
-                values={"role": role},
-                filters={"album_id": album_id, "user_id": user_id},
-            )
-        else:
-            supabase.insert("album_collaborators", {"album_id": album_id, "user_id": user_id, "role": role})
-        supabase.update("album_invites", values={"status": "accepted"}, filters={"id": invite["id"]})
-
-    # Family invites
-    pending_family = supabase.select("family_members", filters={"invited_email": email, "status": "pending"})
-    for fm in pending_family:
-        supabase.update(
-            "family_members",
-            values={"member_id": user_id, "status": "accepted"},
-            filters={"id": fm["id"]},
-        )
-        # Create reverse record so the original inviter can also see this user's albums
-        owner_id = fm["owner_id"]
-        existing_reverse = supabase.select(
-            "family_members",
-            filters={"owner_id": user_id, "member_id": owner_id},
-        )
-        if not existing_reverse:
-            owner_email = _get_user_email(owner_id) or ""
-            supabase.insert("family_members", {
-                "owner_id": user_id,
-                "member_id": owner_id,
-                "invited_email": owner_email,
-                "role": fm["role"],
-                "status": "accepted",
-            })
-
-
 def _send_invite_email(to_email: str, album_name: str, invite_link: str, role: str) -> None:
     """Send invite email via Resend. Silently skips if RESEND_API_KEY is not configured."""
     if not settings.RESEND_API_KEY:
@@ -160,124 +133,139 @@ def _send_invite_email(to_email: str, album_name: str, invite_link: str, role: s
 
 # ── Folders ──────────────────────────────────────────────────────────
 
-def create_folder(user_id: str, data: FolderCreateRequest, supabase: SupabaseDB) -> dict:
+async def create_folder(user_id: str, data: FolderCreateRequest, supabase: AsyncSupabaseDB) -> dict:
     row = {"user_id": user_id, "name": data.name}
     if data.parent_folder_id:
         row["parent_folder_id"] = str(data.parent_folder_id)
-    result = supabase.insert("folders", row)
+    result = await supabase.insert("folders", row)
     return result[0]
 
 
-def list_folders(
+async def list_folders(
     user_id: str,
     parent_folder_id: str | None,
-    supabase: SupabaseDB,
+    supabase: AsyncSupabaseDB,
 ) -> list[dict]:
     filters: dict = {"user_id": user_id}
     if parent_folder_id:
         filters["parent_folder_id"] = parent_folder_id
     else:
         filters["parent_folder_id"] = None
-    return supabase.select("folders", filters=filters, order="name.asc")
+    return await supabase.select("folders", filters=filters, order="name.asc")
 
 
-def delete_folder(user_id: str, folder_id: str, supabase: SupabaseDB) -> None:
-    items = supabase.select("folders", filters={"id": folder_id, "user_id": user_id})
+async def delete_folder(user_id: str, folder_id: str, supabase: AsyncSupabaseDB) -> None:
+    items = await supabase.select("folders", filters={"id": folder_id, "user_id": user_id})
     if not items:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Folder not found")
-    supabase.delete("folders", filters={"id": folder_id})
+    await supabase.delete("folders", filters={"id": folder_id})
 
 
 # ── Albums ───────────────────────────────────────────────────────────
 
-def create_album(user_id: str, data: AlbumCreateRequest, supabase: SupabaseDB) -> dict:
+# sort_by -> PostgREST order; each is served by an (user_id, ...) index on albums
+ALBUM_SORT_ORDERS = {
+    "name": "name.asc",
+    "date": "created_at.desc",
+    "count": "media_count.desc,created_at.desc",
+    "recent": "last_added_at.desc.nullslast,created_at.desc",
+    "size": "total_bytes.desc,created_at.desc",
+}
+
+# Rows per page when reading every link of an album (PostgREST max-rows is 1000)
+_KEY_PAGE_SIZE = 1000
+# ids per in.(...) filter, keeping the request URL around 10 KB
+_ID_CHUNK_SIZE = 250
+
+
+async def create_album(user_id: str, data: AlbumCreateRequest, supabase: AsyncSupabaseDB) -> dict:
     row: dict = {"user_id": user_id, "name": data.name}
     if data.folder_id:
         row["folder_id"] = str(data.folder_id)
     if data.description:
         row["description"] = data.description
-    result = supabase.insert("albums", row)
+    result = await supabase.insert("albums", row)
     record = result[0]
     record["cover_url"] = None
-    record["media_count"] = 0
     record["my_role"] = "owner"
     return record
 
 
-def list_albums(
+async def list_albums(
     user_id: str,
     folder_id: str | None,
     sort_by: str,
-    supabase: SupabaseDB,
+    supabase: AsyncSupabaseDB,
 ) -> list[dict]:
-    filters: dict = {"user_id": user_id}
+    filters: dict = {"user_id": user_id, "deleted_at": None}
     if folder_id:
         filters["folder_id"] = folder_id
 
-    order = "name.asc" if sort_by == "name" else "created_at.desc"
-    albums = supabase.select("albums", filters=filters, order=order)
+    albums = await supabase.select("albums", filters=filters, order=ALBUM_SORT_ORDERS[sort_by])
 
     for album in albums:
-        album["cover_url"] = _get_cover_url(album, supabase)
-        album["media_count"] = _get_media_count(album["id"], supabase)
         album["my_role"] = "owner"
 
-    return albums
+    return await _enrich_albums(albums, supabase)
 
 
-def list_shared_albums(user_id: str, supabase: SupabaseDB) -> list[dict]:
+async def list_shared_albums(user_id: str, supabase: AsyncSupabaseDB) -> list[dict]:
     """Return albums the caller can access as a collaborator or family member (not as owner).
-    Auto-accepts any pending email invites and family invites on first call.
+    Pending invites are not accepted here; see auto_accept_pending_invites.
     """
-    email = _get_user_email(user_id)
-    if email:
-        _auto_accept_pending_invites(user_id, email, supabase)
-
     added_ids: set[str] = set()
     albums: list[dict] = []
 
+    collabs, family_rows = await asyncio.gather(
+        supabase.select("album_collaborators", filters={"user_id": user_id}),
+        supabase.select("family_members", filters={"member_id": user_id, "status": "accepted"}),
+    )
+
     # Album-level collaborators
-    collabs = supabase.select("album_collaborators", filters={"user_id": user_id})
-    for collab in collabs:
-        rows = supabase.select("albums", filters={"id": collab["album_id"]})
-        if rows:
-            album = rows[0]
-            album["cover_url"] = _get_cover_url(album, supabase)
-            album["media_count"] = _get_media_count(album["id"], supabase)
-            album["my_role"] = collab["role"]
+    if collabs:
+        collab_roles = {c["album_id"]: c["role"] for c in collabs}
+        for album in await supabase.select("albums", filters={"id": list(collab_roles), "deleted_at": None}):
+            album["my_role"] = collab_roles[album["id"]]
             added_ids.add(album["id"])
             albums.append(album)
 
     # Family members — get all albums belonging to the owner
-    family_rows = supabase.select("family_members", filters={"member_id": user_id, "status": "accepted"})
-    for fm in family_rows:
-        owner_albums = supabase.select("albums", filters={"user_id": fm["owner_id"]})
-        for album in owner_albums:
+    if family_rows:
+        owner_roles = {fm["owner_id"]: fm["role"] for fm in family_rows}
+        for album in await supabase.select("albums", filters={"user_id": list(owner_roles), "deleted_at": None}):
             if album["id"] not in added_ids:
-                album["cover_url"] = _get_cover_url(album, supabase)
-                album["media_count"] = _get_media_count(album["id"], supabase)
-                album["my_role"] = fm["role"]
+                album["my_role"] = owner_roles[album["user_id"]]
                 added_ids.add(album["id"])
                 albums.append(album)
 
-    return albums
+    return await _enrich_albums(albums, supabase)
+
+
+async def get_album_access(user_id: str, album_id: str, supabase: AsyncSupabaseDB) -> tuple[dict, str]:
+    """(album, role) for routers that need the row before rendering, e.g. for an ETag."""
+    return await _check_album_access(user_id, album_id, supabase)
 
 
-def get_album(user_id: str, album_id: str, supabase: SupabaseDB) -> dict:
-    album, role = _check_album_access(user_id, album_id, supabase)
-    album["cover_url"] = _get_cover_url(album, supabase)
-    album["media_count"] = _get_media_count(album["id"], supabase)
+@single_flight(ignore=("supabase", "access"), version=lambda args: album_version((args["access"] or (None,))[0]))
+async def get_album(
+    user_id: str,
+    album_id: str,
+    supabase: AsyncSupabaseDB,
+    access: tuple[dict, str] | None = None,
+) -> dict:
+    """The album as the caller sees it; pass access from get_album_access to skip re-reading it."""
+    album, role = access or await _check_album_access(user_id, album_id, supabase)
     album["my_role"] = role
-    return album
+    return (await _enrich_albums([album], supabase))[0]
 
 
-def update_album(
+async def update_album(
     user_id: str,
     album_id: str,
     data: AlbumUpdateRequest,
-    supabase: SupabaseDB,
+    supabase: AsyncSupabaseDB,
 ) -> dict:
-    _require_owner(user_id, album_id, supabase)
+    await _require_owner(user_id, album_id, supabase)
 
     values = data.model_dump(exclude_none=True)
     if "folder_id" in values:
@@ -285,110 +273,171 @@ def update_album(
     if "cover_media_id" in values:
         values["cover_media_id"] = str(values["cover_media_id"])
 
-    result = supabase.update("albums", values=values, filters={"id": album_id})
+    result = await supabase.update("albums", values=values, filters={"id": album_id})
     record = result[0]
-    record["cover_url"] = _get_cover_url(record, supabase)
-    record["media_count"] = _get_media_count(album_id, supabase)
     record["my_role"] = "owner"
-    return record
+    return (await _enrich_albums([record], supabase))[0]
+
+
+async def delete_album(user_id: str, album_id: str, supabase: AsyncSupabaseDB) -> None:
+    """Move an album and every media item linked to it to the trash.
+
+    Both get the same deleted_at, which is how restore_album recognises the
+    media that went with the album. The purge worker removes S3 objects and
+    rows later.
+    """
+    await _require_owner(user_id, album_id, supabase)
+    deleted_at = datetime.now(timezone.utc).isoformat()
+
+    await supabase.update("albums", values={"deleted_at": deleted_at}, filters={"id": album_id})
+    _invalidate_access(album_id=album_id)
+
+    media_ids = await _select_album_media_ids(album_id, supabase)
+    # One update per id chunk is a batch, not an N+1
+    with paginated():
+        await asyncio.gather(*(
+            supabase.update(
+                "media",
+                values={"deleted_at": deleted_at},
+                filters={"id": media_ids[i:i + _ID_CHUNK_SIZE], "deleted_at": None},
+            )
+            for i in range(0, len(media_ids), _ID_CHUNK_SIZE)
+        ))
+
+
+async def restore_album(user_id: str, album_id: str, supabase: AsyncSupabaseDB) -> dict:
+    """Take an album, and the media trashed along with it, out of the trash."""
+    rows = await supabase.select(
+        "albums",
+        filters={"id": album_id, "user_id": user_id, "deleted_at": Op("not.is", "null")},
+    )
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Album not found in trash")
+
+    media_ids = await _select_album_media_ids(album_id, supabase)
+    with paginated():
+        await asyncio.gather(*(
+            supabase.update(
+                "media",
+                values={"deleted_at": None},
+                filters={"id": media_ids[i:i + _ID_CHUNK_SIZE], "deleted_at": rows[0]["deleted_at"]},
+            )
+            for i in range(0, len(media_ids), _ID_CHUNK_SIZE)
+        ))
+    result = await supabase.update("albums", values={"deleted_at": None}, filters={"id": album_id})
+    record = result[0]
+    record["my_role"] = "owner"
+    return (await _enrich_albums([record], supabase))[0]
 
 
-def delete_album(user_id: str, album_id: str, supabase: SupabaseDB) -> None:
-    _require_owner(user_id, album_id, supabase)
+async def _select_album_media_ids(album_id: str, supabase: AsyncSupabaseDB) -> list[str]:
+    """Every media id linked to the album, read in keyset pages.
 
-    # Delete all media linked to this album (S3 files + DB rows)
-    links = supabase.select("album_media", filters={"album_id": album_id})
-    for link in links:
-        media_rows = supabase.select("media", filters={"id": link["media_id"]})
-        if media_rows:
-            delete_s3_object(media_rows[0]["s3_key"])
-            supabase.delete("media", filters={"id": link["media_id"]})
-    supabase.delete("album_media", filters={"album_id": album_id})
-    supabase.delete("albums", filters={"id": album_id})
+    Paged so that PostgREST's max-rows cap cannot silently truncate a
+    large album.
+    """
+    media_ids: list[str] = []
+    with paginated():
+        while True:
+            filters = {"album_id": album_id}
+            if media_ids:
+                filters["media_id"] = Op("gt", media_ids[-1])
+            links = await supabase.select(
+                "album_media",
+                filters=filters,
+                order="media_id.asc",
+                columns="media_id",
+                limit=_KEY_PAGE_SIZE,
+            )
+            media_ids += [link["media_id"] for link in links]
+            if len(links) < _KEY_PAGE_SIZE:
+                return media_ids
 
 
 # ── Visibility / Sharing ─────────────────────────────────────────────
 
-def set_album_visibility(
+async def set_album_visibility(
     user_id: str,
     album_id: str,
     visibility: str,
-    supabase: SupabaseDB,
+    supabase: AsyncSupabaseDB,
 ) -> dict:
     if visibility not in ("public", "private"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="visibility must be 'public' or 'private'")
-    _require_owner(user_id, album_id, supabase)
-    result = supabase.update("albums", values={"visibility": visibility}, filters={"id": album_id})
+    await _require_owner(user_id, album_id, supabase)
+    result = await supabase.update("albums", values={"visibility": visibility}, filters={"id": album_id})
+    _invalidate_access(album_id=album_id)
     record = result[0]
-    record["cover_url"] = _get_cover_url(record, supabase)
-    record["media_count"] = _get_media_count(album_id, supabase)
     record["my_role"] = "owner"
-    return record
+    return (await _enrich_albums([record], supabase))[0]
 
 
 # ── Collaborators ─────────────────────────────────────────────────────
 
-def list_collaborators(user_id: str, album_id: str, supabase: SupabaseDB) -> list[dict]:
-    _require_owner(user_id, album_id, supabase)
-    rows = supabase.select("album_collaborators", filters={"album_id": album_id}, order="created_at.asc")
+async def list_collaborators(user_id: str, album_id: str, supabase: AsyncSupabaseDB) -> list[dict]:
+    await _require_owner(user_id, album_id, supabase)
+    rows = await supabase.select("album_collaborators", filters={"album_id": album_id}, order="created_at.asc")
+    emails = await get_user_directory().get_emails([row["user_id"] for row in rows])
     for row in rows:
-        row["email"] = _get_user_email(row["user_id"])
+        row["email"] = emails[row["user_id"]]
     return rows
 
 
-def update_collaborator_role(
+async def update_collaborator_role(
     user_id: str,
     album_id: str,
     target_user_id: str,
     role: str,
-    supabase: SupabaseDB,
+    supabase: AsyncSupabaseDB,
 ) -> dict:
     if role not in ("viewer", "contributor"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="role must be 'viewer' or 'contributor'")
-    _require_owner(user_id, album_id, supabase)
-    rows = supabase.select("album_collaborators", filters={"album_id": album_id, "user_id": target_user_id})
+    await _require_owner(user_id, album_id, supabase)
+    rows = await supabase.select("album_collaborators", filters={"album_id": album_id, "user_id": target_user_id})
     if not rows:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Collaborator not found")
-    result = supabase.update(
+    result = await supabase.update(
         "album_collaborators",
         values={"role": role},
         filters={"album_id": album_id, "user_id": target_user_id},
     )
+    _invalidate_access(user_id=target_user_id, album_id=album_id)
     return result[0]
 
 
-def remove_collaborator(
+async def remove_collaborator(
     user_id: str,
     album_id: str,
     target_user_id: str,
-    supabase: SupabaseDB,
+    supabase: AsyncSupabaseDB,
 ) -> None:
-    _require_owner(user_id, album_id, supabase)
-    supabase.delete("album_collaborators", filters={"album_id": album_id, "user_id": target_user_id})
+    await _require_owner(user_id, album_id, supabase)
+    await supabase.delete("album_collaborators", filters={"album_id": album_id, "user_id": target_user_id})
+    _invalidate_access(user_id=target_user_id, album_id=album_id)
 
 
 # ── Invites ───────────────────────────────────────────────────────────
 
-def list_invites(user_id: str, album_id: str, supabase: SupabaseDB) -> list[dict]:
-    _require_owner(user_id, album_id, supabase)
-    invites = supabase.select("album_invites", filters={"album_id": album_id}, order="created_at.desc")
+async def list_invites(user_id: str, album_id: str, supabase: AsyncSupabaseDB) -> list[dict]:
+    await _require_owner(user_id, album_id, supabase)
+    invites = await supabase.select("album_invites", filters={"album_id": album_id}, order="created_at.desc")
     for inv in invites:
         inv["invite_link"] = f"{settings.FRONTEND_URL}/invite/{inv['token']}"
     return invites
 
 
-def create_invite(
+async def create_invite(
     user_id: str,
     album_id: str,
     data: InviteCreateRequest,
-    supabase: SupabaseDB,
+    supabase: AsyncSupabaseDB,
 ) -> dict:
     if data.role not in ("viewer", "contributor"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="role must be 'viewer' or 'contributor'")
-    album = _require_owner(user_id, album_id, supabase)
+    album = await _require_owner(user_id, album_id, supabase)
 
     expires_at = (datetime.now(timezone.utc) + timedelta(days=7)).isoformat()
-    result = supabase.insert("album_invites", {
+    result = await supabase.insert("album_invites", {
         "album_id": album_id,
         "invited_email": data.email,
         "role": data.role,
@@ -407,22 +456,22 @@ def create_invite(
     return invite
 
 
-def revoke_invite(
+async def revoke_invite(
     user_id: str,
     album_id: str,
     invite_id: str,
-    supabase: SupabaseDB,
+    supabase: AsyncSupabaseDB,
 ) -> None:
-    _require_owner(user_id, album_id, supabase)
-    rows = supabase.select("album_invites", filters={"id": invite_id, "album_id": album_id})
+    await _require_owner(user_id, album_id, supabase)
+    rows = await supabase.select("album_invites", filters={"id": invite_id, "album_id": album_id})
     if not rows:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invite not found")
-    supabase.update("album_invites", values={"status": "revoked"}, filters={"id": invite_id})
+    await supabase.update("album_invites", values={"status": "revoked"}, filters={"id": invite_id})
 
 
-def get_invite_preview(token: str, supabase: SupabaseDB) -> dict:
+async def get_invite_preview(token: str, supabase: AsyncSupabaseDB) -> dict:
     """Public — returns album name + role without leaking invited_email."""
-    rows = supabase.select("album_invites", filters={"token": token})
+    rows = await supabase.select("album_invites", filters={"token": token})
     if not rows:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invite not found")
     invite = rows[0]
@@ -438,7 +487,7 @@ def get_invite_preview(token: str, supabase: SupabaseDB) -> dict:
             "expires_at": invite["expires_at"],
         }
 
-    album_rows = supabase.select("albums", filters={"id": invite["album_id"]})
+    album_rows = await supabase.select("albums", filters={"id": invite["album_id"], "deleted_at": None})
     album_name = album_rows[0]["name"] if album_rows else "Album"
 
     return {
@@ -450,8 +499,101 @@ def get_invite_preview(token: str, supabase: SupabaseDB) -> dict:
     }
 
 
-def accept_invite(user_id: str, token: str, supabase: SupabaseDB) -> dict:
-    rows = supabase.select("album_invites", filters={"token": token})
+# Users whose invites were auto-accepted recently; non-forced runs skip them
+_auto_accept_recent = TTLCache(ttl=600)
+
+
+async def auto_accept_pending_invites(
+    user_id: str,
+    supabase: AsyncSupabaseDB,
+    force: bool = True,
+) -> dict:
+    """Accept every pending, unexpired album and family invite sent to the caller's email.
+
+    Costs a fixed number of bulk reads and writes however many invites are
+    pending. Without force it is a no-op if it already ran for this user in
+    the last ten minutes, which lets read paths schedule it cheaply. Only a
+    completed run counts: after an error, or when no email could be
+    resolved, the next call tries again.
+    """
+    result = {"album_invites_accepted": 0, "album_invites_expired": 0, "family_invites_accepted": 0}
+    if not force and user_id in _auto_accept_recent:
+        return result
+
+    email = await get_user_directory().get_email(user_id)
+    if not email:
+        return result
+
+    pending, pending_family = await asyncio.gather(
+        supabase.select("album_invites", filters={"invited_email": email, "status": "pending"}),
+        supabase.select("family_members", filters={"invited_email": email, "status": "pending"}),
+    )
+
+    # Album invites
+    now = datetime.now(timezone.utc)
+    expired_ids: list[str] = []
+    accepted_ids: list[str] = []
+    album_roles: dict[str, str] = {}
+    for invite in sorted(pending, key=lambda inv: inv["created_at"]):
+        expires_at = datetime.fromisoformat(invite["expires_at"].replace("Z", "+00:00"))
+        if now > expires_at:
+            expired_ids.append(invite["id"])
+        else:
+            accepted_ids.append(invite["id"])
+            album_roles[invite["album_id"]] = invite["role"]  # newest invite per album wins
+    if expired_ids:
+        await supabase.update("album_invites", values={"status": "expired"}, filters={"id": expired_ids})
+    if album_roles:
+        await supabase.upsert(
+            "album_collaborators",
+            [{"album_id": album_id, "user_id": user_id, "role": role} for album_id, role in album_roles.items()],
+            on_conflict="album_id,user_id",
+        )
+        await supabase.update("album_invites", values={"status": "accepted"}, filters={"id": accepted_ids})
+
+    # Family invites
+    if pending_family:
+        await supabase.update(
+            "family_members",
+            values={"member_id": user_id, "status": "accepted"},
+            filters={"id": [fm["id"] for fm in pending_family]},
+        )
+        # Create reverse records so the original inviters can also see this user's albums
+        owner_roles = {fm["owner_id"]: fm["role"] for fm in pending_family}
+        existing_reverse = await supabase.select(
+            "family_members",
+            filters={"owner_id": user_id, "member_id": list(owner_roles)},
+            columns="member_id",
+        )
+        linked = {row["member_id"] for row in existing_reverse}
+        missing = [owner_id for owner_id in owner_roles if owner_id not in linked]
+        if missing:
+            owner_emails = await get_user_directory().get_emails(missing)
+            await supabase.insert("family_members", [
+                {
+                    "owner_id": user_id,
+                    "member_id": owner_id,
+                    "invited_email": owner_emails[owner_id] or "",
+                    "role": owner_roles[owner_id],
+                    "status": "accepted",
+                }
+                for owner_id in missing
+            ])
+        for owner_id in owner_roles:
+            _invalidate_access(user_id=owner_id)
+
+    if album_roles or pending_family:
+        _invalidate_access(user_id=user_id)
+
+    result["album_invites_accepted"] = len(accepted_ids)
+    result["album_invites_expired"] = len(expired_ids)
+    result["family_invites_accepted"] = len(pending_family)
+    _auto_accept_recent.set(user_id, True)
+    return result
+
+
+async def accept_invite(user_id: str, token: str, supabase: AsyncSupabaseDB) -> dict:
+    rows = await supabase.select("album_invites", filters={"token": token})
     if not rows:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invite not found")
     invite = rows[0]
@@ -460,7 +602,7 @@ def accept_invite(user_id: str, token: str, supabase: SupabaseDB) -> dict:
         raise HTTPException(status_code=status.HTTP_410_GONE, detail="Invite has been revoked")
     if invite["status"] == "accepted":
         # Idempotent — return existing collaborator row
-        collab = supabase.select("album_collaborators", filters={"album_id": invite["album_id"], "user_id": user_id})
+        collab = await supabase.select("album_collaborators", filters={"album_id": invite["album_id"], "user_id": user_id})
         if collab:
             return collab[0]
         # Invite accepted but no collaborator row (edge case) — fall through to create one
@@ -473,16 +615,16 @@ def accept_invite(user_id: str, token: str, supabase: SupabaseDB) -> dict:
     role = invite["role"]
 
     # Check if already a collaborator; if so, update role
-    existing = supabase.select("album_collaborators", filters={"album_id": album_id, "user_id": user_id})
+    existing = await supabase.select("album_collaborators", filters={"album_id": album_id, "user_id": user_id})
     if existing:
-        result = supabase.update(
+        result = await supabase.update(
             "album_collaborators",
             values={"role": role},
             filters={"album_id": album_id, "user_id": user_id},
         )
         collab = result[0]
     else:
-        result = supabase.insert("album_collaborators", {
+        result = await supabase.insert("album_collaborators", {
             "album_id": album_id,
             "user_id": user_id,
             "role": role,
@@ -490,106 +632,232 @@ def accept_invite(user_id: str, token: str, supabase: SupabaseDB) -> dict:
         collab = result[0]
 
     # Mark invite accepted
-    supabase.update("album_invites", values={"status": "accepted"}, filters={"id": invite["id"]})
+    await supabase.update("album_invites", values={"status": "accepted"}, filters={"id": invite["id"]})
+    _invalidate_access(user_id=user_id, album_id=album_id)
 
     return collab
 
 
 # ── Album Media ──────────────────────────────────────────────────────
 
-def add_media_to_album(
+async def add_media_to_album(
     user_id: str,
     album_id: str,
     data: AlbumMediaRequest,
-    supabase: SupabaseDB,
-) -> None:
-    album, role = _check_album_access(user_id, album_id, supabase)
+    supabase: AsyncSupabaseDB,
+) -> dict:
+    """Link many media items to the album in a constant number of round-trip stages.
+
+    Every id must be live media the caller owns or can see through family
+    membership; otherwise nothing is added. The insert skips links that
+    already exist, so re-adding is harmless.
+    """
+    role = await _authorize_album(user_id, album_id, supabase)
     if role == "viewer":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Viewers cannot add media")
 
-    for media_id in data.media_ids:
-        supabase.insert("album_media", {"album_id": album_id, "media_id": str(media_id)})
+    media_ids = list(dict.fromkeys(str(media_id) for media_id in data.media_ids))
+    if not media_ids:
+        return {"added": [], "already_present": []}
+
+    # Chunked to bound the URL length; the chunks run concurrently
+    with paginated():
+        chunks = await asyncio.gather(*(
+            supabase.select(
+                "media",
+                filters={"id": media_ids[i:i + _ID_CHUNK_SIZE], "deleted_at": None},
+                columns="id,user_id",
+            )
+            for i in range(0, len(media_ids), _ID_CHUNK_SIZE)
+        ))
+    owners = {row["id"]: row["user_id"] for rows in chunks for row in rows}
+    other_owners = {owner for owner in owners.values() if owner != user_id}
+    if other_owners:
+        family = await supabase.select(
+            "family_members",
+            filters={"owner_id": list(other_owners), "member_id": user_id, "status": "accepted"},
+            columns="owner_id",
+        )
+        other_owners -= {row["owner_id"] for row in family}
+    if len(owners) != len(media_ids) or other_owners:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Some media cannot be added to this album")
+
+    inserted = await supabase.upsert(
+        "album_media",
+        [{"album_id": album_id, "media_id": media_id} for media_id in media_ids],
+        on_conflict="album_id,media_id",
+        ignore_duplicates=True,
+    )
+    added = {row["media_id"] for row in inserted}
+    return {
+        "added": [media_id for media_id in media_ids if media_id in added],
+        "already_present": [media_id for media_id in media_ids if media_id not in added],
+    }
 
 
-def remove_media_from_album(
+async def remove_media_from_album(
     user_id: str,
     album_id: str,
     media_id: str,
-    supabase: SupabaseDB,
+    supabase: AsyncSupabaseDB,
 ) -> None:
-    _require_owner(user_id, album_id, supabase)
-    supabase.delete("album_media", filters={"album_id": album_id, "media_id": media_id})
+    await _require_owner(user_id, album_id, supabase)
+    await supabase.delete("album_media", filters={"album_id": album_id, "media_id": media_id})
 
 
-def list_album_media(
+async def list_album_media(
     user_id: str,
     album_id: str,
-    supabase: SupabaseDB,
+    supabase: AsyncSupabaseDB,
 ) -> list[dict]:
-    _check_album_access(user_id, album_id, supabase)
-
-    links = supabase.select("album_media", filters={"album_id": album_id}, order="added_at.desc")
-    media_items = []
-    for link in links:
-        rows = supabase.select("media", filters={"id": link["media_id"]})
-        if rows:
-            row = rows[0]
-            row["view_url"] = generate_presigned_view_url(row["s3_key"])
-            media_items.append(row)
-    return media_items
+    await _authorize_album(user_id, album_id, supabase)
+    return await _select_album_media(album_id, supabase)
+
+
+async def list_album_media_page(
+    user_id: str,
+    album_id: str,
+    limit: int,
+    cursor: str | None,
+    supabase: AsyncSupabaseDB,
+) -> dict:
+    await _authorize_album(user_id, album_id, supabase)
+    return await _select_album_media_page(album_id, limit, cursor, supabase)
+
+
+# ── ZIP download ─────────────────────────────────────────────────────
+# The archive is fetched by a plain browser download, which cannot send a
+# bearer token: the authenticated call hands out a short-lived signed link,
+# and opening it authorizes the user once more before streaming.
+
+ZIP_LINK_SECONDS = 300
+
+
+def _zip_subject(album_id: str, user_id: str) -> str:
+    return f"album-zip:{album_id}:{user_id}"
+
+
+async def get_album_download_link(user_id: str, album_id: str, supabase: AsyncSupabaseDB) -> dict:
+    await _check_album_access(user_id, album_id, supabase)
+    query = signed_query(_zip_subject(album_id, user_id), int(time.time()) + ZIP_LINK_SECONDS)
+    return {"download_url": f"/albums/{album_id}/download.zip?user_id={user_id}&{query}"}
+
+
+async def get_album_zip_entries(
+    user_id: str, album_id: str, expires: int, sig: str, supabase: AsyncSupabaseDB
+) -> tuple[dict, list[dict]]:
+    """Authorize a signed download link; returns the album and its archive entries, oldest first."""
+    if not verify_signed_query(_zip_subject(album_id, user_id), expires, sig):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired download link")
+    album, _ = await _check_album_access(user_id, album_id, supabase)
+
+    links: list[dict] = []
+    with paginated():
+        while True:
+            filters = {"album_id": album_id, "media.deleted_at": None}
+            if links:
+                filters["media_id"] = Op("gt", links[-1]["media_id"])
+            page = await supabase.select(
+                "album_media",
+                filters=filters,
+                order="media_id.asc",
+                columns="media_id,media!inner(s3_key,filename,created_at)",
+                limit=_KEY_PAGE_SIZE,
+            )
+            links += page
+            if len(page) < _KEY_PAGE_SIZE:
+                break
+
+    taken: set[str] = set()
+    entries = []
+    for media in sorted((link["media"] for link in links), key=lambda m: m["created_at"]):
+        name = media.get("filename") or media["s3_key"].rsplit("/", 1)[-1]
+        entries.append({
+            "name": _unique_entry_name(name, taken),
+            "s3_key": media["s3_key"],
+            "modified": datetime.fromisoformat(media["created_at"]),
+        })
+    return album, entries
+
+
+def _unique_entry_name(filename: str, taken: set[str]) -> str:
+    """A flat archive name: no directories, and 'a (2).jpg' for a repeated 'a.jpg'."""
+    name = filename.replace("/", "_").replace("\\", "_").lstrip(".") or "file"
+    stem, dot, ext = name.rpartition(".")
+    if not dot:
+        stem, ext = name, ""
+    n = 1
+    while name.lower() in taken:
+        n += 1
+        name = f"{stem} ({n}){dot}{ext}"
+    taken.add(name.lower())
+    return name
 
 
 # ── Public (no auth) ─────────────────────────────────────────────────
 
-def get_public_album(album_id: str, supabase: SupabaseDB) -> dict:
-    rows = supabase.select("albums", filters={"id": album_id})
+async def get_public_album_row(album_id: str, supabase: AsyncSupabaseDB) -> dict:
+    """The album row, or 404 unless it exists, is live and is public."""
+    rows = await supabase.select("albums", filters={"id": album_id, "deleted_at": None})
     if not rows or rows[0].get("visibility") != "public":
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Album not found")
-    album = rows[0]
-    album["cover_url"] = _get_cover_url(album, supabase)
-    album["media_count"] = _get_media_count(album["id"], supabase)
+    return rows[0]
+
+
+# The functions below accept the row from get_public_album_row so a caller
+# that already read it (for an ETag) does not read it again. A viral link
+# sends many identical requests at once; they share one computation, but
+# only with callers that read the same album version (see album_etag)
+
+@single_flight(ignore=("supabase", "album"), version=lambda args: album_version(args["album"]))
+async def get_public_album(album_id: str, supabase: AsyncSupabaseDB, album: dict | None = None) -> dict:
+    album = album or await get_public_album_row(album_id, supabase)
     album["my_role"] = "viewer"
-    return album
+    return (await _enrich_albums([album], supabase))[0]
 
 
-def list_public_album_media(album_id: str, supabase: SupabaseDB) -> list[dict]:
-    rows = supabase.select("albums", filters={"id": album_id})
-    if not rows or rows[0].get("visibility") != "public":
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Album not found")
+@single_flight(ignore=("supabase", "album"), version=lambda args: album_version(args["album"]))
+async def list_public_album_media(
+    album_id: str, supabase: AsyncSupabaseDB, album: dict | None = None
+) -> list[dict]:
+    if album is None:
+        await get_public_album_row(album_id, supabase)
+    return await _select_album_media(album_id, supabase)
 
-    links = supabase.select("album_media", filters={"album_id": album_id}, order="added_at.desc")
-    media_items = []
-    for link in links:
-        media_rows = supabase.select("media", filters={"id": link["media_id"]})
-        if media_rows:
-            row = media_rows[0]
-            row["view_url"] = generate_presigned_view_url(row["s3_key"])
-            media_items.append(row)
-    return media_items
+
+@single_flight(ignore=("supabase", "album"), version=lambda args: album_version(args["album"]))
+async def list_public_album_media_page(
+    album_id: str,
+    limit: int,
+    cursor: str | None,
+    supabase: AsyncSupabaseDB,
+    album: dict | None = None,
+) -> dict:
+    if album is None:
+        await get_public_album_row(album_id, supabase)
+    return await _select_album_media_page(album_id, limit, cursor, supabase)
 
 
 # ── Family Members ───────────────────────────────────────────────────
 
-def list_family_members(user_id: str, supabase: SupabaseDB) -> list[dict]:
-    rows = supabase.select("family_members", filters={"owner_id": user_id}, order="created_at.desc")
+async def list_family_members(user_id: str, supabase: AsyncSupabaseDB) -> list[dict]:
+    rows = await supabase.select("family_members", filters={"owner_id": user_id}, order="created_at.desc")
+    emails = await get_user_directory().get_emails([row["member_id"] for row in rows if row.get("member_id")])
     for row in rows:
-        if row.get("member_id"):
-            row["email"] = _get_user_email(row["member_id"])
-        else:
-            row["email"] = None
+        row["email"] = emails.get(row["member_id"]) if row.get("member_id") else None
         row["invite_link"] = f"{settings.FRONTEND_URL}/family-invite/{row['token']}"
     return rows
 
 
-def invite_family_member(
+async def invite_family_member(
     user_id: str,
     email: str,
     role: str,
-    supabase: SupabaseDB,
+    supabase: AsyncSupabaseDB,
 ) -> dict:
     if role not in ("viewer", "contributor"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="role must be 'viewer' or 'contributor'")
-    result = supabase.insert("family_members", {
+    result = await supabase.insert("family_members", {
         "owner_id": user_id,
         "invited_email": email,
         "role": role,
@@ -600,7 +868,7 @@ def invite_family_member(
     row["email"] = None
 
     # Get owner name for the email (best-effort)
-    owner_email = _get_user_email(user_id) or "Someone"
+    owner_email = await get_user_directory().get_email(user_id) or "Someone"
     threading.Thread(
         target=_send_invite_email,
         args=(email, f"{owner_email}'s Family Album", invite_link, role),
@@ -610,48 +878,52 @@ def invite_family_member(
     return row
 
 
-def update_family_member_role(
+async def update_family_member_role(
     user_id: str,
     record_id: str,
     role: str,
-    supabase: SupabaseDB,
+    supabase: AsyncSupabaseDB,
 ) -> dict:
     if role not in ("viewer", "contributor"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="role must be 'viewer' or 'contributor'")
-    rows = supabase.select("family_members", filters={"id": record_id, "owner_id": user_id})
+    rows = await supabase.select("family_members", filters={"id": record_id, "owner_id": user_id})
     if not rows:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Family member not found")
-    result = supabase.update("family_members", values={"role": role}, filters={"id": record_id})
+    result = await supabase.update("family_members", values={"role": role}, filters={"id": record_id})
+    if rows[0].get("member_id"):
+        _invalidate_access(user_id=rows[0]["member_id"])
     row = result[0]
     row["invite_link"] = f"{settings.FRONTEND_URL}/family-invite/{row['token']}"
-    row["email"] = _get_user_email(row["member_id"]) if row.get("member_id") else None
+    row["email"] = await get_user_directory().get_email(row["member_id"]) if row.get("member_id") else None
     return row
 
 
-def remove_family_member(user_id: str, record_id: str, supabase: SupabaseDB) -> None:
-    rows = supabase.select("family_members", filters={"id": record_id, "owner_id": user_id})
+async def remove_family_member(user_id: str, record_id: str, supabase: AsyncSupabaseDB) -> None:
+    rows = await supabase.select("family_members", filters={"id": record_id, "owner_id": user_id})
     if not rows:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Family member not found")
     member_id = rows[0].get("member_id")
-    supabase.delete("family_members", filters={"id": record_id})
+    await supabase.delete("family_members", filters={"id": record_id})
 
     # Also remove the reverse record to fully disconnect both directions
     if member_id:
-        reverse_rows = supabase.select(
+        reverse_rows = await supabase.select(
             "family_members",
             filters={"owner_id": member_id, "member_id": user_id},
         )
         for reverse in reverse_rows:
-            supabase.delete("family_members", filters={"id": reverse["id"]})
+            await supabase.delete("family_members", filters={"id": reverse["id"]})
+        _invalidate_access(user_id=member_id)
+        _invalidate_access(user_id=user_id)
 
 
-def get_family_invite_preview(token: str, supabase: SupabaseDB) -> dict:
+async def get_family_invite_preview(token: str, supabase: AsyncSupabaseDB) -> dict:
     """Public — returns owner display name + role without leaking invited_email."""
-    rows = supabase.select("family_members", filters={"token": token})
+    rows = await supabase.select("family_members", filters={"token": token})
     if not rows:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invite not found")
     fm = rows[0]
-    owner_email = _get_user_email(fm["owner_id"]) or "A family member"
+    owner_email = await get_user_directory().get_email(fm["owner_id"]) or "A family member"
     return {
         "owner_name": owner_email,
         "role": fm["role"],
@@ -659,8 +931,8 @@ def get_family_invite_preview(token: str, supabase: SupabaseDB) -> dict:
     }
 
 
-def accept_family_invite(user_id: str, token: str, supabase: SupabaseDB) -> dict:
-    rows = supabase.select("family_members", filters={"token": token})
+async def accept_family_invite(user_id: str, token: str, supabase: AsyncSupabaseDB) -> dict:
+    rows = await supabase.select("family_members", filters={"token": token})
     if not rows:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invite not found")
     fm = rows[0]
@@ -670,7 +942,7 @@ def accept_family_invite(user_id: str, token: str, supabase: SupabaseDB) -> dict
     if fm["status"] == "accepted":
         return fm  # idempotent
 
-    result = supabase.update(
+    result = await supabase.update(
         "family_members",
         values={"member_id": user_id, "status": "accepted"},
         filters={"id": fm["id"]},
@@ -679,41 +951,95 @@ def accept_family_invite(user_id: str, token: str, supabase: SupabaseDB) -> dict
 
     # Create reverse record so the original inviter can also see the accepter's albums
     owner_id = fm["owner_id"]
-    existing_reverse = supabase.select(
+    existing_reverse = await supabase.select(
         "family_members",
         filters={"owner_id": user_id, "member_id": owner_id},
     )
     if not existing_reverse:
-        owner_email = _get_user_email(owner_id) or ""
-        supabase.insert("family_members", {
+        owner_email = await get_user_directory().get_email(owner_id) or ""
+        await supabase.insert("family_members", {
             "owner_id": user_id,
             "member_id": owner_id,
             "invited_email": owner_email,
             "role": fm["role"],
             "status": "accepted",
         })
+    _invalidate_access(user_id=user_id)
+    _invalidate_access(user_id=owner_id)
 
     return accepted_fm
 
 
 # ── Helpers ──────────────────────────────────────────────────────────
 
-def _get_cover_url(album: dict, supabase: SupabaseDB) -> str | None:
-    cover_id = album.get("cover_media_id")
-    if cover_id:
-        rows = supabase.select("media", filters={"id": cover_id})
-        if rows:
-            return generate_presigned_view_url(rows[0]["s3_key"])
-
-    # Fallback: use first media in album
-    links = supabase.select("album_media", filters={"album_id": album["id"]}, order="added_at.asc")
-    if links:
-        rows = supabase.select("media", filters={"id": links[0]["media_id"]})
-        if rows:
-            return generate_presigned_view_url(rows[0]["s3_key"])
-    return None
-
-
-def _get_media_count(album_id: str, supabase: SupabaseDB) -> int:
-    links = supabase.select("album_media", filters={"album_id": album_id})
-    return len(links)
+async def _select_album_media(album_id: str, supabase: AsyncSupabaseDB) -> list[dict]:
+    """Return an album's media, newest link first, with view URLs attached.
+
+    Links and media rows come back in one embedded PostgREST read; the
+    inner join drops links whose media is in the trash.
+    """
+    links = await supabase.select(
+        "album_media",
+        filters={"album_id": album_id, "media.deleted_at": None},
+        order="added_at.desc",
+        columns="added_at,media!inner(*)",
+    )
+    return _link_media_with_urls(links)
+
+
+async def _select_album_media_page(
+    album_id: str,
+    limit: int,
+    cursor: str | None,
+    supabase: AsyncSupabaseDB,
+) -> dict:
+    """One keyset page of an album's media ordered by (added_at, media_id), newest first."""
+    filters: dict = {"album_id": album_id, "media.deleted_at": None}
+    if cursor:
+        filters.update(keyset_filter("added_at", "media_id", cursor))
+
+    # One extra row tells us whether another page exists
+    links = await supabase.select(
+        "album_media",
+        filters=filters,
+        order="added_at.desc,media_id.desc",
+        columns="added_at,media_id,media!inner(*)",
+        limit=limit + 1,
+    )
+    page = links[:limit]
+
+    next_cursor = None
+    if len(links) > limit:
+        next_cursor = encode_cursor(page[-1]["added_at"], page[-1]["media_id"])
+    return {"items": _link_media_with_urls(page), "next_cursor": next_cursor}
+
+
+def _link_media_with_urls(links: list[dict]) -> list[dict]:
+    media_items = [link["media"] for link in links if link.get("media")]
+    attach_media_urls(media_items)
+    return media_items
+
+
+async def _enrich_albums(albums: list[dict], supabase: AsyncSupabaseDB) -> list[dict]:
+    """Attach cover_url, cover_thumb_url and cover_preview_url to every album in place.
+
+    media_count and the effective cover are maintained on the album row by
+    triggers, so this is a single media read for the covers' keys.
+    """
+    cover_ids = {a["cover_media_id_effective"] for a in albums if a.get("cover_media_id_effective")}
+    covers: dict[str, dict] = {}
+    if cover_ids:
+        rows = await supabase.select(
+            "media",
+            filters={"id": list(cover_ids)},
+            columns="id,s3_key,thumb_key,preview_key",
+        )
+        covers = {row["id"]: row for row in rows}
+
+    attach_media_urls(list(covers.values()))
+    for album in albums:
+        cover = covers.get(album.get("cover_media_id_effective"), {})
+        album["cover_url"] = cover.get("view_url")
+        album["cover_thumb_url"] = cover.get("thumb_url")
+        album["cover_preview_url"] = cover.get("preview_url")
+    return albums
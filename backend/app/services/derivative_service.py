@@ -0,0 +1,127 @@
+"""WebP thumbnail and preview derivatives for uploaded images.
+
+Rendering is CPU-bound and blocking, so it never runs on the event loop:
+POST /media schedules render_after_upload as a background task, and
+scripts/process_derivatives.py drains anything still pending (backfill,
+uploads the API had no render slot for, or tasks lost to a restart).
+Either side claims an image by moving it to 'processing' (migration 009)
+before rendering, so the two never render the same one.
+"""
+from datetime import datetime, timedelta, timezone
+import io
+import logging
+import threading
+
+from PIL import Image, ImageOps
+
+from app.config import settings
+from app.utils.s3_client import get_s3_object_bytes, put_s3_object
+from app.utils.supabase_client import Op, SupabaseDB
+
+logger = logging.getLogger(__name__)
+
+# name -> longest edge in pixels; images are only ever scaled down
+DERIVATIVES = {"thumb": 256, "preview": 1280}
+WEBP_QUALITY = 80
+# Derivative keys embed the media id and never change, so browsers may keep them
+DERIVATIVE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Renders running in the API process; each holds a whole original in memory
+_api_render_slots = threading.BoundedSemaphore(max(settings.DERIVATIVES_API_CONCURRENCY, 1))
+
+
+def derivative_key(media: dict, name: str) -> str:
+    return f"derivatives/{media['user_id']}/{media['id']}/{name}-{DERIVATIVES[name]}.webp"
+
+
+def render_derivatives(data: bytes) -> dict[str, bytes]:
+    """Encode every entry of DERIVATIVES as WebP; returns name -> bytes."""
+    with Image.open(io.BytesIO(data)) as img:
+        # JPEGs can decode straight at a reduced scale, which is most of the cost
+        largest = max(DERIVATIVES.values())
+        img.draft("RGB", (largest, largest))
+        img = ImageOps.exif_transpose(img)
+        has_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+        img = img.convert("RGBA" if has_alpha else "RGB")
+
+        rendered = {}
+        # Largest first, so each smaller size is resampled from the previous one
+        for name, size in sorted(DERIVATIVES.items(), key=lambda item: -item[1]):
+            img.thumbnail((size, size), Image.Resampling.LANCZOS)
+            buf = io.BytesIO()
+            img.save(buf, "WEBP", quality=WEBP_QUALITY, method=4)
+            rendered[name] = buf.getvalue()
+    return rendered
+
+
+def render_after_upload(media_id: str, supabase: SupabaseDB) -> None:
+    """POST /media background task: render now if the API has a free slot.
+
+    Background tasks share the API's threadpool with every sync endpoint,
+    so an upload burst must not queue decodes there. When all
+    DERIVATIVES_API_CONCURRENCY slots are busy the image stays pending
+    for scripts/process_derivatives.py.
+    """
+    if settings.DERIVATIVES_API_CONCURRENCY <= 0 or not _api_render_slots.acquire(blocking=False):
+        return
+    try:
+        process_media_derivatives(media_id, supabase)
+    finally:
+        _api_render_slots.release()
+
+
+def process_media_derivatives(media_id: str, supabase: SupabaseDB) -> str | None:
+    """Claim one pending image, then render and store its derivatives.
+
+    Returns the new derivatives_status, or None if the row is no longer
+    pending (e.g. the worker claimed it). Images Pillow cannot decode are
+    marked 'failed' and keep being served as originals; S3 or DB errors
+    propagate and put the row back to pending for the next worker pass.
+    """
+    # Only one renderer's conditional update can match
+    claimed = supabase.update(
+        "media",
+        values={"derivatives_status": "processing", "derivatives_claimed_at": datetime.now(timezone.utc).isoformat()},
+        filters={"id": media_id, "derivatives_status": "pending", "deleted_at": None},
+    )
+    if not claimed:
+        return None
+    try:
+        return _render_claimed(claimed[0], supabase)
+    except Exception:
+        supabase.update(
+            "media",
+            values={"derivatives_status": "pending", "derivatives_claimed_at": None},
+            filters={"id": media_id, "derivatives_status": "processing"},
+        )
+        raise
+
+
+def requeue_stale_claims(supabase: SupabaseDB) -> int:
+    """Put images claimed by a renderer that died back in the queue; returns how many."""
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=settings.DERIVATIVES_CLAIM_SECONDS)).isoformat()
+    rows = supabase.update(
+        "media",
+        values={"derivatives_status": "pending", "derivatives_claimed_at": None},
+        filters={"derivatives_status": "processing", "derivatives_claimed_at": Op("lt", cutoff)},
+    )
+    return len(rows)
+
+
+def _render_claimed(media: dict, supabase: SupabaseDB) -> str:
+    media_id = media["id"]
+    original = get_s3_object_bytes(media["s3_key"])
+    try:
+        rendered = render_derivatives(original)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning("Derivatives failed for media %s: %s", media_id, e)
+        supabase.update("media", values={"derivatives_status": "failed"}, filters={"id": media_id})
+        return "failed"
+
+    values = {"derivatives_status": "ready"}
+    for name, body in rendered.items():
+        key = derivative_key(media, name)
+        put_s3_object(key, body, "image/webp", cache_control=DERIVATIVE_CACHE_CONTROL)
+        values[f"{name}_key"] = key
+    supabase.update("media", values=values, filters={"id": media_id})
+    return "ready"
@@ -1,16 +1,34 @@
+import asyncio
+from datetime import datetime, timezone
 from fastapi import HTTPException, status
 
 from app.schemas.media import MediaCreateRequest
-from app.utils.s3_client import generate_presigned_view_url, generate_presigned_download_url, delete_s3_object
-from app.utils.supabase_client import SupabaseDB
-
-
-def create_media(user_id: str, data: MediaCreateRequest, supabase: SupabaseDB) -> dict:
-    if not data.s3_key.startswith(f"family-album/{user_id}/"):
+from app.services.upload_service import verify_content_upload
+from app.utils.hls import master_playlist, playlist_query, variant_playlist, verify_playlist_query
+from app.utils.pagination import encode_cursor, keyset_filter
+from app.utils.s3_client import (
+    generate_presigned_download_url,
+    generate_presigned_view_urls,
+    is_content_key,
+)
+from app.utils.supabase_client import AsyncSupabaseDB, Op
+
+
+async def create_media(user_id: str, data: MediaCreateRequest, supabase: AsyncSupabaseDB) -> dict:
+    if data.sha256:
+        # May point at a family member's copy of the same content
+        await verify_content_upload(user_id, data.s3_key, data.sha256, supabase)
+    elif not data.s3_key.startswith(f"family-album/{user_id}/"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="S3 key does not belong to this user",
         )
+    elif is_content_key(data.s3_key):
+        # Shared content must be counted in blobs, which needs its sha256
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="sha256 is required for content-addressed keys",
+        )
 
     row = {
         "user_id": user_id,
@@ -20,46 +38,95 @@ def create_media(user_id: str, data: MediaCreateRequest, supabase: SupabaseDB) -
         "size_bytes": data.size_bytes,
         "content_type": data.content_type,
     }
-    result = supabase.insert("media", row)
+    if data.sha256:
+        # Counted in blobs.ref_count by a trigger (migration 011)
+        row["sha256"] = data.sha256
+    if data.type == "image":
+        row["derivatives_status"] = "pending"
+    else:
+        # Transcoded by scripts/process_videos.py, outside the API process
+        row["video_status"] = "pending"
+    result = await supabase.insert("media", row)
     record = result[0]
-    record["view_url"] = generate_presigned_view_url(data.s3_key)
+    attach_media_urls([record])
     return record
 
 
-def list_media(
-    user_id: str, media_type: str | None, supabase: SupabaseDB
+async def list_media(
+    user_id: str, media_type: str | None, supabase: AsyncSupabaseDB
 ) -> list[dict]:
-    filters = {"user_id": user_id}
+    filters = {"user_id": user_id, "deleted_at": None}
     if media_type in ("image", "video"):
         filters["type"] = media_type
 
-    items = supabase.select("media", filters=filters, order="created_at.desc")
+    items = await supabase.select("media", filters=filters, order="created_at.desc")
+    attach_media_urls(items)
+    return items
 
-    for item in items:
-        item["view_url"] = generate_presigned_view_url(item["s3_key"])
 
-    return items
+async def list_media_page(
+    user_id: str,
+    media_type: str | None,
+    limit: int,
+    cursor: str | None,
+    supabase: AsyncSupabaseDB,
+) -> dict:
+    """One keyset page of the caller's media, newest first, ordered by (created_at, id)."""
+    filters = {"user_id": user_id, "deleted_at": None}
+    if media_type in ("image", "video"):
+        filters["type"] = media_type
+    if cursor:
+        filters.update(keyset_filter("created_at", "id", cursor))
+
+    # One extra row tells us whether another page exists
+    rows = await supabase.select("media", filters=filters, order="created_at.desc,id.desc", limit=limit + 1)
+    items = rows[:limit]
+    attach_media_urls(items)
 
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(items[-1]["created_at"], items[-1]["id"])
+    return {"items": items, "next_cursor": next_cursor}
 
-def get_download_url(user_id: str, media_id: str, supabase: SupabaseDB) -> dict:
-    rows = supabase.select("media", filters={"id": media_id})
+
+def attach_media_urls(items: list[dict]) -> None:
+    """Set view_url, thumb_url and preview_url on media rows in place.
+
+    All URLs are signed in one batch. thumb_url and preview_url fall back to
+    the original until the row's derivatives are ready. Packaged videos also
+    get hls_url, a signed API path to their master playlist.
+    """
+    keys = []
+    for item in items:
+        keys += [item["s3_key"], item.get("thumb_key") or item["s3_key"], item.get("preview_key") or item["s3_key"]]
+    urls = iter(generate_presigned_view_urls(keys))
+    for item in items:
+        item["view_url"], item["thumb_url"], item["preview_url"] = next(urls), next(urls), next(urls)
+        if item.get("video_status") == "ready":
+            item["hls_url"] = f"/media/{item['id']}/hls/master.m3u8?{playlist_query(str(item['id']))}"
+
+
+async def get_download_url(user_id: str, media_id: str, supabase: AsyncSupabaseDB) -> dict:
+    rows = await supabase.select("media", filters={"id": media_id, "deleted_at": None})
     if not rows:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
     media = rows[0]
 
     if media["user_id"] != user_id:
         # Check family membership — member of the media owner's family
-        family = supabase.select(
+        family = await supabase.select(
             "family_members",
             filters={"owner_id": media["user_id"], "member_id": user_id, "status": "accepted"},
         )
         if not family:
             # Check album collaborator access
-            links = supabase.select("album_media", filters={"media_id": media_id})
-            has_access = any(
-                supabase.select("album_collaborators", filters={"album_id": link["album_id"], "user_id": user_id})
-                for link in links
-            )
+            links = await supabase.select("album_media", filters={"media_id": media_id}, columns="album_id")
+            has_access = bool(links) and bool(await supabase.select(
+                "album_collaborators",
+                filters={"album_id": [link["album_id"] for link in links], "user_id": user_id},
+                columns="album_id",
+                limit=1,
+            ))
             if not has_access:
                 raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
@@ -68,14 +135,59 @@ def get_download_url(user_id: str, media_id: str, supabase: SupabaseDB) -> dict:
     return {"download_url": download_url}
 
 
-def delete_media(user_id: str, media_id: str, supabase: SupabaseDB) -> None:
-    items = supabase.select("media", filters={"id": media_id, "user_id": user_id})
-    if not items:
+async def get_hls_playlist(
+    media_id: str, name: str, expires: int, sig: str, supabase: AsyncSupabaseDB
+) -> str:
+    """A master or variant playlist, authorised by the signed query from hls_url."""
+    if not verify_playlist_query(media_id, expires, sig):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired playlist URL")
+    rows = await supabase.select(
+        "media",
+        filters={"id": media_id, "video_status": "ready", "deleted_at": None},
+        columns="hls_prefix,hls_renditions",
+    )
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
+    media = rows[0]
+
+    if name == "master":
+        return master_playlist(media_id, media["hls_renditions"])
+    if name not in {r["name"] for r in media["hls_renditions"]}:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rendition not found")
+    # A cache miss reads the stored playlist from S3
+    return await asyncio.to_thread(variant_playlist, media["hls_prefix"], name)
+
+
+async def delete_media(user_id: str, media_id: str, supabase: AsyncSupabaseDB) -> None:
+    """Move media to the trash; the purge worker removes the S3 objects later.
+
+    Content shared with other media rows (same sha256) stays until the last
+    of them is purged.
+    """
+    trashed = await supabase.update(
+        "media",
+        values={"deleted_at": datetime.now(timezone.utc).isoformat()},
+        filters={"id": media_id, "user_id": user_id, "deleted_at": None},
+    )
+    if not trashed:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Media not found",
         )
 
-    record = items[0]
-    delete_s3_object(record["s3_key"])
-    supabase.delete("media", filters={"id": media_id})
+
+async def restore_media(user_id: str, media_id: str, supabase: AsyncSupabaseDB) -> dict:
+    """Take media back out of the trash; 404 once it has been purged."""
+    restored = await supabase.update(
+        "media",
+        values={"deleted_at": None},
+        filters={"id": media_id, "user_id": user_id, "deleted_at": Op("not.is", "null")},
+    )
+    if not restored:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Media not found in trash",
+        )
+    record = restored[0]
+    attach_media_urls([record])
+    return record
@@ -0,0 +1,189 @@
+"""Hard-deletes trashed media and albums once their retention has passed.
+
+Blocking, like the SupabaseDB it uses: it runs in scripts/purge_trash.py,
+never inside a request.
+"""
+from datetime import datetime, timedelta, timezone
+import logging
+import random
+import time
+
+from app.utils.s3_client import (
+    DELETE_BATCH_SIZE,
+    UPLOAD_URL_EXPIRES,
+    delete_s3_objects,
+    is_content_key,
+    list_s3_keys,
+)
+from app.utils.supabase_client import Op, SupabaseDB
+
+logger = logging.getLogger(__name__)
+
+# ids per in.(...) filter, keeping the request URL around 10 KB
+_ID_CHUNK_SIZE = 250
+# Unreferenced content is kept this long, well past the lifetime of an
+# upload URL presigned just before its last reference went away
+BLOB_RELEASE_GRACE_SECONDS = 4 * UPLOAD_URL_EXPIRES
+
+
+def purge_trash(
+    supabase: SupabaseDB,
+    retention_seconds: int,
+    batch_size: int = DELETE_BATCH_SIZE,
+    max_attempts: int = 5,
+    base_delay: float = 0.5,
+) -> dict:
+    """Drain the trash older than retention_seconds, oldest first.
+
+    Each batch of media has its objects (originals, derivatives and HLS
+    segments) removed
+    with DeleteObjects, retrying the keys S3 refuses with jittered
+    exponential backoff; only rows whose objects are all gone are
+    hard-deleted. Rows still failing after
+    max_attempts stay trashed and are retried on the next pass. Albums are
+    deleted after their media, and only once none of their media is left
+    in the trash: deleting the album drops its album_media links, so media
+    restored later would no longer be in it.
+
+    Content-addressed originals (media.sha256) are shared, so they are not
+    deleted with the row; the blob goes once its ref_count has been 0 for
+    BLOB_RELEASE_GRACE_SECONDS.
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=retention_seconds)).isoformat()
+    purged = 0
+    stuck: list[str] = []
+
+    # Anything left to skip would push the URL past _ID_CHUNK_SIZE ids;
+    # at that point S3 is clearly unhealthy, so stop until the next pass
+    while len(stuck) <= _ID_CHUNK_SIZE:
+        filters = {"deleted_at": Op("lt", cutoff)}
+        if stuck:
+            filters["id"] = Op("not.in", stuck)
+        rows = supabase.select(
+            "media",
+            filters=filters,
+            order="deleted_at.asc",
+            columns="id,s3_key,sha256,thumb_key,preview_key,hls_prefix",
+            limit=batch_size,
+        )
+        if not rows:
+            break
+
+        row_keys = {row["id"]: _object_keys(row) for row in rows}
+        failed_keys = {
+            f["s3_key"]
+            for f in _delete_objects_with_retry(
+                list(dict.fromkeys(key for keys in row_keys.values() for key in keys)), max_attempts, base_delay
+            )
+        }
+        done = [media_id for media_id, keys in row_keys.items() if failed_keys.isdisjoint(keys)]
+        stuck += [media_id for media_id, keys in row_keys.items() if not failed_keys.isdisjoint(keys)]
+        for i in range(0, len(done), _ID_CHUNK_SIZE):
+            supabase.delete("media", filters={"id": done[i:i + _ID_CHUNK_SIZE]})
+        purged += len(done)
+
+    albums = _purge_albums(supabase, cutoff)
+    blobs = _release_blobs(supabase, max_attempts, base_delay)
+    return {"media_purged": purged, "media_failed": len(stuck), "albums_purged": albums, "blobs_purged": blobs}
+
+
+def _purge_albums(supabase: SupabaseDB, cutoff: str) -> int:
+    """Delete albums trashed before cutoff that no trashed media links to any more."""
+    album_ids = [a["id"] for a in supabase.select("albums", filters={"deleted_at": Op("lt", cutoff)}, columns="id")]
+    purged = 0
+    for i in range(0, len(album_ids), _ID_CHUNK_SIZE):
+        pending = album_ids[i:i + _ID_CHUNK_SIZE]
+        # Each page drops the albums it found from the next filter, so a
+        # capped page never hides one
+        while pending:
+            links = supabase.select(
+                "album_media",
+                filters={"album_id": pending, "media.deleted_at": Op("not.is", "null")},
+                columns="album_id,media!inner(id)",
+                limit=DELETE_BATCH_SIZE,
+            )
+            kept = {link["album_id"] for link in links}
+            pending = [album_id for album_id in pending if album_id not in kept]
+            if len(links) < DELETE_BATCH_SIZE:
+                break
+        if pending:
+            # album_media goes with the album (ON DELETE CASCADE)
+            purged += len(supabase.delete("albums", filters={"id": pending, "deleted_at": Op("lt", cutoff)}))
+    return purged
+
+
+def _release_blobs(supabase: SupabaseDB, max_attempts: int, base_delay: float) -> int:
+    """Delete content nothing has referenced for the grace period; returns the number removed.
+
+    Claim, then delete the object, then the row: a new reference clears
+    the claim (migration 011), and the API refuses to reference a claimed
+    blob, so the object of a blob that is referenced again is never
+    deleted. A claim left by a failed pass is simply taken again.
+    """
+    now = datetime.now(timezone.utc)
+    claim = now.isoformat()
+    cutoff = (now - timedelta(seconds=BLOB_RELEASE_GRACE_SECONDS)).isoformat()
+    claimed = supabase.update(
+        "blobs",
+        values={"purging_at": claim},
+        filters={"ref_count": 0, "released_at": Op("lt", cutoff)},
+    )
+    removed = 0
+    keys = [b["s3_key"] for b in claimed]
+    for i in range(0, len(keys), _ID_CHUNK_SIZE):
+        still_claimed = {"s3_key": keys[i:i + _ID_CHUNK_SIZE], "purging_at": claim, "ref_count": 0}
+        # Referenced again since the claim: keep the object
+        doomed = [b["s3_key"] for b in supabase.select("blobs", filters=still_claimed, columns="s3_key")]
+        if not doomed:
+            continue
+        failed_keys = {f["s3_key"] for f in _delete_objects_with_retry(doomed, max_attempts, base_delay)}
+        deleted = [key for key in doomed if key not in failed_keys]
+        if failed_keys:
+            # Usable again until the next pass claims them
+            supabase.update(
+                "blobs",
+                values={"purging_at": None},
+                filters={"s3_key": list(failed_keys), "purging_at": claim},
+            )
+        if deleted:
+            gone = supabase.delete("blobs", filters={**still_claimed, "s3_key": deleted})
+            removed += len(gone)
+            for key in set(deleted) - {b["s3_key"] for b in gone}:
+                logger.error("Purge: blob %s was referenced while its object was being deleted", key)
+    return removed
+
+
+def _object_keys(row: dict) -> list[str]:
+    """The objects owned by a media row: original, derivatives and HLS files.
+
+    A content-addressed original is shared and released via blobs instead,
+    whatever the row's sha256 says; the key decides.
+    """
+    original = None if is_content_key(row["s3_key"]) else row["s3_key"]
+    keys = [key for key in (original, row.get("thumb_key"), row.get("preview_key")) if key]
+    if row.get("hls_prefix"):
+        keys += list_s3_keys(row["hls_prefix"])
+    return keys
+
+
+def _delete_objects_with_retry(keys: list[str], max_attempts: int, base_delay: float) -> list[dict]:
+    """DeleteObjects with retries; returns the keys that failed every attempt."""
+    pending = keys
+    failures: list[dict] = []
+    for attempt in range(max_attempts):
+        if attempt:
+            # Full jitter: uniform in [0, base * 2^attempt)
+            time.sleep(random.uniform(0, base_delay * 2 ** attempt))
+        failures = []
+        for i in range(0, len(pending), DELETE_BATCH_SIZE):
+            batch = pending[i:i + DELETE_BATCH_SIZE]
+            try:
+                failures += delete_s3_objects(batch)
+            except Exception as exc:
+                failures += [{"s3_key": key, "code": type(exc).__name__, "message": str(exc)} for key in batch]
+        if not failures:
+            return []
+        pending = [f["s3_key"] for f in failures]
+    for f in failures:
+        logger.warning("Purge: could not delete %s: %s %s", f["s3_key"], f["code"], f["message"])
+    return failures
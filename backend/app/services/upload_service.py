@@ -0,0 +1,143 @@
+import asyncio
+import math
+
+from botocore.exceptions import ClientError
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.schemas.media import MultipartCompleteRequest, MultipartCreateRequest, PresignRequest
+from app.utils.s3_client import (
+    MAX_PARTS,
+    MIN_PART_SIZE,
+    abort_multipart_upload,
+    complete_multipart_upload,
+    content_key,
+    create_multipart_upload,
+    generate_presigned_part_urls,
+    generate_presigned_upload_url,
+    get_s3_object_sha256,
+    list_uploaded_parts,
+    new_upload_key,
+    sha256_base64,
+)
+from app.utils.supabase_client import AsyncSupabaseDB, Op
+
+MIB = 1024 * 1024
+
+
+def _require_own_key(user_id: str, s3_key: str) -> None:
+    if not s3_key.startswith(f"family-album/{user_id}/"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="S3 key does not belong to this user",
+        )
+
+
+def _part_size(size_bytes: int | None) -> int:
+    """The configured part size, grown in whole MiB if the file needs more than MAX_PARTS parts."""
+    part_size = max(settings.MULTIPART_PART_SIZE, MIN_PART_SIZE)
+    if size_bytes:
+        part_size = max(part_size, math.ceil(size_bytes / MAX_PARTS / MIB) * MIB)
+    return part_size
+
+
+async def _call_s3(fn, *args):
+    """Run a blocking S3 call off the event loop, mapping unknown uploads to 404."""
+    try:
+        return await asyncio.to_thread(fn, *args)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchUpload", "NoSuchKey"):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+        raise
+
+
+# ── Content-addressed uploads ────────────────────────────────────────
+# A file sent with its SHA-256 is stored once per uploader under
+# content_key. Reuse is limited to copies the caller could already view
+# (their own, or those of a family they belong to), so a bare hash never
+# grants access to someone else's file.
+
+async def _family_blobs(user_id: str, sha256: str, supabase: AsyncSupabaseDB) -> list[dict]:
+    """Referenced copies of this content visible to the caller, their own first."""
+    family, blobs = await asyncio.gather(
+        supabase.select("family_members", filters={"member_id": user_id, "status": "accepted"}, columns="owner_id"),
+        supabase.select("blobs", filters={"sha256": sha256, "ref_count": Op("gt", 0)}, columns="s3_key,owner_id"),
+    )
+    owners = {user_id} | {f["owner_id"] for f in family}
+    return sorted((b for b in blobs if b["owner_id"] in owners), key=lambda b: b["owner_id"] != user_id)
+
+
+async def presign_single_upload(user_id: str, data: PresignRequest, supabase: AsyncSupabaseDB) -> dict:
+    if data.sha256:
+        blobs = await _family_blobs(user_id, data.sha256, supabase)
+        if blobs:
+            return {"upload_url": None, "s3_key": blobs[0]["s3_key"], "exists": True}
+    return generate_presigned_upload_url(user_id, data.filename, data.content_type, data.sha256)
+
+
+async def verify_content_upload(user_id: str, s3_key: str, sha256: str, supabase: AsyncSupabaseDB) -> None:
+    """Check that s3_key holds content with this SHA-256 and that the caller may reference it."""
+    if any(b["s3_key"] == s3_key for b in await _family_blobs(user_id, sha256, supabase)):
+        return
+    if s3_key != content_key(user_id, sha256):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="S3 key does not belong to this user",
+        )
+    # The purge worker is deleting the previous copy of this content
+    if await supabase.select("blobs", filters={"s3_key": s3_key, "purging_at": Op("not.is", "null")}, columns="s3_key"):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This file is being removed; upload it again shortly",
+        )
+    # A fresh upload: S3 verified the body against the signed checksum
+    if await asyncio.to_thread(get_s3_object_sha256, s3_key) != sha256_base64(sha256):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload missing or does not match sha256",
+        )
+
+
+async def start_multipart_upload(user_id: str, data: MultipartCreateRequest) -> dict:
+    s3_key = new_upload_key(user_id, data.filename)
+    upload_id = await _call_s3(create_multipart_upload, s3_key, data.content_type)
+    part_size = _part_size(data.size_bytes)
+    return {
+        "upload_id": upload_id,
+        "s3_key": s3_key,
+        "part_size": part_size,
+        "part_count": math.ceil(data.size_bytes / part_size) if data.size_bytes else None,
+    }
+
+
+def presign_parts(user_id: str, s3_key: str, upload_id: str, part_numbers: list[int]) -> list[dict]:
+    _require_own_key(user_id, s3_key)
+    if any(not 1 <= number <= MAX_PARTS for number in part_numbers):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Part numbers must be between 1 and {MAX_PARTS}",
+        )
+    urls = generate_presigned_part_urls(s3_key, upload_id, part_numbers)
+    return [{"part_number": number, "url": url} for number, url in zip(part_numbers, urls)]
+
+
+async def list_parts(user_id: str, s3_key: str, upload_id: str) -> list[dict]:
+    _require_own_key(user_id, s3_key)
+    return await _call_s3(list_uploaded_parts, s3_key, upload_id)
+
+
+async def finish_multipart_upload(user_id: str, upload_id: str, data: MultipartCompleteRequest) -> dict:
+    _require_own_key(user_id, data.s3_key)
+    if data.parts is not None:
+        parts = [part.model_dump() for part in data.parts]
+    else:
+        parts = await _call_s3(list_uploaded_parts, data.s3_key, upload_id)
+    if not parts:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No parts uploaded")
+    etag = await _call_s3(complete_multipart_upload, data.s3_key, upload_id, parts)
+    return {"s3_key": data.s3_key, "etag": etag}
+
+
+async def cancel_multipart_upload(user_id: str, s3_key: str, upload_id: str) -> None:
+    _require_own_key(user_id, s3_key)
+    await _call_s3(abort_multipart_upload, s3_key, upload_id)
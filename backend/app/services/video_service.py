@@ -0,0 +1,216 @@
+"""HLS packaging and poster frames for uploaded videos.
+
+Transcoding takes minutes and whole CPU cores, so unlike image derivatives
+it never runs inside the API process: POST /media only marks the row
+video_status='pending' and scripts/process_videos.py picks it up. A worker
+claims a row by moving it to 'processing' (migration 013) first, so
+concurrent workers never transcode the same video.
+
+Each video becomes a small H.264/AAC ladder (360p/720p/1080p, capped at
+the source resolution) of VOD playlists under hls/{user_id}/{media_id}/.
+Keyframes are forced on segment boundaries so players can switch
+renditions cleanly. The poster frame goes through the image derivative
+pipeline, so videos get thumb_key/preview_key like images do.
+"""
+import logging
+import os
+import re
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from app.config import settings
+from app.services.derivative_service import DERIVATIVE_CACHE_CONTROL, derivative_key, render_derivatives
+from app.utils.s3_client import download_s3_object, put_s3_object, upload_s3_file
+from app.utils.supabase_client import Op, SupabaseDB
+
+logger = logging.getLogger(__name__)
+
+# (short edge in pixels, video bitrate in bits/s), smallest first
+LADDER = [(360, 800_000), (720, 2_800_000), (1080, 5_000_000)]
+AUDIO_BITRATE = 128_000
+UPLOAD_CONCURRENCY = 8
+
+_CONTENT_TYPES = {".m3u8": "application/vnd.apple.mpegurl", ".ts": "video/mp2t"}
+_VIDEO_STREAM = re.compile(r"Stream #\d+:\d+.*?: Video: .*?(\d{2,5})x(\d{2,5})")
+_ROTATION = re.compile(r"(?:rotation of|rotate\s*:)\s*(-?[\d.]+)")
+
+
+def hls_prefix(media: dict) -> str:
+    return f"hls/{media['user_id']}/{media['id']}/"
+
+
+def _ffmpeg(*args: str) -> subprocess.CompletedProcess:
+    try:
+        return subprocess.run(
+            [settings.FFMPEG_PATH, "-hide_banner", "-nostdin", *args],
+            capture_output=True,
+            text=True,
+            timeout=settings.FFMPEG_TIMEOUT_SECONDS,
+        )
+    except subprocess.TimeoutExpired:
+        # run() has killed it; a file that hangs the decoder is as good as corrupt
+        raise ValueError(f"ffmpeg timed out after {settings.FFMPEG_TIMEOUT_SECONDS:.0f}s")
+
+
+def probe_video(path: str) -> dict:
+    """Display size and audio presence, parsed from ffmpeg's input summary.
+
+    Uses `ffmpeg -i` rather than ffprobe so the worker needs one binary.
+    """
+    stderr = _ffmpeg("-i", path).stderr
+    match = _VIDEO_STREAM.search(stderr)
+    if not match:
+        raise ValueError("no video stream")
+    width, height = int(match.group(1)), int(match.group(2))
+    # Phone footage is stored landscape with a rotation tag; ffmpeg applies
+    # it while decoding, so the output has the display orientation
+    rotation = _ROTATION.search(stderr)
+    if rotation and round(abs(float(rotation.group(1)))) % 180 == 90:
+        width, height = height, width
+    return {"width": width, "height": height, "has_audio": "Audio:" in stderr}
+
+
+def rendition_ladder(width: int, height: int) -> list[dict]:
+    """The LADDER rungs that do not upscale, scaled by the short edge."""
+    short_edge = min(width, height)
+    rungs = [rung for rung in LADDER if rung[0] <= short_edge]
+    if not rungs:
+        rungs = [(short_edge - short_edge % 2, LADDER[0][1])]
+
+    ladder = []
+    for edge, bitrate in rungs:
+        scale = edge / short_edge
+        out_w, out_h = round(width * scale / 2) * 2, round(height * scale / 2) * 2
+        ladder.append({
+            "name": f"{edge}p",
+            "width": out_w,
+            "height": out_h,
+            "bitrate": bitrate,
+        })
+    return ladder
+
+
+def encode_rendition(src: str, out_dir: str, rendition: dict, has_audio: bool) -> None:
+    name, bitrate = rendition["name"], rendition["bitrate"]
+    segment = settings.HLS_SEGMENT_SECONDS
+    args = ["-y", "-i", src, "-map", "0:v:0"]
+    if has_audio:
+        args += ["-map", "0:a:0", "-c:a", "aac", "-b:a", str(AUDIO_BITRATE), "-ac", "2"]
+    args += [
+        "-vf", f"scale={rendition['width']}:{rendition['height']},format=yuv420p",
+        "-c:v", "libx264", "-preset", "veryfast", "-profile:v", "main",
+        "-b:v", str(bitrate), "-maxrate", str(bitrate * 107 // 100), "-bufsize", str(bitrate * 2),
+        "-force_key_frames", f"expr:gte(t,n_forced*{segment})", "-sc_threshold", "0",
+        "-f", "hls", "-hls_time", str(segment), "-hls_playlist_type", "vod",
+        "-hls_segment_filename", os.path.join(out_dir, f"{name}_%04d.ts"),
+        os.path.join(out_dir, f"{name}.m3u8"),
+    ]
+    result = _ffmpeg(*args)
+    if result.returncode != 0:
+        raise ValueError(f"ffmpeg failed for {name}: {result.stderr.strip()[-500:]}")
+
+
+def extract_poster(src: str, out_path: str) -> bytes:
+    # A second in usually skips fade-ins; very short clips fall back to frame 0
+    for offset in ("1", "0"):
+        _ffmpeg("-y", "-ss", offset, "-i", src, "-frames:v", "1", "-q:v", "2", out_path)
+        if os.path.exists(out_path) and os.path.getsize(out_path):
+            with open(out_path, "rb") as f:
+                return f.read()
+    raise ValueError("could not extract a poster frame")
+
+
+def process_video(media_id: str, supabase: SupabaseDB) -> str | None:
+    """Claim one pending video, transcode it into HLS and render its poster.
+
+    Returns the new video_status, or None if the row is no longer pending
+    (e.g. another worker claimed it). Videos ffmpeg cannot decode, or that
+    make it hang, are marked 'failed' and keep playing from the original;
+    S3 or DB errors propagate and put the row back to pending.
+    """
+    # Only one worker's conditional update can match
+    claimed = supabase.update(
+        "media",
+        values={"video_status": "processing", "video_claimed_at": datetime.now(timezone.utc).isoformat()},
+        filters={"id": media_id, "video_status": "pending", "deleted_at": None},
+    )
+    if not claimed:
+        return None
+    try:
+        return _process_claimed(claimed[0], supabase)
+    except Exception:
+        supabase.update(
+            "media",
+            values={"video_status": "pending", "video_claimed_at": None},
+            filters={"id": media_id, "video_status": "processing"},
+        )
+        raise
+
+
+def requeue_stale_claims(supabase: SupabaseDB) -> int:
+    """Put videos claimed by a worker that died back in the queue; returns how many."""
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=settings.VIDEO_CLAIM_SECONDS)).isoformat()
+    rows = supabase.update(
+        "media",
+        values={"video_status": "pending", "video_claimed_at": None},
+        filters={"video_status": "processing", "video_claimed_at": Op("lt", cutoff)},
+    )
+    return len(rows)
+
+
+def _process_claimed(media: dict, supabase: SupabaseDB) -> str:
+    media_id = media["id"]
+    prefix = hls_prefix(media)
+
+    with tempfile.TemporaryDirectory(prefix="video-") as tmp:
+        src = os.path.join(tmp, "source")
+        out_dir = os.path.join(tmp, "hls")
+        os.mkdir(out_dir)
+        download_s3_object(media["s3_key"], src)
+
+        try:
+            info = probe_video(src)
+            ladder = rendition_ladder(info["width"], info["height"])
+            for rendition in ladder:
+                encode_rendition(src, out_dir, rendition, info["has_audio"])
+            poster = render_derivatives(extract_poster(src, os.path.join(tmp, "poster.jpg")))
+        except (OSError, ValueError) as e:
+            logger.warning("Video processing failed for media %s: %s", media_id, e)
+            supabase.update("media", values={"video_status": "failed"}, filters={"id": media_id})
+            return "failed"
+
+        # Playlists are uploaded with their segments; nothing points at the
+        # prefix until the row below is updated, so order does not matter
+        files = sorted(os.listdir(out_dir))
+        with ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY) as pool:
+            list(pool.map(
+                lambda filename: upload_s3_file(
+                    os.path.join(out_dir, filename),
+                    prefix + filename,
+                    _CONTENT_TYPES[os.path.splitext(filename)[1]],
+                    cache_control=DERIVATIVE_CACHE_CONTROL,
+                ),
+                files,
+            ))
+
+    values = {
+        "video_status": "ready",
+        "hls_prefix": prefix,
+        "hls_renditions": [
+            {
+                "name": r["name"],
+                "bandwidth": r["bitrate"] + (AUDIO_BITRATE if info["has_audio"] else 0),
+                "resolution": f"{r['width']}x{r['height']}",
+            }
+            for r in ladder
+        ],
+        "derivatives_status": "ready",
+    }
+    for name, body in poster.items():
+        key = derivative_key(media, name)
+        put_s3_object(key, body, "image/webp", cache_control=DERIVATIVE_CACHE_CONTROL)
+        values[f"{name}_key"] = key
+    supabase.update("media", values=values, filters={"id": media_id})
+    return "ready"
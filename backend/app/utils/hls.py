@@ -0,0 +1,62 @@
+"""HLS playlists served with signed URLs.
+
+Variant playlists live in S3 exactly as ffmpeg wrote them, with relative
+segment names. Serving one rewrites every segment name into a presigned
+URL in a single generate_presigned_view_urls pass; those are time-bucketed,
+so repeat requests within a bucket return an identical playlist.
+
+Playlist URLs themselves carry a signed query over (media_id, expires)
+instead of requiring a bearer token, so a plain <video> element can load
+them.
+"""
+import time
+
+from app.config import settings
+from app.utils.s3_client import generate_presigned_view_urls, get_s3_object_bytes
+from app.utils.single_flight import single_flight
+from app.utils.ttl_cache import TTLCache
+from app.utils.url_signing import signed_query, verify_signed_query
+
+# s3_key -> variant playlist text; written once by the worker, never changed
+_playlists = TTLCache(ttl=3600, maxsize=2000)
+
+
+def playlist_query(media_id: str) -> str:
+    """Query string authorising a media's playlists, stable within a view-URL bucket."""
+    bucket_seconds = settings.VIEW_URL_BUCKET_SECONDS
+    bucket_start = int(time.time()) // bucket_seconds * bucket_seconds
+    expires = bucket_start + 2 * bucket_seconds
+    return signed_query(media_id, expires)
+
+
+def verify_playlist_query(media_id: str, expires: int, sig: str) -> bool:
+    return verify_signed_query(media_id, expires, sig)
+
+
+def master_playlist(media_id: str, renditions: list[dict]) -> str:
+    query = playlist_query(media_id)
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-INDEPENDENT-SEGMENTS"]
+    for rendition in renditions:
+        lines.append(f"#EXT-X-STREAM-INF:BANDWIDTH={rendition['bandwidth']},RESOLUTION={rendition['resolution']}")
+        lines.append(f"{rendition['name']}.m3u8?{query}")
+    return "\n".join(lines) + "\n"
+
+
+@single_flight()
+def variant_playlist(hls_prefix: str, name: str) -> str:
+    """The stored playlist for one rendition with its segments presigned.
+
+    Blocking. Viewers starting the same video at once share one build.
+    """
+    key = f"{hls_prefix}{name}.m3u8"
+    text = _playlists.get(key)
+    if text is None:
+        text = get_s3_object_bytes(key).decode()
+        _playlists.set(key, text)
+
+    lines = text.splitlines()
+    segment_lines = [i for i, line in enumerate(lines) if line and not line.startswith("#")]
+    urls = generate_presigned_view_urls([hls_prefix + lines[i] for i in segment_lines])
+    for i, url in zip(segment_lines, urls):
+        lines[i] = url
+    return "\n".join(lines) + "\n"
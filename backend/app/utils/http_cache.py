@@ -0,0 +1,56 @@
+"""Conditional GET (ETag / 304) for album responses.
+
+Album bodies are rendered from the album row, its media and presigned
+view URLs. The first two are covered by albums.content_version (kept by
+triggers, migration 012); view URLs are byte-identical within a
+VIEW_URL_BUCKET_SECONDS bucket, so the bucket goes into the tag as well.
+That makes the ETags strong: equal tags mean equal bytes.
+"""
+import hashlib
+import time
+
+from fastapi import HTTPException, Request, Response, status
+
+from app.config import settings
+
+# Authenticated responses depend on the caller; browsers keep them but
+# must revalidate every time
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def public_cache_control() -> str:
+    """Lets a CDN absorb traffic to public albums.
+
+    Shared caches may serve a body without revalidating for s-maxage, which
+    stays below the bucket length so every URL in it is still valid.
+    """
+    shared = min(300, settings.VIEW_URL_BUCKET_SECONDS)
+    return f"public, max-age=60, s-maxage={shared}"
+
+
+def album_version(album: dict | None) -> tuple:
+    """(content_version, view-URL bucket): what a rendering depends on beyond the album id."""
+    bucket = int(time.time()) // settings.VIEW_URL_BUCKET_SECONDS
+    return (album.get("content_version") if album else None), bucket
+
+
+def album_etag(album: dict, *variant) -> str:
+    """Strong ETag for one rendering of this album version.
+
+    variant is whatever else changes the body: the caller's role, query
+    parameters.
+    """
+    raw = "|".join(str(part) for part in (album["id"], *album_version(album), *variant))
+    return f'"{hashlib.sha256(raw.encode()).hexdigest()[:32]}"'
+
+
+def check_not_modified(request: Request, response: Response, etag: str, cache_control: str) -> None:
+    """Raise 304 if If-None-Match matches etag; otherwise set the caching headers on response."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Weak comparison, as RFC 9110 prescribes for If-None-Match
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or etag in tags:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
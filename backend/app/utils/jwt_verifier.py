@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import time
+
+import jwt
+from jwt.algorithms import ECAlgorithm
+
+from app.config import settings
+from app.utils.metrics import AUTH_REQUEST_ERRORS, AUTH_REQUEST_SECONDS, observe
+from app.utils.request_trace import traced
+from app.utils.ttl_cache import TTLCache
+from app.utils.upstream import get_async_upstream
+
+JWKS_URL = f"{settings.SUPABASE_URL}/auth/v1/.well-known/jwks.json"
+
+
+class JWTVerifier:
+    """ES256 verifier for Supabase access tokens.
+
+    - Public keys are parsed once and kept per kid.
+    - A token that verified successfully is remembered (by SHA-256 digest)
+      until its exp, so repeat requests skip signature verification.
+    - An unknown kid triggers a JWKS refetch, at most once per
+      min_refresh_interval after the last successful fetch, with
+      concurrent callers sharing one fetch.
+    """
+
+    def __init__(
+        self,
+        jwks_url: str = JWKS_URL,
+        min_refresh_interval: float = 60.0,
+        max_cached_tokens: int = 10_000,
+    ):
+        self.jwks_url = jwks_url
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: dict[str, object] = {}
+        self._verified = TTLCache(ttl=0, maxsize=max_cached_tokens)
+        self._refresh_lock = asyncio.Lock()
+        self._last_refresh: float | None = None
+        self.counters = {
+            "token_cache_hits": 0,
+            "verifications": 0,
+            "jwks_refreshes": 0,
+            "failures": 0,
+        }
+
+    async def verify(self, token: str) -> str:
+        """Return the token's user id (sub) or raise."""
+        digest = hashlib.sha256(token.encode()).digest()
+        user_id = self._verified.get(digest)
+        if user_id is not None:
+            self.counters["token_cache_hits"] += 1
+            return user_id
+
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+            public_key = await self._get_key(kid)
+            self.counters["verifications"] += 1
+            payload = jwt.decode(
+                token,
+                public_key,
+                algorithms=["ES256"],
+                audience="authenticated",
+            )
+            user_id = payload.get("sub")
+            if user_id is None:
+                raise ValueError("Invalid token: missing user ID")
+        except Exception:
+            self.counters["failures"] += 1
+            raise
+
+        exp = payload.get("exp")
+        if exp is not None:
+            self._verified.set(digest, user_id, ttl=exp - time.time())
+        return user_id
+
+    async def _get_key(self, kid: str | None):
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        async with self._refresh_lock:
+            # Another request may have refreshed while we waited for the lock
+            key = self._keys.get(kid)
+            if key is not None:
+                return key
+            now = time.monotonic()
+            if self._last_refresh is None or now - self._last_refresh >= self.min_refresh_interval:
+                await self._refresh()
+                # Only a successful fetch starts the interval; after a failure the next request retries
+                self._last_refresh = now
+
+        key = self._keys.get(kid)
+        if key is None:
+            raise ValueError(f"No matching key found for kid: {kid}")
+        return key
+
+    async def _refresh(self) -> None:
+        with traced("auth", "jwks"), observe(AUTH_REQUEST_SECONDS, AUTH_REQUEST_ERRORS, operation="jwks"):
+            resp = await get_async_upstream().request("auth", "GET", self.jwks_url, query=True)
+            resp.raise_for_status()
+        self.counters["jwks_refreshes"] += 1
+        keys = {}
+        for key_data in resp.json().get("keys", []):
+            if key_data.get("kty") == "EC":
+                keys[key_data.get("kid")] = ECAlgorithm(ECAlgorithm.SHA256).from_jwk(key_data)
+        # Swap atomically; keys that disappeared from the JWKS stop verifying
+        self._keys = keys
+        self._verified.clear()
+
+    def stats(self) -> dict:
+        lookups = self.counters["token_cache_hits"] + self.counters["verifications"]
+        return {
+            **self.counters,
+            "cached_tokens": len(self._verified),
+            "known_kids": len(self._keys),
+            "hit_rate": self.counters["token_cache_hits"] / lookups if lookups else 0.0,
+        }
+
+
+_verifier: JWTVerifier | None = None
+
+
+def get_jwt_verifier() -> JWTVerifier:
+    global _verifier
+    if _verifier is None:
+        _verifier = JWTVerifier()
+    return _verifier
@@ -0,0 +1,215 @@
+"""Prometheus metrics for the API and the services it calls.
+
+- http_request_duration_seconds: every request, by route template
+  (e.g. /albums/{album_id}, never the raw path) and status.
+- supabase_request_duration_seconds / supabase_request_errors_total:
+  every SupabaseDB and AsyncSupabaseDB call, by table (or RPC) and verb.
+- s3_operation_duration_seconds / s3_operation_errors_total: presigning
+  (local CPU) and the S3 API helpers, by operation.
+- auth_request_duration_seconds / auth_request_errors_total: Supabase
+  Auth calls, i.e. admin user lookups and JWKS fetches.
+- upstream_retries_total / upstream_rejected_total / upstream_circuit_open:
+  retried reads, calls refused by an open circuit breaker, and each
+  breaker's state (see upstream).
+- single_flight_calls_total: calls to coalesced reads, as "leader"
+  (ran the work) or "follower" (shared a running one; see single_flight).
+- threadpool_*: the executor behind asyncio.to_thread, where every
+  blocking boto3 call and image/ffmpeg job of a request runs.
+- anyio_threadpool_*: anyio's default thread limiter, which caps the
+  threads Starlette uses for sync endpoints, dependencies and background
+  tasks (e.g. image derivatives after an upload).
+
+GET /metrics serves them in the text exposition format, to callers with
+METRICS_TOKEN. Values are per process; with several uvicorn workers,
+scrape each one.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import os
+import time
+
+import anyio.to_thread
+from prometheus_client import Counter, Gauge, Histogram
+
+# Presigning is pure CPU and takes microseconds; keep resolution down there
+_FAST_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time to serve a request, until the last body byte is sent.",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests currently being served.",
+    ["method"],
+)
+
+DB_REQUEST_SECONDS = Histogram(
+    "supabase_request_duration_seconds",
+    "PostgREST round trip, by table (or RPC function) and verb.",
+    ["table", "verb"],
+)
+DB_REQUEST_ERRORS = Counter(
+    "supabase_request_errors_total",
+    "PostgREST calls that raised (HTTP error or transport failure).",
+    ["table", "verb"],
+)
+
+S3_OPERATION_SECONDS = Histogram(
+    "s3_operation_duration_seconds",
+    "S3 presigning (local) and API calls, by operation.",
+    ["operation"],
+    buckets=_FAST_BUCKETS,
+)
+S3_OPERATION_ERRORS = Counter(
+    "s3_operation_errors_total",
+    "S3 operations that raised.",
+    ["operation"],
+)
+
+AUTH_REQUEST_SECONDS = Histogram(
+    "auth_request_duration_seconds",
+    "Supabase Auth round trip, by operation.",
+    ["operation"],
+)
+AUTH_REQUEST_ERRORS = Counter(
+    "auth_request_errors_total",
+    "Supabase Auth calls that failed.",
+    ["operation"],
+)
+
+UPSTREAM_RETRIES = Counter(
+    "upstream_retries_total",
+    "Reads retried after a transport error or a 502/503/504.",
+    ["upstream"],
+)
+UPSTREAM_REJECTED = Counter(
+    "upstream_rejected_total",
+    "Calls failed fast because the upstream's circuit breaker was open.",
+    ["upstream"],
+)
+UPSTREAM_CIRCUIT_OPEN = Gauge(
+    "upstream_circuit_open",
+    "1 while the upstream's circuit breaker is open or probing, else 0.",
+    ["upstream"],
+)
+
+SINGLE_FLIGHT_CALLS = Counter(
+    "single_flight_calls_total",
+    "Calls to single-flight functions; role is leader (ran it) or follower (joined a running call).",
+    ["function", "role"],
+)
+
+THREADPOOL_MAX_WORKERS = Gauge("threadpool_max_workers", "Size of the asyncio.to_thread executor.")
+THREADPOOL_ACTIVE = Gauge("threadpool_active", "Executor jobs currently running.")
+THREADPOOL_QUEUED = Gauge("threadpool_queued", "Executor jobs waiting for a free thread.")
+THREADPOOL_WAIT_SECONDS = Histogram(
+    "threadpool_wait_seconds",
+    "Time a job waited for a thread; non-zero means the pool is saturated.",
+    buckets=_FAST_BUCKETS,
+)
+
+ANYIO_THREADS_TOTAL = Gauge("anyio_threadpool_total_tokens", "Threads anyio's default limiter allows at once.")
+ANYIO_THREADS_BORROWED = Gauge("anyio_threadpool_borrowed_tokens", "Threads currently held from anyio's default limiter.")
+ANYIO_THREADS_WAITING = Gauge("anyio_threadpool_waiting", "Calls waiting for a thread from anyio's default limiter.")
+
+
+@contextmanager
+def observe(histogram: Histogram, errors: Counter, **labels):
+    """Time the block into histogram; count it in errors if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        errors.labels(**labels).inc()
+        raise
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - start)
+
+
+class InstrumentedThreadPool(ThreadPoolExecutor):
+    """ThreadPoolExecutor that reports its queue and busy threads.
+
+    Installed as the event loop's default executor, so it serves
+    asyncio.to_thread and run_in_executor(None, ...).
+    """
+
+    def __init__(self, max_workers: int | None = None):
+        # ThreadPoolExecutor's own default
+        max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        super().__init__(max_workers=max_workers, thread_name_prefix="api-worker")
+        THREADPOOL_MAX_WORKERS.set(max_workers)
+
+    def submit(self, fn, /, *args, **kwargs):
+        queued_at = time.perf_counter()
+        THREADPOOL_QUEUED.inc()
+
+        def run():
+            THREADPOOL_QUEUED.dec()
+            THREADPOOL_WAIT_SECONDS.observe(time.perf_counter() - queued_at)
+            THREADPOOL_ACTIVE.inc()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                THREADPOOL_ACTIVE.dec()
+
+        try:
+            return super().submit(run)
+        except Exception:
+            THREADPOOL_QUEUED.dec()
+            raise
+
+
+def instrument_anyio_limiter() -> None:
+    """Report the running event loop's default anyio thread limiter.
+
+    The limiter belongs to the loop, so call this from the lifespan; the
+    gauges read it at scrape time.
+    """
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    ANYIO_THREADS_TOTAL.set_function(lambda: limiter.total_tokens)
+    ANYIO_THREADS_BORROWED.set_function(lambda: limiter.borrowed_tokens)
+    ANYIO_THREADS_WAITING.set_function(lambda: limiter.statistics().tasks_waiting)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording http_request_duration_seconds.
+
+    The route label is the matched route's path template, read after the
+    router has run; requests that match no route share "<unmatched>" so
+    scanners cannot blow up the label set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                method,
+                getattr(route, "path", "<unmatched>"),
+                str(status),
+            ).observe(time.perf_counter() - start)
@@ -0,0 +1,38 @@
+import base64
+import binascii
+import json
+
+from fastapi import HTTPException, status
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(sort_value: str, tie_value: str) -> str:
+    """Opaque cursor pointing just past the row with (sort_value, tie_value)."""
+    raw = json.dumps([sort_value, tie_value], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """Inverse of encode_cursor; raises HTTP 400 for anything malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, tie_value = json.loads(base64.urlsafe_b64decode(padded))
+        return str(sort_value), str(tie_value)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def _literal(val: str) -> str:
+    escaped = val.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def keyset_filter(sort_col: str, tie_col: str, cursor: str) -> dict:
+    """PostgREST filter selecting rows after the cursor in (sort_col desc, tie_col desc) order."""
+    sort_value, tie_value = decode_cursor(cursor)
+    sort_lit, tie_lit = _literal(sort_value), _literal(tie_value)
+    return {
+        "or": f"({sort_col}.lt.{sort_lit},and({sort_col}.eq.{sort_lit},{tie_col}.lt.{tie_lit}))",
+    }
@@ -0,0 +1,178 @@
+"""Per-request accounting of upstream calls: round-trip budget and N+1 detection.
+
+Every SupabaseDB call, S3 helper, presign and Supabase Auth call made
+while serving a request is recorded against that request with its shape:
+the verb, the table (or S3 operation) and the filter keys, not their
+values. Once the response starts, RequestTraceMiddleware
+
+- adds a Server-Timing header with the summed time and count per kind
+  (db, s3, auth, sign), so browser devtools show where a request went;
+- logs a debug line with the same breakdown;
+- flags the request when it makes more than REQUEST_ROUNDTRIP_BUDGET
+  round trips, or repeats one shape REQUEST_REPEAT_THRESHOLD times or
+  more, which is what a per-row select inside a loop looks like
+  (either setting at 0 turns that check off).
+
+Flags are logged as warnings. With REQUEST_BUDGET_STRICT (meant for the
+test suite) the offending call raises RoundTripBudgetExceeded instead,
+so the regression fails the test that exercises it.
+
+Presigning is timed but is neither a round trip nor checked for
+repeats. Auth lookups count towards the budget but not towards repeats:
+the admin API has no batch endpoint. Keyset pagination and chunked
+in.(...) batches wrap their loops in paginated(), for the same reason.
+Calls made after the response has started (e.g. while a body streams)
+are not accounted.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+import threading
+import time
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Kinds that cost a network round trip; "sign" is local CPU
+ROUND_TRIP_KINDS = ("db", "s3", "auth")
+# Kinds with a batch form, where a repeated shape means a missed batch
+BATCHABLE_KINDS = ("db", "s3")
+
+
+class RoundTripBudgetExceeded(RuntimeError):
+    """Raised in strict mode by the call that breaks a request's budget."""
+
+
+class RequestTrace:
+    """Upstream calls made while serving one request."""
+
+    def __init__(self, budget: int, repeat_threshold: int, strict: bool):
+        self.budget = budget
+        self.repeat_threshold = repeat_threshold
+        self.strict = strict
+        self.closed = False
+        self.seconds: Counter[str] = Counter()
+        self.calls: Counter[str] = Counter()
+        self.shapes: Counter[tuple[str, str]] = Counter()
+        self.flags: list[str] = []
+        # asyncio.to_thread carries the trace into worker threads
+        self._lock = threading.Lock()
+
+    @property
+    def round_trips(self) -> int:
+        return sum(self.calls[kind] for kind in ROUND_TRIP_KINDS)
+
+    def record(self, kind: str, shape: str, seconds: float, repeatable: bool = False) -> None:
+        with self._lock:
+            if self.closed:
+                return
+            self.seconds[kind] += seconds
+            self.calls[kind] += 1
+            flag = None
+            if self.budget and kind in ROUND_TRIP_KINDS and self.round_trips == self.budget + 1:
+                flag = f"more than {self.budget} round trips"
+            if self.repeat_threshold and kind in BATCHABLE_KINDS and not repeatable:
+                self.shapes[kind, shape] += 1
+                if self.shapes[kind, shape] == self.repeat_threshold:
+                    flag = f"{kind} {shape} repeated {self.repeat_threshold} times (N+1?)"
+            if flag:
+                self.flags.append(flag)
+        if flag and self.strict:
+            raise RoundTripBudgetExceeded(flag)
+
+    def close(self) -> None:
+        """Stop accounting; later calls (e.g. from a streaming body) are ignored."""
+        with self._lock:
+            self.closed = True
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, durations in milliseconds."""
+        return ", ".join(
+            f'{kind};dur={self.seconds[kind] * 1000:.1f};desc="{count} call{"s" if count != 1 else ""}"'
+            for kind, count in self.calls.items()
+        )
+
+
+_trace: ContextVar[RequestTrace | None] = ContextVar("request_trace", default=None)
+_paginated: ContextVar[bool] = ContextVar("request_trace_paginated", default=False)
+
+
+@contextmanager
+def traced(kind: str, shape: str):
+    """Record the block as one upstream call of the current request, if any."""
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    yield
+    # Only successful calls: a failure already fails the request
+    trace.record(kind, shape, time.perf_counter() - start, repeatable=_paginated.get())
+
+
+@contextmanager
+def recording(budget: int = 0, repeat_threshold: int = 0, strict: bool = False):
+    """Record upstream calls made in the block (and tasks it starts) into a new RequestTrace."""
+    trace = RequestTrace(budget, repeat_threshold, strict)
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+
+
+@contextmanager
+def paginated():
+    """Mark calls in the block as deliberate repeats, e.g. keyset pages or id chunks."""
+    token = _paginated.set(True)
+    try:
+        yield
+    finally:
+        _paginated.reset(token)
+
+
+class RequestTraceMiddleware:
+    """ASGI middleware that opens a RequestTrace per HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        with recording(
+            budget=settings.REQUEST_ROUNDTRIP_BUDGET,
+            repeat_threshold=settings.REQUEST_REPEAT_THRESHOLD,
+            strict=settings.REQUEST_BUDGET_STRICT,
+        ) as trace:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start" and not trace.closed:
+                    trace.close()
+                    _report(scope, trace, time.perf_counter() - start)
+                    if trace.calls:
+                        headers = list(message.get("headers", []))
+                        headers.append((b"server-timing", trace.server_timing().encode()))
+                        message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+def _report(scope, trace: RequestTrace, elapsed: float) -> None:
+    route = getattr(scope.get("route"), "path", scope["path"])
+    if trace.flags:
+        logger.warning("%s %s: %s", scope["method"], route, "; ".join(trace.flags))
+    if logger.isEnabledFor(logging.DEBUG):
+        breakdown = ", ".join(
+            f"{kind} {count} in {trace.seconds[kind] * 1000:.1f} ms" for kind, count in trace.calls.items()
+        )
+        logger.debug(
+            "%s %s: %d round trips in %.1f ms (%s)",
+            scope["method"], route, trace.round_trips, elapsed * 1000, breakdown or "none",
+        )
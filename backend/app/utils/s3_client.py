@@ -1,12 +1,31 @@
+import base64
+from collections import OrderedDict
+from datetime import datetime, timezone
+import functools
+import hashlib
+import threading
+import time
 import uuid
 
 import boto3
 from botocore.config import Config
+from botocore.exceptions import ClientError
 
 from app.config import settings
+from app.utils.metrics import S3_OPERATION_ERRORS, S3_OPERATION_SECONDS, observe
+from app.utils.presigner import get_presigner
+from app.utils.request_trace import traced
 
 _s3_client = None
 
+# SigV4 presigned URLs cannot outlive seven days
+_MAX_PRESIGN_SECONDS = 7 * 24 * 3600
+UPLOAD_URL_EXPIRES = 900
+
+# (s3_key, bucket_start) -> view URL, least recently used first
+_view_url_cache: OrderedDict[tuple[str, int], str] = OrderedDict()
+_view_url_lock = threading.Lock()
+
 
 def get_s3_client():
     global _s3_client
@@ -16,55 +35,306 @@ def get_s3_client():
             aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
             aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
             region_name=settings.AWS_REGION,
-            endpoint_url=f"https://s3.{settings.AWS_REGION}.amazonaws.com",
+            endpoint_url=settings.S3_ENDPOINT_URL or f"https://s3.{settings.AWS_REGION}.amazonaws.com",
             config=Config(signature_version="s3v4"),
         )
     return _s3_client
 
 
+def _s3_call(operation: str):
+    """Time an S3 API helper into the metrics and the current request's trace."""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with traced("s3", operation), observe(S3_OPERATION_SECONDS, S3_OPERATION_ERRORS, operation=operation):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def new_upload_key(user_id: str, filename: str) -> str:
+    return f"family-album/{user_id}/{uuid.uuid4()}-{filename}"
+
+
+def content_key(user_id: str, sha256: str) -> str:
+    """Content-addressed key for an upload whose SHA-256 (hex) is known."""
+    return f"family-album/{user_id}/sha256/{sha256}"
+
+
+def is_content_key(s3_key: str) -> bool:
+    """Whether s3_key is under a content_key prefix, i.e. a shared blob tracked in blobs."""
+    return s3_key.split("/")[2:3] == ["sha256"]
+
+
+def sha256_base64(sha256: str) -> str:
+    """The hex digest in the base64 form S3 uses for x-amz-checksum-sha256."""
+    return base64.b64encode(bytes.fromhex(sha256)).decode()
+
+
 def generate_presigned_upload_url(
-    user_id: str, filename: str, content_type: str
+    user_id: str, filename: str, content_type: str, sha256: str | None = None
 ) -> dict:
-    s3_key = f"family-album/{user_id}/{uuid.uuid4()}-{filename}"
-    s3 = get_s3_client()
-    upload_url = s3.generate_presigned_url(
-        "put_object",
-        Params={
-            "Bucket": settings.S3_BUCKET_NAME,
-            "Key": s3_key,
-            "ContentType": content_type,
-        },
-        ExpiresIn=900,
+    """Presign a single PUT.
+
+    With a sha256 the object is stored under its content_key and the
+    checksum is signed in, so S3 rejects a body with any other content;
+    headers lists what the uploader has to send.
+    """
+    headers = {"Content-Type": content_type}
+    if sha256:
+        s3_key = content_key(user_id, sha256)
+        headers["x-amz-checksum-sha256"] = sha256_base64(sha256)
+    else:
+        s3_key = new_upload_key(user_id, filename)
+    upload_url = get_presigner().presign(
+        s3_key,
+        method="PUT",
+        expires_in=UPLOAD_URL_EXPIRES,
+        content_type=content_type,
+        checksum_sha256=headers.get("x-amz-checksum-sha256"),
     )
-    return {"upload_url": upload_url, "s3_key": s3_key}
+    return {"upload_url": upload_url, "s3_key": s3_key, "headers": headers}
 
 
 def generate_presigned_view_url(s3_key: str) -> str:
-    s3 = get_s3_client()
-    return s3.generate_presigned_url(
-        "get_object",
-        Params={
-            "Bucket": settings.S3_BUCKET_NAME,
-            "Key": s3_key,
-        },
-        ExpiresIn=3600,
-    )
+    """Return a GET URL that is identical for every call within the current time bucket."""
+    return generate_presigned_view_urls([s3_key])[0]
+
+
+def generate_presigned_view_urls(s3_keys: list[str]) -> list[str]:
+    """Batch form of generate_presigned_view_url; signs only keys not already cached.
+
+    The signature is computed as of the bucket start and stays valid for a
+    full bucket beyond the current one, so a URL handed out just before
+    the bucket rolls over still lives for at least VIEW_URL_BUCKET_SECONDS.
+    """
+    bucket_seconds = settings.VIEW_URL_BUCKET_SECONDS
+    bucket_start = int(time.time()) // bucket_seconds * bucket_seconds
+
+    urls: dict[str, str] = {}
+    with _view_url_lock:
+        for key in s3_keys:
+            url = _view_url_cache.get((key, bucket_start))
+            if url is not None:
+                _view_url_cache.move_to_end((key, bucket_start))
+                urls[key] = url
+
+    missing = list(dict.fromkeys(k for k in s3_keys if k not in urls))
+    if missing:
+        signed = get_presigner().presign_many(
+            missing,
+            expires_in=min(2 * bucket_seconds, _MAX_PRESIGN_SECONDS),
+            signed_at=datetime.fromtimestamp(bucket_start, tz=timezone.utc),
+        )
+        with _view_url_lock:
+            for key, url in zip(missing, signed):
+                urls[key] = url
+                _view_url_cache[(key, bucket_start)] = url
+            while len(_view_url_cache) > settings.VIEW_URL_CACHE_SIZE:
+                _view_url_cache.popitem(last=False)
+
+    return [urls[key] for key in s3_keys]
 
 
 def generate_presigned_download_url(s3_key: str, filename: str) -> str:
-    s3 = get_s3_client()
     safe_filename = filename.replace('"', "")
-    return s3.generate_presigned_url(
-        "get_object",
-        Params={
-            "Bucket": settings.S3_BUCKET_NAME,
-            "Key": s3_key,
-            "ResponseContentDisposition": f'attachment; filename="{safe_filename}"',
-        },
-        ExpiresIn=300,
+    return get_presigner().presign(
+        s3_key,
+        expires_in=300,
+        params={"response-content-disposition": f'attachment; filename="{safe_filename}"'},
     )
 
 
+@_s3_call("get_object")
+def get_s3_object_bytes(s3_key: str) -> bytes:
+    resp = get_s3_client().get_object(Bucket=settings.S3_BUCKET_NAME, Key=s3_key)
+    return resp["Body"].read()
+
+
+@_s3_call("put_object")
+def put_s3_object(s3_key: str, body: bytes, content_type: str, cache_control: str | None = None) -> None:
+    extra = {"CacheControl": cache_control} if cache_control else {}
+    get_s3_client().put_object(
+        Bucket=settings.S3_BUCKET_NAME,
+        Key=s3_key,
+        Body=body,
+        ContentType=content_type,
+        **extra,
+    )
+
+
+@_s3_call("head_object")
+def get_s3_object_sha256(s3_key: str) -> str | None:
+    """The object's SHA-256 (base64), or None if it does not exist.
+
+    Normally the checksum S3 stored at upload; S3 stand-ins that keep no
+    checksums get the object streamed through hashlib instead.
+    """
+    client = get_s3_client()
+    try:
+        head = client.head_object(Bucket=settings.S3_BUCKET_NAME, Key=s3_key, ChecksumMode="ENABLED")
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+            return None
+        raise
+    if head.get("ChecksumSHA256"):
+        return head["ChecksumSHA256"]
+    digest = hashlib.sha256()
+    body = client.get_object(Bucket=settings.S3_BUCKET_NAME, Key=s3_key)["Body"]
+    for chunk in body.iter_chunks(1024 * 1024):
+        digest.update(chunk)
+    return base64.b64encode(digest.digest()).decode()
+
+
+@_s3_call("download_file")
+def download_s3_object(s3_key: str, path: str) -> None:
+    """Stream an object to a local file without holding it in memory."""
+    get_s3_client().download_file(settings.S3_BUCKET_NAME, s3_key, path)
+
+
+@_s3_call("upload_file")
+def upload_s3_file(path: str, s3_key: str, content_type: str, cache_control: str | None = None) -> None:
+    extra = {"ContentType": content_type}
+    if cache_control:
+        extra["CacheControl"] = cache_control
+    get_s3_client().upload_file(path, settings.S3_BUCKET_NAME, s3_key, ExtraArgs=extra)
+
+
+@_s3_call("list_objects")
+def list_s3_keys(prefix: str) -> list[str]:
+    paginator = get_s3_client().get_paginator("list_objects_v2")
+    return [
+        obj["Key"]
+        for page in paginator.paginate(Bucket=settings.S3_BUCKET_NAME, Prefix=prefix)
+        for obj in page.get("Contents", [])
+    ]
+
+
+@_s3_call("delete_object")
 def delete_s3_object(s3_key: str) -> None:
     s3 = get_s3_client()
     s3.delete_object(Bucket=settings.S3_BUCKET_NAME, Key=s3_key)
+
+
+# DeleteObjects accepts at most this many keys per request
+DELETE_BATCH_SIZE = 1000
+
+
+@_s3_call("delete_objects")
+def delete_s3_objects(s3_keys: list[str]) -> list[dict]:
+    """Delete up to DELETE_BATCH_SIZE keys in one DeleteObjects call.
+
+    Returns the keys S3 could not delete as {"s3_key", "code", "message"}
+    dicts; keys that were already gone count as deleted.
+    """
+    if len(s3_keys) > DELETE_BATCH_SIZE:
+        raise ValueError(f"DeleteObjects takes at most {DELETE_BATCH_SIZE} keys")
+    if not s3_keys:
+        return []
+    resp = get_s3_client().delete_objects(
+        Bucket=settings.S3_BUCKET_NAME,
+        Delete={"Objects": [{"Key": key} for key in s3_keys], "Quiet": True},
+    )
+    return [
+        {"s3_key": err["Key"], "code": err.get("Code", ""), "message": err.get("Message", "")}
+        for err in resp.get("Errors", [])
+    ]
+
+
+# ── Multipart uploads ────────────────────────────────────────────────
+
+# S3 limits: every part but the last is at least 5 MiB, at most 10,000 parts
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10_000
+# Part URLs outlive a single-PUT URL since a large upload takes a while
+PART_URL_EXPIRES = 3600
+
+
+@_s3_call("create_multipart_upload")
+def create_multipart_upload(s3_key: str, content_type: str) -> str:
+    resp = get_s3_client().create_multipart_upload(
+        Bucket=settings.S3_BUCKET_NAME,
+        Key=s3_key,
+        ContentType=content_type,
+    )
+    return resp["UploadId"]
+
+
+def generate_presigned_part_urls(s3_key: str, upload_id: str, part_numbers: list[int]) -> list[str]:
+    """Presign an UploadPart URL per part number, all at one signing time."""
+    presigner = get_presigner()
+    signed_at = datetime.now(timezone.utc)
+    return [
+        presigner.presign(
+            s3_key,
+            method="PUT",
+            expires_in=PART_URL_EXPIRES,
+            signed_at=signed_at,
+            params={"uploadId": upload_id, "partNumber": str(number)},
+        )
+        for number in part_numbers
+    ]
+
+
+@_s3_call("list_parts")
+def list_uploaded_parts(s3_key: str, upload_id: str) -> list[dict]:
+    """Every part S3 has received so far, as {"part_number", "etag", "size"}."""
+    s3 = get_s3_client()
+    parts = []
+    kwargs = {"Bucket": settings.S3_BUCKET_NAME, "Key": s3_key, "UploadId": upload_id}
+    while True:
+        resp = s3.list_parts(**kwargs)
+        parts += [
+            {"part_number": p["PartNumber"], "etag": p["ETag"], "size": p["Size"]}
+            for p in resp.get("Parts", [])
+        ]
+        if not resp.get("IsTruncated"):
+            return parts
+        kwargs["PartNumberMarker"] = resp["NextPartNumberMarker"]
+
+
+@_s3_call("complete_multipart_upload")
+def complete_multipart_upload(s3_key: str, upload_id: str, parts: list[dict]) -> str:
+    """Assemble the object from {"part_number", "etag"} parts; returns its ETag."""
+    resp = get_s3_client().complete_multipart_upload(
+        Bucket=settings.S3_BUCKET_NAME,
+        Key=s3_key,
+        UploadId=upload_id,
+        MultipartUpload={
+            "Parts": [
+                {"PartNumber": p["part_number"], "ETag": p["etag"]}
+                for p in sorted(parts, key=lambda p: p["part_number"])
+            ]
+        },
+    )
+    return resp["ETag"]
+
+
+@_s3_call("abort_multipart_upload")
+def abort_multipart_upload(s3_key: str, upload_id: str) -> None:
+    get_s3_client().abort_multipart_upload(
+        Bucket=settings.S3_BUCKET_NAME,
+        Key=s3_key,
+        UploadId=upload_id,
+    )
+
+
+@_s3_call("list_multipart_uploads")
+def list_multipart_uploads(prefix: str = "family-album/") -> list[dict]:
+    """Every unfinished upload under prefix, as {"s3_key", "upload_id", "initiated"}."""
+    s3 = get_s3_client()
+    uploads = []
+    kwargs = {"Bucket": settings.S3_BUCKET_NAME, "Prefix": prefix}
+    while True:
+        resp = s3.list_multipart_uploads(**kwargs)
+        uploads += [
+            {"s3_key": u["Key"], "upload_id": u["UploadId"], "initiated": u["Initiated"]}
+            for u in resp.get("Uploads", [])
+        ]
+        if not resp.get("IsTruncated"):
+            return uploads
+        kwargs["KeyMarker"] = resp["NextKeyMarker"]
+        kwargs["UploadIdMarker"] = resp["NextUploadIdMarker"]
@@ -0,0 +1,144 @@
+"""Single-flight: concurrent identical reads share one computation.
+
+A function decorated with @single_flight() is keyed by its name and
+bound arguments. A call whose key is already running does not start its
+own work: it waits for the running one and gets the same result, or the
+same exception. Nothing is cached; once the work finishes, the next call
+starts afresh. So a burst of identical requests costs one chain of
+upstream calls, and no result outlives the burst.
+
+- Coroutine functions: the first caller (the leader) starts the work as
+  a task, and every caller awaits it through asyncio.shield. A cancelled
+  caller (e.g. a client that disconnected) only stops waiting. The work
+  is cancelled when no caller is left waiting. It runs in the leader's
+  context, so its round trips are accounted to the leader's request.
+- Blocking functions (called through asyncio.to_thread): the leader runs
+  the work in its own thread, and followers block until it is done.
+  Threads cannot be cancelled, so the work always runs to completion.
+
+Arguments named in ignore are left out of the key, e.g. the shared
+database client or a row the caller already read; the rest must be
+hashable. When an ignored argument still decides what the result looks
+like, version maps the bound arguments to a hashable that is added to
+the key; an album row's content_version, for instance, so callers that
+read different versions never share a body. Callers share one result
+object and must not modify it.
+
+single_flight_calls_total counts calls by role: "leader" calls ran the
+work and "follower" calls joined one. The coalescing ratio is
+follower / (leader + follower).
+"""
+import asyncio
+from collections.abc import Callable, Hashable
+import functools
+import inspect
+import threading
+
+from app.utils.metrics import SINGLE_FLIGHT_CALLS
+
+
+def single_flight(
+    ignore: tuple[str, ...] = (),
+    version: Callable[[dict], Hashable] | None = None,
+) -> Callable:
+    def decorate(fn):
+        signature = inspect.signature(fn)
+        unknown = set(ignore) - set(signature.parameters)
+        if unknown:
+            raise TypeError(f"{fn.__qualname__} has no parameters {sorted(unknown)}")
+        name = f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__qualname__}"
+        leaders = SINGLE_FLIGHT_CALLS.labels(name, "leader")
+        followers = SINGLE_FLIGHT_CALLS.labels(name, "follower")
+
+        def key(args, kwargs) -> Hashable:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            parts = tuple((k, v) for k, v in bound.arguments.items() if k not in ignore)
+            return parts if version is None else (parts, version(bound.arguments))
+
+        if inspect.iscoroutinefunction(fn):
+            flights: dict[Hashable, _Flight] = {}
+
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                # Tasks belong to one event loop; never join another loop's
+                k = (asyncio.get_running_loop(), key(args, kwargs))
+                flight = flights.get(k)
+                if flight is None:
+                    flight = flights[k] = _Flight(asyncio.create_task(fn(*args, **kwargs)))
+                    flight.task.add_done_callback(functools.partial(_finished, flights, k, flight))
+                    leaders.inc()
+                else:
+                    followers.inc()
+                flight.waiters += 1
+                try:
+                    return await asyncio.shield(flight.task)
+                finally:
+                    flight.waiters -= 1
+                    if not flight.waiters and not flight.task.done():
+                        # Everyone stopped waiting; later callers start over
+                        _forget(flights, k, flight)
+                        flight.task.cancel()
+        else:
+            calls: dict[Hashable, _Call] = {}
+            lock = threading.Lock()
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                k = key(args, kwargs)
+                with lock:
+                    call = calls.get(k)
+                    leader = call is None
+                    if leader:
+                        call = calls[k] = _Call()
+                if not leader:
+                    followers.inc()
+                    call.done.wait()
+                    if call.error is not None:
+                        raise call.error
+                    return call.result
+
+                leaders.inc()
+                try:
+                    call.result = fn(*args, **kwargs)
+                    return call.result
+                except BaseException as e:
+                    call.error = e
+                    raise
+                finally:
+                    with lock:
+                        del calls[k]
+                    call.done.set()
+
+        return wrapper
+
+    return decorate
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+def _forget(flights: dict, key: Hashable, flight: _Flight) -> None:
+    if flights.get(key) is flight:
+        del flights[key]
+
+
+def _finished(flights: dict, key: Hashable, flight: _Flight, task: asyncio.Task) -> None:
+    _forget(flights, key, flight)
+    if not task.cancelled():
+        # Mark the exception retrieved: with every waiter gone, nobody else will
+        task.exception()
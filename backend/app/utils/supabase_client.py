@@ -1,5 +1,10 @@
-import httpx
+import functools
+import inspect
+
 from app.config import settings
+from app.utils.metrics import DB_REQUEST_ERRORS, DB_REQUEST_SECONDS, observe
+from app.utils.request_trace import traced
+from app.utils.upstream import AsyncUpstream, Upstream, get_async_upstream
 
 _headers = {
     "apikey": settings.SUPABASE_SERVICE_ROLE_KEY,
@@ -8,56 +13,325 @@ _headers = {
     "Prefer": "return=representation",
 }
 
-REST_URL = f"{settings.SUPABASE_URL}/rest/v1"
+REST_PATH = "/rest/v1"
+
+# Characters that are reserved inside a PostgREST in.(...) list
+_RESERVED = set(',.:()"\\ ')
+
+# Filter keys whose value is already a PostgREST logic tree, e.g. "(a.eq.1,b.lt.2)"
+_LOGIC_KEYS = ("or", "and")
+
+
+class Op:
+    """An explicit PostgREST operator for a filter value.
+
+    Example: filters={"created_at": Op("lt", ts)} -> created_at=lt.<ts>
+    """
+
+    __slots__ = ("operator", "value")
+
+    def __init__(self, operator: str, value):
+        self.operator = operator
+        self.value = value
+
+    def __repr__(self) -> str:
+        return f"Op({self.operator!r}, {self.value!r})"
+
+
+def _quote(val) -> str:
+    text = str(val)
+    if any(ch in _RESERVED for ch in text):
+        escaped = text.replace("\\", "\\\\").replace('"', '\\"')
+        return f'"{escaped}"'
+    return text
+
+
+def _encode_filter(val) -> str:
+    """Translate a filter value into a PostgREST operator expression.
+
+    None -> is.null, list/tuple/set -> in.(...), Op -> <op>.<value>,
+    anything else -> eq.
+    """
+    if val is None:
+        return "is.null"
+    if isinstance(val, Op):
+        if isinstance(val.value, (list, tuple, set, frozenset)):
+            return f"{val.operator}.({','.join(_quote(v) for v in val.value)})"
+        return f"{val.operator}.{val.value}"
+    if isinstance(val, (list, tuple, set, frozenset)):
+        return f"in.({','.join(_quote(v) for v in val)})"
+    return f"eq.{val}"
+
+
+def _filter_params(filters: dict | None) -> dict:
+    params = {}
+    for key, val in (filters or {}).items():
+        params[key] = val if key in _LOGIC_KEYS else _encode_filter(val)
+    return params
+
+
+def _parse_total(content_range: str | None) -> int:
+    """Extract the total from a Content-Range header such as '0-24/3573' or '*/0'."""
+    if not content_range or "/" not in content_range:
+        return 0
+    total = content_range.rsplit("/", 1)[1]
+    return int(total) if total.isdigit() else 0
+
+
+def _select_request(
+    columns: str,
+    filters: dict | None,
+    order: str | None,
+    limit: int | None,
+    offset: int | None,
+    range: tuple[int, int] | None,
+) -> tuple[dict, dict]:
+    params = {"select": columns, **_filter_params(filters)}
+    if order:
+        params["order"] = order
+    if limit is not None:
+        params["limit"] = limit
+    if offset is not None:
+        params["offset"] = offset
+    headers = {}
+    if range is not None:
+        headers = {"Range-Unit": "items", "Range": f"{range[0]}-{range[1]}"}
+    return params, headers
+
+
+def _upsert_request(on_conflict: str | None, ignore_duplicates: bool) -> tuple[dict, dict]:
+    resolution = "ignore-duplicates" if ignore_duplicates else "merge-duplicates"
+    params = {"on_conflict": on_conflict} if on_conflict else {}
+    return params, {"Prefer": f"return=representation,resolution={resolution}"}
+
+
+def _count_request(filters: dict | None, method: str) -> tuple[dict, dict]:
+    return {"select": "*", **_filter_params(filters)}, {"Prefer": f"count={method}"}
+
+
+def _instrumented(verb: str):
+    """Record a method's latency and errors under its table (or RPC name) and verb.
+
+    The call also counts against the current request's round-trip budget,
+    with the filter keys as its shape (see request_trace).
+    """
+
+    def decorate(method):
+        signature = inspect.signature(method)
+
+        def shape(args, kwargs) -> str:
+            filters = signature.bind(None, *args, **kwargs).arguments.get("filters")
+            return f"{verb} {args[0]}({','.join(sorted(filters or ()))})"
+
+        if inspect.iscoroutinefunction(method):
+
+            @functools.wraps(method)
+            async def wrapper(self, name: str, *args, **kwargs):
+                with (
+                    traced("db", shape((name, *args), kwargs)),
+                    observe(DB_REQUEST_SECONDS, DB_REQUEST_ERRORS, table=name, verb=verb),
+                ):
+                    return await method(self, name, *args, **kwargs)
+
+        else:
+
+            @functools.wraps(method)
+            def wrapper(self, name: str, *args, **kwargs):
+                with (
+                    traced("db", shape((name, *args), kwargs)),
+                    observe(DB_REQUEST_SECONDS, DB_REQUEST_ERRORS, table=name, verb=verb),
+                ):
+                    return method(self, name, *args, **kwargs)
+
+        return wrapper
+
+    return decorate
 
 
 class SupabaseDB:
-    """Lightweight PostgREST wrapper using httpx."""
+    """Lightweight PostgREST wrapper using httpx.
+
+    Blocking; meant for scripts and workers. Request handlers use
+    AsyncSupabaseDB, which has the same interface with awaitable methods.
+    Selects and counts are retried on transient failures; see upstream.
+    """
 
     def __init__(self):
-        self._client = httpx.Client(base_url=REST_URL, headers=_headers, timeout=30)
+        self._upstream = Upstream()
 
-    def insert(self, table: str, row: dict) -> list[dict]:
-        resp = self._client.post(f"/{table}", json=row)
+    def _request(self, method: str, path: str, headers: dict | None = None, query: bool = False, **kwargs):
+        return self._upstream.request(
+            "postgrest", method, REST_PATH + path, query=query, headers={**_headers, **(headers or {})}, **kwargs
+        )
+
+    @_instrumented("insert")
+    def insert(self, table: str, row: dict | list[dict]) -> list[dict]:
+        """Insert one row, or many in a single request when given a list."""
+        resp = self._request("POST", f"/{table}", json=row)
         resp.raise_for_status()
         return resp.json()
 
+    @_instrumented("upsert")
+    def upsert(
+        self,
+        table: str,
+        rows: dict | list[dict],
+        on_conflict: str | None = None,
+        ignore_duplicates: bool = False,
+    ) -> list[dict]:
+        """Insert rows, merging into (or skipping) rows that hit the on_conflict key.
+
+        With ignore_duplicates only the newly inserted rows are returned.
+        """
+        params, headers = _upsert_request(on_conflict, ignore_duplicates)
+        resp = self._request("POST", f"/{table}", headers=headers, json=rows, params=params)
+        resp.raise_for_status()
+        return resp.json()
+
+    @_instrumented("select")
     def select(
         self,
         table: str,
         filters: dict | None = None,
         order: str | None = None,
+        columns: str = "*",
+        limit: int | None = None,
+        offset: int | None = None,
+        range: tuple[int, int] | None = None,
     ) -> list[dict]:
-        params = {"select": "*"}
-        if filters:
-            for key, val in filters.items():
-                if val is None:
-                    params[key] = "is.null"
-                else:
-                    params[key] = f"eq.{val}"
-        if order:
-            params["order"] = order
-        resp = self._client.get(f"/{table}", params=params)
+        """Read rows from a table or view.
+
+        columns is passed through as PostgREST's select, so embedded
+        resources work too, e.g. columns="added_at,media(*)".
+        range=(first, last) is sent as a Range header (inclusive bounds).
+        """
+        params, headers = _select_request(columns, filters, order, limit, offset, range)
+        resp = self._request("GET", f"/{table}", headers=headers, query=True, params=params)
         resp.raise_for_status()
         return resp.json()
 
+    @_instrumented("count")
+    def count(
+        self,
+        table: str,
+        filters: dict | None = None,
+        method: str = "exact",
+    ) -> int:
+        """Return the number of matching rows without transferring any of them.
+
+        method is 'exact', 'planned' or 'estimated' (PostgREST's Prefer: count=...).
+        """
+        params, headers = _count_request(filters, method)
+        resp = self._request("HEAD", f"/{table}", headers=headers, query=True, params=params)
+        resp.raise_for_status()
+        return _parse_total(resp.headers.get("Content-Range"))
+
+    @_instrumented("update")
     def update(self, table: str, values: dict, filters: dict) -> list[dict]:
-        params = {}
-        for key, val in filters.items():
-            params[key] = f"eq.{val}"
-        resp = self._client.patch(f"/{table}", json=values, params=params)
+        resp = self._request("PATCH", f"/{table}", json=values, params=_filter_params(filters))
+        resp.raise_for_status()
+        return resp.json()
+
+    @_instrumented("delete")
+    def delete(self, table: str, filters: dict) -> list[dict]:
+        resp = self._request("DELETE", f"/{table}", params=_filter_params(filters))
         resp.raise_for_status()
         return resp.json()
 
-    def delete(self, table: str, filters: dict) -> None:
-        params = {}
-        for key, val in filters.items():
-            params[key] = f"eq.{val}"
-        resp = self._client.delete(f"/{table}", params=params)
+    @_instrumented("rpc")
+    def rpc(self, function: str, args: dict | None = None):
+        """Call a Postgres function exposed by PostgREST; returns its decoded result."""
+        resp = self._request("POST", f"/rpc/{function}", json=args or {})
+        resp.raise_for_status()
+        return resp.json() if resp.content else None
+
+    def close(self) -> None:
+        self._upstream.close()
+
+
+class AsyncSupabaseDB:
+    """Non-blocking counterpart of SupabaseDB on the API's shared AsyncUpstream."""
+
+    def __init__(self, upstream: AsyncUpstream | None = None):
+        # None: the shared one, looked up per request so it survives a lifespan restart
+        self._upstream = upstream
+
+    async def _request(self, method: str, path: str, headers: dict | None = None, query: bool = False, **kwargs):
+        return await (self._upstream or get_async_upstream()).request(
+            "postgrest", method, REST_PATH + path, query=query, headers={**_headers, **(headers or {})}, **kwargs
+        )
+
+    @_instrumented("insert")
+    async def insert(self, table: str, row: dict | list[dict]) -> list[dict]:
+        resp = await self._request("POST", f"/{table}", json=row)
         resp.raise_for_status()
+        return resp.json()
+
+    @_instrumented("upsert")
+    async def upsert(
+        self,
+        table: str,
+        rows: dict | list[dict],
+        on_conflict: str | None = None,
+        ignore_duplicates: bool = False,
+    ) -> list[dict]:
+        params, headers = _upsert_request(on_conflict, ignore_duplicates)
+        resp = await self._request("POST", f"/{table}", headers=headers, json=rows, params=params)
+        resp.raise_for_status()
+        return resp.json()
+
+    @_instrumented("select")
+    async def select(
+        self,
+        table: str,
+        filters: dict | None = None,
+        order: str | None = None,
+        columns: str = "*",
+        limit: int | None = None,
+        offset: int | None = None,
+        range: tuple[int, int] | None = None,
+    ) -> list[dict]:
+        params, headers = _select_request(columns, filters, order, limit, offset, range)
+        resp = await self._request("GET", f"/{table}", headers=headers, query=True, params=params)
+        resp.raise_for_status()
+        return resp.json()
+
+    @_instrumented("count")
+    async def count(
+        self,
+        table: str,
+        filters: dict | None = None,
+        method: str = "exact",
+    ) -> int:
+        params, headers = _count_request(filters, method)
+        resp = await self._request("HEAD", f"/{table}", headers=headers, query=True, params=params)
+        resp.raise_for_status()
+        return _parse_total(resp.headers.get("Content-Range"))
+
+    @_instrumented("update")
+    async def update(self, table: str, values: dict, filters: dict) -> list[dict]:
+        resp = await self._request("PATCH", f"/{table}", json=values, params=_filter_params(filters))
+        resp.raise_for_status()
+        return resp.json()
+
+    @_instrumented("delete")
+    async def delete(self, table: str, filters: dict) -> list[dict]:
+        resp = await self._request("DELETE", f"/{table}", params=_filter_params(filters))
+        resp.raise_for_status()
+        return resp.json()
+
+    @_instrumented("rpc")
+    async def rpc(self, function: str, args: dict | None = None):
+        resp = await self._request("POST", f"/rpc/{function}", json=args or {})
+        resp.raise_for_status()
+        return resp.json() if resp.content else None
+
+    async def aclose(self) -> None:
+        """Nothing to release: the pool is shared (see upstream.close_async_upstream)."""
 
 
 _db: SupabaseDB | None = None
+_async_db: AsyncSupabaseDB | None = None
 
 
 def get_supabase_admin() -> SupabaseDB:
@@ -65,3 +339,17 @@ def get_supabase_admin() -> SupabaseDB:
     if _db is None:
         _db = SupabaseDB()
     return _db
+
+
+def get_async_supabase_admin() -> AsyncSupabaseDB:
+    global _async_db
+    if _async_db is None:
+        _async_db = AsyncSupabaseDB()
+    return _async_db
+
+
+async def close_async_supabase_admin() -> None:
+    global _async_db
+    if _async_db is not None:
+        await _async_db.aclose()
+        _async_db = None
@@ -0,0 +1,233 @@
+"""HTTP transport to Supabase (PostgREST and Auth): pooling, retries, circuit breaking.
+
+Upstream (blocking) and AsyncUpstream wrap one httpx client each over
+SUPABASE_URL. The API shares a single AsyncUpstream between
+AsyncSupabaseDB, the Auth admin lookups in user_directory and the JWKS
+fetch, so they draw on one pool of connections that HTTP/2 multiplexes
+over when the endpoint speaks it (HTTPS with ALPN).
+
+Every call names its upstream ("postgrest" or "auth") and whether it is a
+query:
+
+- queries (selects, counts, Auth reads) time out after
+  UPSTREAM_QUERY_TIMEOUT_SECONDS and are retried up to
+  UPSTREAM_QUERY_RETRIES times on a transport error or a 502/503/504,
+  sleeping a random fraction of an exponentially growing backoff
+  ("full jitter") in between;
+- mutations get UPSTREAM_MUTATION_TIMEOUT_SECONDS and no retries, since
+  a write whose response was lost may already have happened.
+
+Each upstream has a CircuitBreaker. After UPSTREAM_BREAKER_FAILURES
+calls in a row fail (once their retries are spent; a call counts once,
+however many attempts it made), calls raise UpstreamUnavailable at once
+(the API answers 503) instead of queueing behind a dead service. Once
+the cooldown passes, one call goes through as a probe and its outcome
+closes or reopens the circuit.
+
+httpx.PoolTimeout means our own pool had no free connection in time,
+which says nothing about the upstream's health: it is raised at once,
+neither retried nor counted by the breaker.
+"""
+import asyncio
+import random
+import threading
+import time
+
+import httpx
+
+from app.config import settings
+from app.utils.metrics import UPSTREAM_CIRCUIT_OPEN, UPSTREAM_REJECTED, UPSTREAM_RETRIES
+
+# Statuses that mean the upstream (or the proxy in front of it) is unhealthy
+RETRY_STATUSES = frozenset({502, 503, 504})
+# No single backoff sleep is longer than this
+MAX_BACKOFF_SECONDS = 2.0
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(f"{upstream} is unavailable; retry in {retry_after:.1f}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> (after cooldown) one probe -> closed or open.
+
+    Letting a probe through restarts the cooldown, so a probe that never
+    reports back (e.g. its request was cancelled) just means the next one
+    goes out a cooldown later.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, cooldown: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Raise UpstreamUnavailable unless a call may go through now."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            now = time.monotonic()
+            remaining = self._opened_at + self.cooldown - now
+            if remaining <= 0:
+                self._opened_at = now
+                return
+        UPSTREAM_REJECTED.labels(self.name).inc()
+        raise UpstreamUnavailable(self.name, remaining)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+        UPSTREAM_CIRCUIT_OPEN.labels(self.name).set(0)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._opened_at is not None or (self.failure_threshold and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+        UPSTREAM_CIRCUIT_OPEN.labels(self.name).set(1 if self._opened_at is not None else 0)
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(upstream: str) -> CircuitBreaker:
+    """The process-wide breaker for an upstream, shared by every client."""
+    with _breakers_lock:
+        breaker = _breakers.get(upstream)
+        if breaker is None:
+            breaker = _breakers[upstream] = CircuitBreaker(
+                upstream,
+                settings.UPSTREAM_BREAKER_FAILURES,
+                settings.UPSTREAM_BREAKER_COOLDOWN_SECONDS,
+            )
+        return breaker
+
+
+def _client_options() -> dict:
+    return {
+        "base_url": settings.SUPABASE_URL,
+        "http2": settings.UPSTREAM_HTTP2,
+        "limits": httpx.Limits(
+            max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.UPSTREAM_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        "timeout": _timeout(query=False),
+    }
+
+
+def _timeout(query: bool) -> httpx.Timeout:
+    seconds = settings.UPSTREAM_QUERY_TIMEOUT_SECONDS if query else settings.UPSTREAM_MUTATION_TIMEOUT_SECONDS
+    return httpx.Timeout(
+        seconds,
+        connect=settings.UPSTREAM_CONNECT_TIMEOUT_SECONDS,
+        pool=settings.UPSTREAM_POOL_TIMEOUT_SECONDS,
+    )
+
+
+def _backoff(attempt: int) -> float:
+    """Full jitter: uniform in [0, base * 2^attempt], capped."""
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, settings.UPSTREAM_RETRY_BACKOFF_SECONDS * 2 ** attempt))
+
+
+class Upstream:
+    """Blocking client for scripts and workers."""
+
+    def __init__(self):
+        self._client = httpx.Client(**_client_options())
+
+    def request(self, upstream: str, method: str, url: str, *, query: bool = False, **kwargs) -> httpx.Response:
+        """Send a request to upstream; url is relative to SUPABASE_URL (or absolute)."""
+        breaker = get_breaker(upstream)
+        breaker.before_call()
+        retries = settings.UPSTREAM_QUERY_RETRIES if query else 0
+        attempt = 0
+        while True:
+            try:
+                resp = self._client.request(method, url, timeout=_timeout(query), **kwargs)
+            except httpx.PoolTimeout:
+                # Our own pool is saturated: back-pressure, not an unhealthy upstream
+                raise
+            except httpx.TransportError:
+                if attempt == retries:
+                    breaker.record_failure()
+                    raise
+            else:
+                if resp.status_code not in RETRY_STATUSES:
+                    breaker.record_success()
+                    return resp
+                if attempt == retries:
+                    breaker.record_failure()
+                    return resp
+                resp.close()
+            UPSTREAM_RETRIES.labels(upstream).inc()
+            time.sleep(_backoff(attempt))
+            attempt += 1
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class AsyncUpstream:
+    """Non-blocking counterpart of Upstream; the API shares one (get_async_upstream)."""
+
+    def __init__(self):
+        self._client = httpx.AsyncClient(**_client_options())
+
+    async def request(
+        self, upstream: str, method: str, url: str, *, query: bool = False, **kwargs
+    ) -> httpx.Response:
+        breaker = get_breaker(upstream)
+        breaker.before_call()
+        retries = settings.UPSTREAM_QUERY_RETRIES if query else 0
+        attempt = 0
+        while True:
+            try:
+                resp = await self._client.request(method, url, timeout=_timeout(query), **kwargs)
+            except httpx.PoolTimeout:
+                raise
+            except httpx.TransportError:
+                if attempt == retries:
+                    breaker.record_failure()
+                    raise
+            else:
+                if resp.status_code not in RETRY_STATUSES:
+                    breaker.record_success()
+                    return resp
+                if attempt == retries:
+                    breaker.record_failure()
+                    return resp
+                await resp.aclose()
+            UPSTREAM_RETRIES.labels(upstream).inc()
+            await asyncio.sleep(_backoff(attempt))
+            attempt += 1
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_async_upstream: AsyncUpstream | None = None
+
+
+def get_async_upstream() -> AsyncUpstream:
+    global _async_upstream
+    if _async_upstream is None:
+        _async_upstream = AsyncUpstream()
+    return _async_upstream
+
+
+async def close_async_upstream() -> None:
+    global _async_upstream
+    if _async_upstream is not None:
+        await _async_upstream.aclose()
+        _async_upstream = None
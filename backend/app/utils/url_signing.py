@@ -0,0 +1,24 @@
+"""HMAC-signed query strings for API links opened without a bearer token.
+
+Video elements and plain download links cannot send an Authorization
+header, so such URLs carry ?expires=&sig= instead, with the signature
+binding a subject string (e.g. a media id) to the expiry time.
+"""
+import hashlib
+import hmac
+import time
+
+from app.config import settings
+
+
+def _signature(subject: str, expires: int) -> str:
+    secret = (settings.SIGNED_URL_SECRET or settings.SUPABASE_JWT_SECRET).encode()
+    return hmac.new(secret, f"{subject}:{expires}".encode(), hashlib.sha256).hexdigest()
+
+
+def signed_query(subject: str, expires: int) -> str:
+    return f"expires={expires}&sig={_signature(subject, expires)}"
+
+
+def verify_signed_query(subject: str, expires: int, sig: str) -> bool:
+    return expires > time.time() and hmac.compare_digest(sig, _signature(subject, expires))
@@ -0,0 +1,95 @@
+import asyncio
+
+import httpx
+
+from app.config import settings
+from app.utils.metrics import AUTH_REQUEST_ERRORS, AUTH_REQUEST_SECONDS, observe
+from app.utils.request_trace import traced
+from app.utils.ttl_cache import TTLCache
+from app.utils.upstream import AsyncUpstream, get_async_upstream
+
+_MISSING = object()
+
+_ADMIN_HEADERS = {
+    "apikey": settings.SUPABASE_SERVICE_ROLE_KEY,
+    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_ROLE_KEY}",
+}
+
+
+class UserDirectory:
+    """Resolves user ids to emails through the Supabase Auth admin API.
+
+    Lookups go through the API's shared AsyncUpstream (pool, retries and
+    the "auth" circuit breaker), at most concurrency at a time. Found
+    emails are cached for ttl seconds, and users the API reports as
+    missing for negative_ttl. Other error statuses resolve to None and
+    are not cached. An unreachable Auth (transport error, open circuit)
+    raises, so callers answer 503 instead of treating the user as
+    having no email.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300,
+        negative_ttl: float = 60,
+        concurrency: int = 10,
+        upstream: AsyncUpstream | None = None,
+    ):
+        self.negative_ttl = negative_ttl
+        self._cache = TTLCache(ttl=ttl)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # Resolved per lookup when None: the shared one is replaced after a
+        # lifespan restart (close_async_upstream), and this object outlives it
+        self._upstream = upstream
+
+    async def get_email(self, user_id: str) -> str | None:
+        return (await self.get_emails([user_id]))[user_id]
+
+    async def get_emails(self, user_ids: list[str]) -> dict[str, str | None]:
+        """Resolve many ids at once; uncached ids are fetched concurrently."""
+        result: dict[str, str | None] = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            email = self._cache.get(user_id, _MISSING)
+            if email is _MISSING:
+                missing.append(user_id)
+            else:
+                result[user_id] = email
+        if missing:
+            fetched = await asyncio.gather(*(self._fetch(user_id) for user_id in missing))
+            result.update(zip(missing, fetched))
+        return result
+
+    async def _fetch(self, user_id: str) -> str | None:
+        try:
+            async with self._semaphore:
+                with (
+                    traced("auth", "get_user"),
+                    observe(AUTH_REQUEST_SECONDS, AUTH_REQUEST_ERRORS, operation="get_user"),
+                ):
+                    resp = await (self._upstream or get_async_upstream()).request(
+                        "auth", "GET", f"/auth/v1/admin/users/{user_id}", query=True, headers=_ADMIN_HEADERS
+                    )
+                    if resp.status_code != 404:
+                        resp.raise_for_status()
+            if resp.status_code == 404:
+                self._cache.set(user_id, None, ttl=self.negative_ttl)
+                return None
+        except httpx.HTTPStatusError:
+            return None
+        email = resp.json().get("email")
+        self._cache.set(user_id, email)
+        return email
+
+    def forget(self, user_id: str) -> None:
+        self._cache.pop(user_id)
+
+
+_directory: UserDirectory | None = None
+
+
+def get_user_directory() -> UserDirectory:
+    global _directory
+    if _directory is None:
+        _directory = UserDirectory()
+    return _directory
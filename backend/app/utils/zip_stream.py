@@ -0,0 +1,126 @@
+"""Stream a ZIP64 archive of S3 objects without buffering any file.
+
+Objects are read through presigned GETs on an httpx.AsyncClient, so
+nothing blocks the event loop. Up to READ_AHEAD_FILES objects download
+concurrently while earlier entries are written; each hands its chunks
+over through a queue of CHUNKS_PER_FILE, which caps memory at roughly
+READ_AHEAD_FILES * CHUNKS_PER_FILE * CHUNK_SIZE however large the
+archive is.
+
+Entries are stored, not deflated: photos and videos are already
+compressed. zipfile writes them with data descriptors and ZIP64 headers
+because the output is not seekable, so files and archives past 4 GiB
+work.
+"""
+import asyncio
+from collections.abc import AsyncIterator
+from datetime import datetime
+import io
+import logging
+import zipfile
+
+import httpx
+
+from app.utils.presigner import get_presigner
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+READ_AHEAD_FILES = 4
+CHUNKS_PER_FILE = 8
+PRESIGN_SECONDS = 900
+
+_END = object()
+
+
+class _Sink(io.RawIOBase):
+    """Write-only, unseekable buffer that zipfile writes into and we drain."""
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _zip_info(name: str, modified: datetime | None) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(name)
+    if modified and modified.year >= 1980:
+        info.date_time = modified.timetuple()[:6]
+    info.compress_type = zipfile.ZIP_STORED
+    return info
+
+
+async def _fetch(client: httpx.AsyncClient, s3_key: str, queue: asyncio.Queue) -> None:
+    """Stream one object into queue, then _END; an exception is queued instead of raised."""
+    try:
+        url = get_presigner().presign(s3_key, expires_in=PRESIGN_SECONDS)
+        async with client.stream("GET", url) as resp:
+            if resp.status_code != 200:
+                # Not raise_for_status: its message would log the presigned URL
+                raise OSError(f"S3 returned HTTP {resp.status_code}")
+            async for chunk in resp.aiter_bytes(CHUNK_SIZE):
+                await queue.put(chunk)
+        await queue.put(_END)
+    except Exception as e:
+        await queue.put(e)
+
+
+async def stream_zip(entries: list[dict]) -> AsyncIterator[bytes]:
+    """Yield a ZIP archive of entries, each {"name", "s3_key", "modified"}.
+
+    An object that cannot be read at all is left out (and logged); one
+    that fails part-way raises, which aborts the response, since its
+    bytes have already been sent.
+    """
+    sink = _Sink()
+    archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED, allowZip64=True)
+    queues: list[asyncio.Queue] = []
+    tasks: list[asyncio.Task] = []
+
+    async with httpx.AsyncClient(timeout=httpx.Timeout(30.0, pool=None)) as client:
+
+        def start_next() -> None:
+            if len(tasks) < len(entries):
+                queue = asyncio.Queue(maxsize=CHUNKS_PER_FILE)
+                queues.append(queue)
+                tasks.append(asyncio.create_task(_fetch(client, entries[len(tasks)]["s3_key"], queue)))
+
+        try:
+            for _ in range(READ_AHEAD_FILES):
+                start_next()
+
+            for index, entry in enumerate(entries):
+                queue = queues[index]
+                item = await queue.get()
+                if isinstance(item, Exception):
+                    logger.warning("ZIP: skipping %s: %s", entry["s3_key"], item)
+                    start_next()
+                    continue
+
+                with archive.open(_zip_info(entry["name"], entry.get("modified")), "w", force_zip64=True) as out:
+                    while item is not _END:
+                        if isinstance(item, Exception):
+                            raise item
+                        out.write(item)
+                        yield sink.drain()
+                        item = await queue.get()
+                # The data descriptor, written when the entry closes
+                yield sink.drain()
+                # This entry's download is done; let the next one start
+                start_next()
+
+            archive.close()
+            yield sink.drain()
+        finally:
+            for task in tasks:
+                task.cancel()
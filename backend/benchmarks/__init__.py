@@ -0,0 +1,8 @@
+"""Benchmarks; run each module from backend/ with python -m benchmarks.<name>.
+
+None of them needs network access or real credentials: the settings app
+requires are filled with placeholders here, before any app module loads.
+"""
+from testing import use_placeholder_settings
+
+use_placeholder_settings()
@@ -0,0 +1,234 @@
+"""Benchmark the album and media services against in-memory backends.
+
+Run from backend/:
+
+    python -m benchmarks.service_bench [--albums 10,100,1000] [--media 20]
+        [--family 3] [--invites 5] [--latency-ms 2] [--repeat 20]
+        [--output results.json] [--baseline previous.json]
+
+PostgREST is FakeSupabaseDB, with --latency-ms injected per call; S3 is
+moto's in-process mock, so nothing leaves the machine. For every album
+count it generates a fresh dataset and times each service call:
+
+- wall time (min / median / mean over --repeat runs), with the album
+  access cache and view-URL cache cleared before every run;
+- upstream calls, by kind (db, s3, auth, sign) and by verb and table;
+- peak memory allocated during one extra run, under tracemalloc.
+
+Results go to --output as JSON (default benchmarks/results/, which git
+ignores). --baseline prints each case's median against an earlier file.
+Needs moto, from requirements-dev.txt.
+"""
+import argparse
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import json
+from pathlib import Path
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from app.config import settings
+from app.services import album_service, media_service
+from app.utils import s3_client
+from app.utils.request_trace import recording
+from testing.datagen import Dataset, generate
+from testing.fake_supabase import FakeSupabaseDB
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[Dataset, FakeSupabaseDB], Awaitable]
+    # Puts the data back after a run that changed it; not timed
+    reset: Callable[[Dataset, FakeSupabaseDB], None] | None = None
+
+
+def _middle(items: list):
+    return items[len(items) // 2]
+
+
+def _restore_last_album(ds: Dataset, db: FakeSupabaseDB) -> None:
+    album_id = ds.album_ids[-1]
+    media_ids = [link["media_id"] for link in db.tables["album_media"] if link["album_id"] == album_id]
+    db.set("albums", {"deleted_at": None}, {"id": album_id})
+    db.set("media", {"deleted_at": None}, {"id": media_ids})
+
+
+CASES = [
+    Case("list_albums", lambda ds, db: album_service.list_albums(ds.owner_id, None, "recent", db)),
+    Case("list_shared_albums", lambda ds, db: album_service.list_shared_albums(ds.member_ids[0], db)),
+    Case("list_album_media", lambda ds, db: album_service.list_album_media(ds.member_ids[0], ds.album_ids[0], db)),
+    Case("get_download_url", lambda ds, db: media_service.get_download_url(ds.member_ids[0], _middle(ds.media_ids), db)),
+    Case(
+        "delete_album",
+        lambda ds, db: album_service.delete_album(ds.owner_id, ds.album_ids[-1], db),
+        reset=_restore_last_album,
+    ),
+]
+
+
+def _clear_caches() -> None:
+    album_service._access_cache.clear()
+    s3_client._view_url_cache.clear()
+
+
+async def _bench_case(case: Case, ds: Dataset, db: FakeSupabaseDB, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        _clear_caches()
+        start = time.perf_counter()
+        await case.run(ds, db)
+        timings.append(time.perf_counter() - start)
+        if case.reset:
+            case.reset(ds, db)
+
+    # Call counts do not depend on timing; take them from one traced run
+    _clear_caches()
+    db.reset_calls()
+    with recording() as trace:
+        await case.run(ds, db)
+    db_calls = {f"{verb} {table}": n for (verb, table), n in sorted(db.calls.items())}
+    if case.reset:
+        case.reset(ds, db)
+
+    _clear_caches()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    await case.run(ds, db)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if case.reset:
+        case.reset(ds, db)
+
+    return {
+        "case": case.name,
+        "wall_ms": {
+            "min": min(timings) * 1000,
+            "median": statistics.median(timings) * 1000,
+            "mean": statistics.fmean(timings) * 1000,
+        },
+        "round_trips": trace.round_trips,
+        "calls": dict(trace.calls),
+        "db_calls": db_calls,
+        "alloc_peak_kib": (peak - baseline) / 1024,
+    }
+
+
+async def _run(args) -> list[dict]:
+    results = []
+    for n_albums in args.albums:
+        db = FakeSupabaseDB(latency=args.latency_ms / 1000, jitter=args.jitter, seed=args.seed)
+        ds = generate(db, n_albums, args.media, args.family, args.invites, seed=args.seed)
+        _put_download_target(ds, db)
+        for case in CASES:
+            result = await _bench_case(case, ds, db, args.repeat)
+            result.update(
+                n_albums=n_albums,
+                media_per_album=args.media,
+                family_members=args.family,
+                pending_invites=args.invites,
+            )
+            results.append(result)
+            print(
+                f"{case.name:<20} albums={n_albums:<6} median {result['wall_ms']['median']:9.2f} ms  "
+                f"round trips {result['round_trips']:4d}  peak {result['alloc_peak_kib']:9.1f} KiB"
+            )
+    return results
+
+
+def _put_download_target(ds: Dataset, db: FakeSupabaseDB) -> None:
+    """Store the object get_download_url signs, as an upload would have."""
+    media_id = _middle(ds.media_ids)
+    media = next(m for m in db.tables["media"] if m["id"] == media_id)
+    s3_client.put_s3_object(media["s3_key"], b"\xff\xd8\xff", media["content_type"])
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _compare(results: list[dict], baseline_path: Path) -> None:
+    baseline = {
+        (r["case"], r["n_albums"]): r for r in json.loads(baseline_path.read_text())["results"]
+    }
+    print(f"\nagainst {baseline_path}:")
+    for result in results:
+        before = baseline.get((result["case"], result["n_albums"]))
+        if before is None:
+            continue
+        ratio = result["wall_ms"]["median"] / before["wall_ms"]["median"] if before["wall_ms"]["median"] else 0.0
+        print(
+            f"{result['case']:<20} albums={result['n_albums']:<6} median {ratio:6.2f}x  "
+            f"round trips {before['round_trips']} -> {result['round_trips']}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--albums", type=lambda s: [int(n) for n in s.split(",")], default=[10, 100, 1000],
+                        help="comma-separated album counts (N)")
+    parser.add_argument("--media", type=int, default=20, help="media per album (M)")
+    parser.add_argument("--family", type=int, default=3, help="accepted family members (K), at least 1")
+    parser.add_argument("--invites", type=int, default=5, help="pending album invites (P)")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="injected latency per PostgREST call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, as a fraction of it")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path, help="earlier results file to compare against")
+    args = parser.parse_args()
+    if args.family < 1 or args.media < 1 or min(args.albums) < 1:
+        parser.error("--family, --media and every --albums count must be at least 1")
+
+    try:
+        from moto import mock_aws
+    except ImportError:
+        raise SystemExit("service_bench needs moto: pip install -r requirements-dev.txt")
+
+    started = datetime.now(timezone.utc)
+    with mock_aws():
+        s3_client.get_s3_client().create_bucket(
+            Bucket=settings.S3_BUCKET_NAME,
+            CreateBucketConfiguration={"LocationConstraint": settings.AWS_REGION},
+        )
+        results = asyncio.run(_run(args))
+
+    output = args.output or RESULTS_DIR / f"service_bench-{started:%Y%m%dT%H%M%SZ}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "benchmark": "service_bench",
+        "created_at": started.isoformat(),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": {
+            "media_per_album": args.media,
+            "family_members": args.family,
+            "pending_invites": args.invites,
+            "latency_ms": args.latency_ms,
+            "jitter": args.jitter,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }, indent=2))
+    print(f"\nwrote {output}")
+    if args.baseline:
+        _compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
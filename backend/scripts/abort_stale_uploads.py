@@ -0,0 +1,38 @@
+"""Abort multipart uploads that were started but never completed.
+
+S3 keeps (and bills) the parts of an unfinished upload until it is
+aborted. Run from backend/, e.g. hourly from cron:
+
+    python -m scripts.abort_stale_uploads [--max-age 86400] [--dry-run]
+
+A bucket lifecycle rule with AbortIncompleteMultipartUpload achieves the
+same on AWS; this script also works against S3 stand-ins and lets the
+cut-off follow MULTIPART_MAX_AGE_SECONDS.
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from app.config import settings
+from app.utils.s3_client import abort_multipart_upload, list_multipart_uploads
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-age", type=int, default=settings.MULTIPART_MAX_AGE_SECONDS)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=args.max_age)
+    aborted = 0
+    for upload in list_multipart_uploads():
+        if upload["initiated"] >= cutoff:
+            continue
+        print(f"{'would abort' if args.dry_run else 'aborting'} {upload['s3_key']} (started {upload['initiated']})")
+        if not args.dry_run:
+            abort_multipart_upload(upload["s3_key"], upload["upload_id"])
+        aborted += 1
+    print(f"{aborted} stale uploads")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Fill albums.media_count / cover_media_id_effective / last_added_at / total_bytes.
+
+Run once after applying migration 007, from backend/:
+
+    python -m scripts.backfill_album_stats [--batch-size 500]
+
+Safe to re-run: refresh_album_stats recomputes from album_media, so the
+triggers and this script always converge on the same values.
+"""
+import argparse
+
+from app.utils.supabase_client import Op, SupabaseDB
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    supabase = SupabaseDB()
+    last_id = None
+    done = 0
+    while True:
+        filters = {"id": Op("gt", last_id)} if last_id else None
+        rows = supabase.select("albums", filters=filters, order="id.asc", columns="id", limit=args.batch_size)
+        if not rows:
+            break
+        album_ids = [row["id"] for row in rows]
+        supabase.rpc("refresh_album_stats", {"album_ids": album_ids})
+        done += len(album_ids)
+        last_id = album_ids[-1]
+        print(f"refreshed {done} albums")
+    supabase.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Render pending image derivatives (thumbnails and previews).
+
+POST /media renders a few at a time in a background task; this worker
+backfills existing images after migration 009 and picks up everything
+the API left pending. Run from backend/:
+
+    python -m scripts.process_derivatives --once [--retry-failed]
+    python -m scripts.process_derivatives --interval 60
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from app.services.derivative_service import process_media_derivatives, requeue_stale_claims
+from app.utils.supabase_client import Op, SupabaseDB
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="drain the queue once and exit")
+    parser.add_argument("--interval", type=float, default=60, help="seconds between passes")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--retry-failed", action="store_true", help="requeue images that failed before")
+    args = parser.parse_args()
+
+    supabase = SupabaseDB()
+    if args.retry_failed:
+        supabase.update("media", values={"derivatives_status": "pending"}, filters={"derivatives_status": "failed"})
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        while True:
+            requeued = requeue_stale_claims(supabase)
+            if requeued:
+                print(f"requeued {requeued} images claimed by a renderer that stopped")
+            done = 0
+            errored: set[str] = set()
+            # Rows that raised stay pending; skip them for the rest of the pass
+            # (bounded, so the not.in filter keeps a sane URL length)
+            while len(errored) <= 250:
+                filters = {"derivatives_status": "pending", "deleted_at": None}
+                if errored:
+                    filters["id"] = Op("not.in", list(errored))
+                rows = supabase.select(
+                    "media",
+                    filters=filters,
+                    order="created_at.asc",
+                    columns="id",
+                    limit=args.batch_size,
+                )
+                ids = [row["id"] for row in rows]
+                if not ids:
+                    break
+                for media_id, future in [(i, pool.submit(process_media_derivatives, i, supabase)) for i in ids]:
+                    try:
+                        if future.result() is not None:
+                            done += 1
+                    except Exception as e:
+                        print(f"media {media_id}: {e}")
+                        errored.add(media_id)
+            print(f"processed {done} images ({len(errored)} left pending)")
+            if args.once:
+                break
+            time.sleep(args.interval)
+    supabase.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Package pending videos as HLS and render their poster frames.
+
+POST /media only queues videos (video_status='pending'); this worker does
+the transcoding, so run it wherever ffmpeg and spare CPU are available.
+Migration 010 queues existing videos as well. Run from backend/:
+
+    python -m scripts.process_videos --once [--retry-failed]
+    python -m scripts.process_videos --interval 30
+
+FFMPEG_PATH points at the ffmpeg binary (default: "ffmpeg" on PATH).
+"""
+import argparse
+import time
+
+from app.services.video_service import process_video, requeue_stale_claims
+from app.utils.supabase_client import Op, SupabaseDB
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="drain the queue once and exit")
+    parser.add_argument("--interval", type=float, default=30, help="seconds between passes")
+    parser.add_argument("--retry-failed", action="store_true", help="requeue videos that failed before")
+    args = parser.parse_args()
+
+    supabase = SupabaseDB()
+    if args.retry_failed:
+        supabase.update("media", values={"video_status": "pending"}, filters={"video_status": "failed"})
+
+    # One video at a time: ffmpeg already uses every core. Several workers
+    # may run side by side; each claims its video before transcoding
+    while True:
+        requeued = requeue_stale_claims(supabase)
+        if requeued:
+            print(f"requeued {requeued} videos claimed by a worker that stopped")
+        done = 0
+        errored: set[str] = set()
+        # Rows that raised stay pending; skip them for the rest of the pass
+        while len(errored) <= 250:
+            filters = {"video_status": "pending", "deleted_at": None}
+            if errored:
+                filters["id"] = Op("not.in", list(errored))
+            rows = supabase.select("media", filters=filters, order="created_at.asc", columns="id", limit=1)
+            if not rows:
+                break
+            media_id = rows[0]["id"]
+            try:
+                if process_video(media_id, supabase) is not None:
+                    done += 1
+            except Exception as e:
+                print(f"media {media_id}: {e}")
+                errored.add(media_id)
+        print(f"processed {done} videos ({len(errored)} left pending)")
+        if args.once:
+            break
+        time.sleep(args.interval)
+    supabase.close()
+
+
+if __name__ == "__main__":
+    main()
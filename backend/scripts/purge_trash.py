@@ -0,0 +1,41 @@
+"""Purge trashed media and albums older than TRASH_RETENTION_SECONDS.
+
+Run from backend/, either once (e.g. from cron) or as a long-lived worker:
+
+    python -m scripts.purge_trash --once
+    python -m scripts.purge_trash --interval 300
+"""
+import argparse
+import time
+
+from app.config import settings
+from app.services.purge_service import purge_trash
+from app.utils.supabase_client import SupabaseDB
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    parser.add_argument("--interval", type=float, default=300, help="seconds between passes")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--retention", type=int, default=settings.TRASH_RETENTION_SECONDS)
+    args = parser.parse_args()
+
+    supabase = SupabaseDB()
+    try:
+        while True:
+            result = purge_trash(supabase, args.retention, batch_size=args.batch_size)
+            print(
+                f"purged {result['media_purged']} media, {result['albums_purged']} albums,"
+                f" {result['blobs_purged']} shared files"
+                f" ({result['media_failed']} media left for the next pass)"
+            )
+            if args.once:
+                break
+            time.sleep(args.interval)
+    finally:
+        supabase.close()
+
+
+if __name__ == "__main__":
+    main()
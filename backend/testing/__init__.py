@@ -0,0 +1,23 @@
+"""Shared helpers for tests/ and benchmarks/: an in-memory PostgREST
+(fake_supabase) and a synthetic data generator (datagen).
+
+Neither needs network access or real credentials. Call
+use_placeholder_settings() before any app module loads to fill the
+settings app requires with placeholders.
+"""
+import os
+
+PLACEHOLDER_SETTINGS = {
+    "SUPABASE_URL": "http://localhost:54321",
+    "SUPABASE_SERVICE_ROLE_KEY": "bench",
+    "SUPABASE_JWT_SECRET": "bench",
+    "AWS_ACCESS_KEY_ID": "AKIDBENCHMARK",
+    "AWS_SECRET_ACCESS_KEY": "bench-secret",
+    "S3_BUCKET_NAME": "family-album-bench",
+}
+
+
+def use_placeholder_settings() -> None:
+    """Set every unset required setting to its placeholder."""
+    for name, value in PLACEHOLDER_SETTINGS.items():
+        os.environ.setdefault(name, value)
@@ -0,0 +1,147 @@
+"""Synthetic family-album data for the service benchmarks and tests.
+
+generate() builds one owner with n_albums albums of media_per_album
+items each, family_members accepted family members and pending_invites
+pending album invites. The first member is also a collaborator on a
+tenth of the albums, so list_shared_albums walks both of its paths.
+Columns the database maintains through triggers (album stats, effective
+cover, content_version) are filled in here, since FakeSupabaseDB has no
+triggers. The same seed always gives the same rows.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+import random
+import uuid
+
+from testing.fake_supabase import FakeSupabaseDB
+
+_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass
+class Dataset:
+    owner_id: str
+    member_ids: list[str]
+    album_ids: list[str]
+    media_ids: list[str]
+    rows: dict[str, int] = field(default_factory=dict)
+
+
+def generate(
+    db: FakeSupabaseDB,
+    n_albums: int,
+    media_per_album: int,
+    family_members: int = 3,
+    pending_invites: int = 5,
+    seed: int = 0,
+) -> Dataset:
+    rng = random.Random(seed)
+
+    def new_id() -> str:
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    def timestamp(seconds: int) -> str:
+        return (_EPOCH + timedelta(seconds=seconds)).isoformat()
+
+    owner_id = new_id()
+    member_ids = [new_id() for _ in range(family_members)]
+    albums, media, links = [], [], []
+    clock = 0
+
+    for a in range(n_albums):
+        album_id = new_id()
+        album_media = []
+        for m in range(media_per_album):
+            clock += rng.randint(1, 600)
+            media_id = new_id()
+            is_video = rng.random() < 0.1
+            filename = f"{'VID' if is_video else 'IMG'}_{a:04d}_{m:04d}.{'mp4' if is_video else 'jpg'}"
+            s3_key = f"family-album/{owner_id}/{media_id}-{filename}"
+            media.append({
+                "id": media_id,
+                "user_id": owner_id,
+                "s3_key": s3_key,
+                "type": "video" if is_video else "image",
+                "filename": filename,
+                "content_type": "video/mp4" if is_video else "image/jpeg",
+                "size_bytes": rng.randint(50, 200) * 1024 * (40 if is_video else 1),
+                "created_at": timestamp(clock),
+                "deleted_at": None,
+                "thumb_key": f"{s3_key}.thumb.webp",
+                "preview_key": f"{s3_key}.preview.webp",
+                "derivatives_status": "ready",
+                "video_status": "ready" if is_video else None,
+                "hls_prefix": f"family-album/{owner_id}/hls/{media_id}/" if is_video else None,
+                "hls_renditions": [{"name": "720p", "height": 720, "bandwidth": 2_800_000}] if is_video else None,
+                "sha256": None,
+            })
+            album_media.append(media[-1])
+            links.append({"album_id": album_id, "media_id": media_id, "added_at": timestamp(clock)})
+
+        albums.append({
+            "id": album_id,
+            "user_id": owner_id,
+            "folder_id": None,
+            "name": f"Album {a:04d}",
+            "description": None,
+            "visibility": "private",
+            "cover_media_id": None,
+            "created_at": timestamp(clock),
+            "updated_at": timestamp(clock),
+            "deleted_at": None,
+            "content_version": 1,
+            # Maintained by triggers in the real database
+            "media_count": len(album_media),
+            "total_bytes": sum(m["size_bytes"] for m in album_media),
+            "last_added_at": timestamp(clock) if album_media else None,
+            "cover_media_id_effective": album_media[0]["id"] if album_media else None,
+        })
+
+    family = [
+        {
+            "id": new_id(),
+            "owner_id": owner_id,
+            "member_id": member_id,
+            "invited_email": f"member{i}@example.com",
+            "role": rng.choice(["viewer", "contributor"]),
+            "status": "accepted",
+            "token": new_id(),
+            "created_at": timestamp(i),
+        }
+        for i, member_id in enumerate(member_ids)
+    ]
+    collaborators = [
+        {"album_id": album["id"], "user_id": member_ids[0], "role": "viewer", "created_at": timestamp(0)}
+        for album in albums[::10]
+    ] if member_ids else []
+    invites = [
+        {
+            "id": new_id(),
+            "album_id": rng.choice(albums)["id"],
+            "invited_email": f"invitee{i}@example.com",
+            "role": "viewer",
+            "token": new_id(),
+            "status": "pending",
+            "expires_at": timestamp(clock + 7 * 86400),
+            "created_at": timestamp(clock),
+        }
+        for i in range(pending_invites if albums else 0)
+    ]
+
+    tables = {
+        "albums": albums,
+        "media": media,
+        "album_media": links,
+        "family_members": family,
+        "album_collaborators": collaborators,
+        "album_invites": invites,
+    }
+    for table, rows in tables.items():
+        db.load(table, rows)
+    return Dataset(
+        owner_id=owner_id,
+        member_ids=member_ids,
+        album_ids=[a["id"] for a in albums],
+        media_ids=[m["id"] for m in media],
+        rows={table: len(rows) for table, rows in tables.items()},
+    )
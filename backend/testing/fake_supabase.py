@@ -0,0 +1,254 @@
+"""In-memory stand-in for AsyncSupabaseDB, with injectable latency.
+
+FakeSupabaseDB implements the same methods as AsyncSupabaseDB over plain
+lists of dicts, so services can be timed without a database. It supports
+what the services send: eq/in/is.null filters, Op operators (lt, gt, lte,
+gte, neq, not.is, not.in), "order" strings, limit/offset/range, plain
+column lists and the album_media -> media embed (media(...) or
+media!inner(...), with "media.<column>" filters).
+
+Each call first sleeps latency seconds (plus up to jitter * latency), so
+concurrent calls overlap the way PostgREST round trips do. Calls are
+counted per (verb, table) and reported to the current request trace like
+the real client's.
+
+There are no triggers: the data generator fills the columns they maintain
+(media_count, cover_media_id_effective, ...) and writes here leave them
+as they are. Equality lookups use per-column hash indexes, so the fake's
+own CPU stays small next to the code being measured.
+"""
+import asyncio
+from collections import Counter, defaultdict
+import random
+import uuid
+
+from app.utils.request_trace import traced
+from app.utils.supabase_client import Op
+
+_EMBED_PREFIXES = ("media(", "media!inner(")
+
+
+class FakeSupabaseDB:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.tables: dict[str, list[dict]] = defaultdict(list)
+        self.calls: Counter[tuple[str, str]] = Counter()
+        self._random = random.Random(seed)
+        # (table, column) -> value -> [(position, row)]; dropped whenever the table is written
+        self._indexes: dict[tuple[str, str], dict] = {}
+
+    # ── Interface ──────────────────────────────────────────────────────
+
+    async def insert(self, table: str, row: dict | list[dict]) -> list[dict]:
+        await self._round_trip("insert", table)
+        rows = [dict(r) for r in (row if isinstance(row, list) else [row])]
+        for r in rows:
+            r.setdefault("id", str(uuid.uuid4()))
+        self.load(table, rows)
+        return [dict(r) for r in rows]
+
+    async def upsert(
+        self,
+        table: str,
+        rows: dict | list[dict],
+        on_conflict: str | None = None,
+        ignore_duplicates: bool = False,
+    ) -> list[dict]:
+        await self._round_trip("upsert", table)
+        columns = (on_conflict or "id").split(",")
+        result = []
+        for row in rows if isinstance(rows, list) else [rows]:
+            existing = self._rows(table, {c: row[c] for c in columns})
+            if existing:
+                if not ignore_duplicates:
+                    existing[0].update(row)
+                    result.append(dict(existing[0]))
+            else:
+                self.load(table, [dict(row)])
+                result.append(dict(row))
+        self._indexes_dirty(table)
+        return result
+
+    async def select(
+        self,
+        table: str,
+        filters: dict | None = None,
+        order: str | None = None,
+        columns: str = "*",
+        limit: int | None = None,
+        offset: int | None = None,
+        range: tuple[int, int] | None = None,
+    ) -> list[dict]:
+        await self._round_trip("select", table, filters)
+        own = {k: v for k, v in (filters or {}).items() if "." not in k}
+        embedded = {k.split(".", 1)[1]: v for k, v in (filters or {}).items() if "." in k}
+        rows = self._rows(table, own)
+        if order:
+            rows = _ordered(rows, order)
+
+        embed = next((c for c in _split_columns(columns) if c.startswith(_EMBED_PREFIXES)), None)
+        if embed:
+            inner = embed.startswith("media!inner(")
+            media_columns = embed[embed.index("(") + 1:-1]
+            joined = []
+            for row in rows:
+                media = self._rows("media", {"id": row["media_id"], **embedded})
+                if inner and not media:
+                    continue
+                joined.append({**row, "media": _project(media[0], media_columns) if media else None})
+            rows = joined
+
+        if range is not None:
+            offset, limit = range[0], range[1] - range[0] + 1
+        rows = rows[offset or 0:]
+        if limit is not None:
+            rows = rows[:limit]
+        plain = ",".join(c for c in _split_columns(columns) if not c.startswith(_EMBED_PREFIXES))
+        return [{**_project(r, plain), **({"media": r["media"]} if embed else {})} for r in rows]
+
+    async def count(self, table: str, filters: dict | None = None, method: str = "exact") -> int:
+        await self._round_trip("count", table, filters)
+        return len(self._rows(table, filters))
+
+    async def update(self, table: str, values: dict, filters: dict) -> list[dict]:
+        await self._round_trip("update", table, filters)
+        rows = self._rows(table, filters)
+        for row in rows:
+            row.update(values)
+        self._indexes_dirty(table)
+        return [dict(r) for r in rows]
+
+    async def delete(self, table: str, filters: dict) -> list[dict]:
+        await self._round_trip("delete", table, filters)
+        doomed = {id(r) for r in self._rows(table, filters)}
+        gone = [r for r in self.tables[table] if id(r) in doomed]
+        self.tables[table] = [r for r in self.tables[table] if id(r) not in doomed]
+        self._indexes_dirty(table)
+        return gone
+
+    async def rpc(self, function: str, args: dict | None = None):
+        await self._round_trip("rpc", function)
+        raise NotImplementedError(f"FakeSupabaseDB has no RPC {function!r}")
+
+    async def aclose(self) -> None:
+        pass
+
+    # ── Setup ──────────────────────────────────────────────────────────
+
+    def load(self, table: str, rows: list[dict]) -> None:
+        """Add rows directly: no latency, not counted."""
+        self.tables[table].extend(rows)
+        self._indexes_dirty(table)
+
+    def set(self, table: str, values: dict, filters: dict) -> None:
+        """Update rows directly: no latency, not counted."""
+        for row in self._rows(table, filters):
+            row.update(values)
+        self._indexes_dirty(table)
+
+    def reset_calls(self) -> None:
+        self.calls.clear()
+
+    # ── Internals ──────────────────────────────────────────────────────
+
+    async def _round_trip(self, verb: str, table: str, filters: dict | None = None) -> None:
+        self.calls[verb, table] += 1
+        with traced("db", f"{verb} {table}({','.join(sorted(filters or ()))})"):
+            if self.latency:
+                await asyncio.sleep(self.latency * (1 + self.jitter * self._random.random()))
+
+    def _indexes_dirty(self, table: str) -> None:
+        for key in [k for k in self._indexes if k[0] == table]:
+            del self._indexes[key]
+
+    def _index(self, table: str, column: str) -> dict:
+        index = self._indexes.get((table, column))
+        if index is None:
+            index = defaultdict(list)
+            for position, row in enumerate(self.tables[table]):
+                index[_key(row.get(column))].append((position, row))
+            self._indexes[table, column] = index
+        return index
+
+    def _rows(self, table: str, filters: dict | None) -> list[dict]:
+        """Matching rows, in insertion order; the dicts are the stored ones."""
+        filters = dict(filters or {})
+        candidates = None
+        # Narrow with the first equality or in-list filter, then check the rest
+        for column, value in filters.items():
+            if column in ("or", "and") or isinstance(value, Op) or value is None:
+                continue
+            index = self._index(table, column)
+            values = value if isinstance(value, (list, tuple, set, frozenset)) else [value]
+            hits = [hit for v in dict.fromkeys(_key(v) for v in values) for hit in index.get(v, ())]
+            candidates = [row for _, row in sorted(hits, key=lambda hit: hit[0])]
+            del filters[column]
+            break
+        if candidates is None:
+            candidates = self.tables[table]
+        return [r for r in candidates if all(_matches(r, c, v) for c, v in filters.items())]
+
+
+def _key(value) -> str | None:
+    # PostgREST compares as text on the wire; so does the fake
+    return None if value is None else str(value)
+
+
+def _matches(row: dict, column: str, value) -> bool:
+    if column in ("or", "and"):
+        raise NotImplementedError("FakeSupabaseDB does not evaluate or/and logic trees")
+    actual = row.get(column)
+    if value is None:
+        return actual is None
+    if isinstance(value, Op):
+        op, expected = value.operator, value.value
+        if op == "not.is":
+            return actual is not None
+        if op == "not.in":
+            return _key(actual) not in {_key(v) for v in expected}
+        if actual is None:
+            return False
+        a, b = _key(actual), _key(expected)
+        comparisons = {"eq": a == b, "neq": a != b, "lt": a < b, "lte": a <= b, "gt": a > b, "gte": a >= b}
+        if op not in comparisons:
+            raise NotImplementedError(f"FakeSupabaseDB does not support the {op!r} operator")
+        return comparisons[op]
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return _key(actual) in {_key(v) for v in value}
+    return _key(actual) == _key(value)
+
+
+def _ordered(rows: list[dict], order: str) -> list[dict]:
+    rows = list(rows)
+    for part in reversed(order.split(",")):
+        column, *modifiers = part.split(".")
+        descending = "desc" in modifiers
+        nulls_last = "nullslast" in modifiers or ("nullsfirst" not in modifiers and not descending)
+        present = sorted((r for r in rows if r.get(column) is not None), key=lambda r: r[column], reverse=descending)
+        missing = [r for r in rows if r.get(column) is None]
+        rows = present + missing if nulls_last else missing + present
+    return rows
+
+
+def _split_columns(columns: str) -> list[str]:
+    """Split a select list on top-level commas only."""
+    parts, depth, current = [], 0, ""
+    for ch in columns:
+        if ch == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        depth += ch == "("
+        depth -= ch == ")"
+        current += ch
+    if current:
+        parts.append(current)
+    return [p.strip() for p in parts]
+
+
+def _project(row: dict, columns: str) -> dict:
+    names = _split_columns(columns)
+    if not names or "*" in names:
+        return dict(row)
+    return {name: row.get(name) for name in names}
@@ -0,0 +1,7 @@
+# Test dependencies: pip install -r requirements-dev.txt (from backend/)
+#
+# Fills the settings app requires with placeholders before any app module
+# loads; the tests, like the benchmarks, need no network or credentials
+from testing import use_placeholder_settings
+
+use_placeholder_settings()
@@ -0,0 +1,85 @@
+"""Round-trip budget and N+1 detection (app/utils/request_trace.py) in strict mode."""
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+from app.config import settings
+from app.services import album_service
+from app.utils.request_trace import RequestTraceMiddleware, RoundTripBudgetExceeded, recording
+from testing.datagen import generate
+from testing.fake_supabase import FakeSupabaseDB
+
+
+@pytest.fixture
+def strict(monkeypatch):
+    monkeypatch.setattr(settings, "REQUEST_BUDGET_STRICT", True)
+
+
+def _app(handler) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestTraceMiddleware)
+    app.get("/")(handler)
+    return app
+
+
+def _strict_recording():
+    return recording(settings.REQUEST_ROUNDTRIP_BUDGET, settings.REQUEST_REPEAT_THRESHOLD, strict=True)
+
+
+def test_per_row_select_loop_fails_the_request(strict):
+    db = FakeSupabaseDB()
+    ds = generate(db, n_albums=20, media_per_album=1)
+
+    async def handler():
+        for album_id in ds.album_ids:
+            await db.select("albums", filters={"id": album_id})
+
+    with TestClient(_app(handler)) as client, pytest.raises(RoundTripBudgetExceeded, match="N\\+1"):
+        client.get("/")
+
+
+def test_batched_select_passes(strict):
+    db = FakeSupabaseDB()
+    ds = generate(db, n_albums=20, media_per_album=1)
+
+    async def handler():
+        return len(await db.select("albums", filters={"id": ds.album_ids}))
+
+    with TestClient(_app(handler)) as client:
+        resp = client.get("/")
+    assert resp.json() == 20
+    assert resp.headers["server-timing"].startswith("db;")
+
+
+def test_round_trip_budget_fails_the_request(strict, monkeypatch):
+    monkeypatch.setattr(settings, "REQUEST_ROUNDTRIP_BUDGET", 3)
+    db = FakeSupabaseDB()
+
+    async def handler():
+        for table in ("albums", "media", "album_media", "folders"):
+            await db.select(table)
+
+    with TestClient(_app(handler)) as client, pytest.raises(RoundTripBudgetExceeded, match="more than 3"):
+        client.get("/")
+
+
+def test_list_shared_albums_stays_batched():
+    db = FakeSupabaseDB()
+    ds = generate(db, n_albums=200, media_per_album=2)
+    with _strict_recording() as trace:
+        albums = asyncio.run(album_service.list_shared_albums(ds.member_ids[0], db))
+    assert len(albums) == 200
+    assert trace.round_trips <= 5
+
+
+def test_chunked_album_updates_are_not_flagged():
+    # More ids than the repeat threshold times the chunk size
+    db = FakeSupabaseDB()
+    ds = generate(db, n_albums=1, media_per_album=1500)
+    with _strict_recording():
+        asyncio.run(album_service.delete_album(ds.owner_id, ds.album_ids[0], db))
+    with _strict_recording():
+        asyncio.run(album_service.restore_album(ds.owner_id, ds.album_ids[0], db))
+    assert db.calls["update", "media"] == 12
@@ -8,6 +8,7 @@ import { useAlbumMedia } from "@/hooks/useAlbumMedia";
 import { MediaItem } from "@/types";
 import ConfirmDialog from "@/components/ui/ConfirmDialog";
 import ShareModal from "@/components/albums/ShareModal";
+import { API_URL, apiFetch } from "@/lib/api";
 
 export default function AlbumDetailPage({ params }: { params: Promise<{ id: string }> }) {
   const { id } = use(params);
@@ -23,10 +24,24 @@ function AlbumContent({ albumId }: { albumId: string }) {
   const { media, album, albumName, loading, error, refetch, removeMedia } = useAlbumMedia(albumId);
   const [deleteTarget, setDeleteTarget] = useState<MediaItem | null>(null);
   const [showShare, setShowShare] = useState(false);
+  const [downloading, setDownloading] = useState(false);
 
   const isOwner = album?.my_role === "owner";
   const canUpload = album?.my_role === "owner" || album?.my_role === "contributor";
 
+  const handleDownload = async () => {
+    setDownloading(true);
+    try {
+      // A signed link: the browser streams the ZIP straight to disk
+      const { download_url } = await apiFetch<{ download_url: string }>(`/albums/${albumId}/download`);
+      window.location.href = `${API_URL}${download_url}`;
+    } catch {
+      alert("Failed to download album.");
+    } finally {
+      setDownloading(false);
+    }
+  };
+
   const confirmDelete = async () => {
     if (!deleteTarget) return;
     try {
@@ -63,6 +78,18 @@ function AlbumContent({ albumId }: { albumId: string }) {
         </div>
 
         <div className="flex items-center gap-2">
+          {media.length > 0 && (
+            <button
+              onClick={handleDownload}
+              disabled={downloading}
+              className="inline-flex items-center gap-1.5 px-4 py-2 rounded-full border border-gray-200 text-gray-700 font-medium text-sm hover:bg-gray-50 transition-colors disabled:opacity-50"
+            >
+              <svg className="w-4 h-4" fill="none" viewBox="0 0 24 24" stroke="currentColor" strokeWidth={2}>
+                <path strokeLinecap="round" strokeLinejoin="round" d="M4 16v2a2 2 0 002 2h12a2 2 0 002-2v-2M7 10l5 5 5-5M12 15V3" />
+              </svg>
+              {downloading ? "Preparing…" : "Download"}
+            </button>
+          )}
           {isOwner && (
             <button
               onClick={() => setShowShare(true)}
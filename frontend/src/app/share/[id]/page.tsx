@@ -30,7 +30,7 @@ export default function SharePage({ params }: { params: Promise<{ id: string }>
       try {
         const [albumData, mediaData] = await Promise.all([
           publicFetch<Album>(`/public/albums/${id}`),
-          publicFetch<MediaItem[]>(`/public/albums/${id}/media`),
+          publicFetch<MediaItem[]>(`/public/albums/${id}/media?paginate=false`),
         ]);
         setAlbum(albumData);
         setMedia(mediaData);
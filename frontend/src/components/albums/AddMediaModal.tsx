@@ -25,7 +25,7 @@ export default function AddMediaModal({
   useEffect(() => {
     async function fetchAll() {
       try {
-        const data = await apiFetch<MediaItem[]>("/media");
+        const data = await apiFetch<MediaItem[]>("/media?paginate=false");
         // Filter out media already in this album
         const available = data.filter((m) => !existingMediaIds.includes(m.id));
         setAllMedia(available);
@@ -128,7 +128,7 @@ export default function AddMediaModal({
                       />
                     ) : (
                       <img
-                        src={item.view_url}
+                        src={item.thumb_url ?? item.view_url}
                         alt={item.filename || ""}
                         className="w-full h-full object-cover"
                       />
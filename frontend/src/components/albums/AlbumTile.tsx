@@ -15,7 +15,7 @@ export default function AlbumTile({ album, onDelete }: AlbumTileProps) {
         <div className="aspect-[4/3] rounded-xl overflow-hidden border border-purple-100 bg-purple-50">
           {album.cover_url ? (
             <img
-              src={album.cover_url}
+              src={album.cover_preview_url ?? album.cover_url}
               alt={album.name}
               className="w-full h-full object-cover transition-transform duration-300 group-hover:scale-105"
             />
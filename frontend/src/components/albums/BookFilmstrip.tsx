@@ -79,7 +79,7 @@ export default function BookFilmstrip({
                 {spread.media.slice(0, 3).map((item) => (
                   <img
                     key={item.id}
-                    src={item.view_url}
+                    src={item.thumb_url ?? item.view_url}
                     alt=""
                     className="h-full flex-1 object-cover min-w-0"
                   />
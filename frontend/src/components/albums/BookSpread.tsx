@@ -3,6 +3,7 @@
 import { useState, useRef } from "react";
 import { Spread, MediaItem } from "@/types";
 import { Modal } from "@/components/ui/Modal";
+import { VideoPlayer } from "@/components/media/VideoPlayer";
 
 interface BookSpreadProps {
   spread: Spread;
@@ -44,7 +45,7 @@ export default function BookSpread({ spread, isEditMode, onReorder }: BookSpread
       onClick={() => !isEditMode && setSelectedMedia(item)}
     >
       <img
-        src={item.view_url}
+        src={item.preview_url ?? item.view_url}
         alt=""
         className="w-full h-full object-cover"
         draggable={false}
@@ -97,15 +98,14 @@ export default function BookSpread({ spread, isEditMode, onReorder }: BookSpread
       <Modal isOpen={!!selectedMedia} onClose={() => setSelectedMedia(null)}>
         {selectedMedia && (
           selectedMedia.type === "video" ? (
-            <video
+            <VideoPlayer
               src={selectedMedia.view_url}
-              controls
-              autoPlay
-              className="w-full max-h-[80vh] rounded-lg"
+              hls={selectedMedia.hls_url}
+              poster={selectedMedia.preview_url}
             />
           ) : (
             <img
-              src={selectedMedia.view_url}
+              src={selectedMedia.preview_url ?? selectedMedia.view_url}
               alt={selectedMedia.filename || ""}
               className="w-full max-h-[80vh] object-contain rounded-lg"
             />
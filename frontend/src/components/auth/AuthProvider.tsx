@@ -3,6 +3,7 @@
 import { createContext, useEffect, useState, ReactNode } from "react";
 import { Session, User } from "@supabase/supabase-js";
 import { supabase } from "@/lib/supabase";
+import { apiFetch } from "@/lib/api";
 
 interface AuthContextType {
   user: User | null;
@@ -27,10 +28,14 @@ export function AuthProvider({ children }: { children: ReactNode }) {
 
     const {
       data: { subscription },
-    } = supabase.auth.onAuthStateChange((_event, session) => {
+    } = supabase.auth.onAuthStateChange((event, session) => {
       setSession(session);
       setUser(session?.user ?? null);
       setLoading(false);
+      if (event === "SIGNED_IN") {
+        // Accept any invites sent to this email; best-effort, off the render path
+        apiFetch("/invites/auto-accept", { method: "POST" }).catch(() => {});
+      }
     });
 
     return () => subscription.unsubscribe();
@@ -13,7 +13,7 @@ export function MediaCard({ item, onSelect, onDelete }: MediaCardProps) {
     <div className="group relative rounded-xl overflow-hidden bg-gray-100 aspect-square cursor-pointer">
       {item.type === "image" ? (
         <img
-          src={item.view_url}
+          src={item.preview_url ?? item.view_url}
           alt={item.filename || "Photo"}
           className="w-full h-full object-cover transition-transform duration-300 group-hover:scale-105"
           onClick={() => onSelect(item)}
@@ -99,10 +99,14 @@ export function MediaGrid({ items, onDelete }: MediaGridProps) {
 
         {/* Media content */}
         {selectedItem?.type === "video" ? (
-          <VideoPlayer src={selectedItem.view_url} />
+          <VideoPlayer
+            src={selectedItem.view_url}
+            hls={selectedItem.hls_url}
+            poster={selectedItem.preview_url}
+          />
         ) : selectedItem ? (
           <img
-            src={selectedItem.view_url}
+            src={selectedItem.preview_url ?? selectedItem.view_url}
             alt={selectedItem.filename || "Photo"}
             className="w-full max-h-[80vh] object-contain rounded-lg"
           />
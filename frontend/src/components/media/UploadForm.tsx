@@ -3,6 +3,8 @@
 import { useState, useRef } from "react";
 import { useRouter } from "next/navigation";
 import { apiFetch } from "@/lib/api";
+import { MULTIPART_THRESHOLD, multipartUpload } from "@/lib/multipartUpload";
+import { sha256Hex } from "@/lib/sha256";
 import { Button } from "@/components/ui/Button";
 
 interface UploadFormProps {
@@ -47,38 +49,51 @@ export function UploadForm({ albumId }: UploadFormProps) {
       for (const file of files) {
         const mediaType = file.type.startsWith("image/") ? "image" : "video";
 
-        // Step 1: Get presigned upload URL from backend
-        const presign = await apiFetch<{ upload_url: string; s3_key: string }>(
-          "/uploads/presign",
-          {
+        // Step 1+2: Upload the file directly to S3 — large files in
+        // parallel parts, everything else with one presigned PUT
+        let s3Key: string;
+        let sha256: string | undefined;
+        if (file.size >= MULTIPART_THRESHOLD) {
+          s3Key = await multipartUpload(file, mediaType);
+        } else {
+          // The hash lets the server reuse a copy already in the family
+          sha256 = await sha256Hex(file);
+          const presign = await apiFetch<{
+            upload_url: string | null;
+            s3_key: string;
+            headers?: Record<string, string>;
+          }>("/uploads/presign", {
             method: "POST",
             body: JSON.stringify({
               filename: file.name,
               content_type: file.type,
               type: mediaType,
+              sha256,
             }),
+          });
+          if (presign.upload_url) {
+            const s3Response = await fetch(presign.upload_url, {
+              method: "PUT",
+              body: file,
+              headers: presign.headers ?? { "Content-Type": file.type },
+            });
+            if (!s3Response.ok) {
+              throw new Error("Failed to upload file to storage");
+            }
           }
-        );
-
-        // Step 2: Upload file directly to S3
-        const s3Response = await fetch(presign.upload_url, {
-          method: "PUT",
-          body: file,
-          headers: { "Content-Type": file.type },
-        });
-        if (!s3Response.ok) {
-          throw new Error("Failed to upload file to storage");
+          s3Key = presign.s3_key;
         }
 
         // Step 3: Save metadata to backend
         const saved = await apiFetch<{ id: string }>("/media", {
           method: "POST",
           body: JSON.stringify({
-            s3_key: presign.s3_key,
+            s3_key: s3Key,
             type: mediaType,
             filename: file.name,
             size_bytes: file.size,
             content_type: file.type,
+            sha256,
           }),
         });
 
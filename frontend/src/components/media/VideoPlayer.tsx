@@ -1,13 +1,32 @@
 "use client";
 
+import { useEffect, useRef, useState } from "react";
+import { API_URL } from "@/lib/api";
+
 interface VideoPlayerProps {
   src: string;
+  // Signed master playlist path from the API, once the video is packaged
+  hls?: string | null;
+  poster?: string | null;
 }
 
-export function VideoPlayer({ src }: VideoPlayerProps) {
+export function VideoPlayer({ src, hls, poster }: VideoPlayerProps) {
+  const ref = useRef<HTMLVideoElement>(null);
+  // Chosen after mount, so the original is not fetched only to be swapped out
+  const [source, setSource] = useState<string>();
+
+  useEffect(() => {
+    // Adaptive streaming where the browser plays HLS natively (Safari, iOS,
+    // Android); everywhere else keep the original file
+    const canPlayHls = !!ref.current?.canPlayType("application/vnd.apple.mpegurl");
+    setSource(hls && canPlayHls ? `${API_URL}${hls}` : src);
+  }, [src, hls]);
+
   return (
     <video
-      src={src}
+      ref={ref}
+      src={source}
+      poster={poster ?? undefined}
       controls
       autoPlay
       className="w-full max-h-[80vh] rounded-lg bg-black"
@@ -15,7 +15,7 @@ export function useAlbumMedia(albumId: string) {
     setError(null);
     try {
       const [data, albumData] = await Promise.all([
-        apiFetch<MediaItem[]>(`/albums/${albumId}/media`),
+        apiFetch<MediaItem[]>(`/albums/${albumId}/media?paginate=false`),
         apiFetch<Album>(`/albums/${albumId}`),
       ]);
       setMedia(data);
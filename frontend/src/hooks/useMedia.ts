@@ -13,7 +13,7 @@ export function useMedia(filter: MediaFilter = "all") {
     setLoading(true);
     setError(null);
     try {
-      const params = filter !== "all" ? `?type=${filter}` : "";
+      const params = filter !== "all" ? `?paginate=false&type=${filter}` : "?paginate=false";
       const data = await apiFetch<MediaItem[]>(`/media${params}`);
       setMedia(data);
     } catch (err) {
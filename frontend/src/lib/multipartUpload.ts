@@ -0,0 +1,91 @@
+import { apiFetch } from "./api";
+
+// Files at least this large go through the multipart API instead of one PUT
+export const MULTIPART_THRESHOLD = 100 * 1024 * 1024;
+
+const CONCURRENCY = 4;
+const PRESIGN_BATCH = 100;
+const MAX_PART_RETRIES = 3;
+
+interface MultipartUpload {
+  upload_id: string;
+  s3_key: string;
+  part_size: number;
+}
+
+/**
+ * Upload a file in parallel parts and return its s3_key.
+ *
+ * Each part is retried on its own; if one still fails the upload is
+ * aborted so no orphaned parts are left behind.
+ */
+export async function multipartUpload(
+  file: File,
+  mediaType: "image" | "video",
+  onProgress?: (uploadedBytes: number) => void
+): Promise<string> {
+  const upload = await apiFetch<MultipartUpload>("/uploads/multipart", {
+    method: "POST",
+    body: JSON.stringify({
+      filename: file.name,
+      content_type: file.type,
+      type: mediaType,
+      size_bytes: file.size,
+    }),
+  });
+  const base = `/uploads/multipart/${encodeURIComponent(upload.upload_id)}`;
+  const keyQuery = `s3_key=${encodeURIComponent(upload.s3_key)}`;
+
+  try {
+    const partCount = Math.max(1, Math.ceil(file.size / upload.part_size));
+    const pending = Array.from({ length: partCount }, (_, i) => i + 1);
+    let uploaded = 0;
+
+    for (let i = 0; i < pending.length; i += PRESIGN_BATCH) {
+      const batch = await apiFetch<{ part_number: number; url: string }[]>(
+        `${base}/parts`,
+        {
+          method: "POST",
+          body: JSON.stringify({
+            s3_key: upload.s3_key,
+            part_numbers: pending.slice(i, i + PRESIGN_BATCH),
+          }),
+        }
+      );
+      const queue = [...batch];
+      const worker = async () => {
+        for (let part = queue.shift(); part; part = queue.shift()) {
+          const start = (part.part_number - 1) * upload.part_size;
+          const blob = file.slice(start, start + upload.part_size);
+          await putPart(part.url, blob);
+          uploaded += blob.size;
+          onProgress?.(uploaded);
+        }
+      };
+      await Promise.all(Array.from({ length: CONCURRENCY }, worker));
+    }
+
+    // No part list: the server completes with every part S3 received
+    await apiFetch(`${base}/complete`, {
+      method: "POST",
+      body: JSON.stringify({ s3_key: upload.s3_key }),
+    });
+    return upload.s3_key;
+  } catch (err) {
+    await apiFetch(`${base}?${keyQuery}`, { method: "DELETE" }).catch(() => {});
+    throw err;
+  }
+}
+
+async function putPart(url: string, blob: Blob): Promise<void> {
+  for (let attempt = 1; ; attempt++) {
+    try {
+      const res = await fetch(url, { method: "PUT", body: blob });
+      if (res.ok) return;
+      if (attempt >= MAX_PART_RETRIES) throw new Error("Failed to upload file to storage");
+    } catch (err) {
+      if (attempt >= MAX_PART_RETRIES) throw err;
+    }
+    await new Promise((r) => setTimeout(r, 500 * 2 ** attempt * Math.random()));
+  }
+}
@@ -0,0 +1,10 @@
+/**
+ * Hex SHA-256 of a file, or undefined where Web Crypto is unavailable
+ * (insecure origins). Reads the whole file, so only use it below
+ * MULTIPART_THRESHOLD.
+ */
+export async function sha256Hex(file: Blob): Promise<string | undefined> {
+  if (!globalThis.crypto?.subtle) return undefined;
+  const digest = await crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, "0")).join("");
+}
@@ -3,6 +3,9 @@ export interface MediaItem {
   user_id: string;
   s3_key: string;
   view_url: string;
+  thumb_url?: string | null;
+  preview_url?: string | null;
+  hls_url?: string | null; // relative to API_URL
   type: "image" | "video";
   filename: string | null;
   size_bytes: number | null;
@@ -28,7 +31,11 @@ export interface Album {
   name: string;
   description: string | null;
   cover_url: string | null;
+  cover_thumb_url?: string | null;
+  cover_preview_url?: string | null;
   media_count: number;
+  total_bytes?: number;
+  last_added_at?: string | null;
   visibility: "private" | "public";
   my_role?: "owner" | "viewer" | "contributor";
   created_at: string;
@@ -0,0 +1,16 @@
+-- ── 006: Per-album media statistics ─────────────────────────────────
+-- Aggregates album_media once per album so the API can resolve counts
+-- and fallback covers for a whole album list with a single
+-- `album_id=in.(...)` read instead of fetching every link row.
+
+CREATE INDEX IF NOT EXISTS album_media_album_added_idx
+  ON public.album_media (album_id, added_at);
+
+CREATE OR REPLACE VIEW public.album_media_stats
+  WITH (security_invoker = true) AS
+SELECT
+  album_id,
+  count(*)::INT                                   AS media_count,
+  (array_agg(media_id ORDER BY added_at ASC))[1]  AS first_media_id
+FROM public.album_media
+GROUP BY album_id;
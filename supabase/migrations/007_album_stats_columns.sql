@@ -0,0 +1,145 @@
+-- ── 007: Denormalized album statistics ──────────────────────────────
+-- albums carries its own media_count, effective cover, last_added_at and
+-- total_bytes, kept in sync by triggers, so listings read them straight
+-- off the row and can sort by them through an index. They replace the
+-- album_media_stats view from 006, which nothing reads any more.
+
+ALTER TABLE public.albums
+  ADD COLUMN media_count              INT         NOT NULL DEFAULT 0,
+  ADD COLUMN cover_media_id_effective UUID        REFERENCES public.media(id) ON DELETE SET NULL,
+  ADD COLUMN last_added_at            TIMESTAMPTZ,
+  ADD COLUMN total_bytes              BIGINT      NOT NULL DEFAULT 0;
+
+DROP VIEW IF EXISTS public.album_media_stats;
+
+CREATE INDEX IF NOT EXISTS albums_user_media_count_idx
+  ON public.albums (user_id, media_count DESC, created_at DESC);
+CREATE INDEX IF NOT EXISTS albums_user_last_added_idx
+  ON public.albums (user_id, last_added_at DESC NULLS LAST, created_at DESC);
+CREATE INDEX IF NOT EXISTS albums_user_total_bytes_idx
+  ON public.albums (user_id, total_bytes DESC, created_at DESC);
+CREATE INDEX IF NOT EXISTS album_media_media_idx
+  ON public.album_media (media_id);
+
+-- ── Recompute ───────────────────────────────────────────────────────
+-- Recomputes the stats of the given albums from album_media + media.
+-- SECURITY DEFINER so that contributors, whose RLS does not allow
+-- updating albums, still keep the owner's counters right.
+
+CREATE OR REPLACE FUNCTION public.refresh_album_stats(album_ids UUID[])
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  UPDATE public.albums a
+  SET media_count              = COALESCE(s.media_count, 0),
+      total_bytes              = COALESCE(s.total_bytes, 0),
+      last_added_at            = s.last_added_at,
+      cover_media_id_effective = COALESCE(a.cover_media_id, s.first_media_id)
+  FROM unnest(album_ids) AS ids(id)
+  LEFT JOIN LATERAL (
+    SELECT count(*)::INT                                    AS media_count,
+           COALESCE(sum(m.size_bytes), 0)::BIGINT           AS total_bytes,
+           max(am.added_at)                                 AS last_added_at,
+           (array_agg(am.media_id ORDER BY am.added_at))[1] AS first_media_id
+    FROM public.album_media am
+    JOIN public.media m ON m.id = am.media_id
+    WHERE am.album_id = ids.id
+  ) s ON TRUE
+  WHERE a.id = ids.id;
+$$;
+
+-- Internal: only the triggers below (and the service role, for the
+-- backfill script) call it. Without this PostgREST would expose it to
+-- every client as /rpc/refresh_album_stats.
+REVOKE EXECUTE ON FUNCTION public.refresh_album_stats(UUID[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.refresh_album_stats(UUID[]) TO service_role;
+
+-- ── album_media: statement-level, so a bulk insert refreshes each album once
+
+CREATE OR REPLACE FUNCTION public.album_media_stats_after_insert()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  PERFORM public.refresh_album_stats(ARRAY(SELECT DISTINCT album_id FROM new_rows));
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.album_media_stats_after_delete()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  PERFORM public.refresh_album_stats(ARRAY(SELECT DISTINCT album_id FROM old_rows));
+  RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER album_media_stats_insert
+  AFTER INSERT ON public.album_media
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION public.album_media_stats_after_insert();
+
+CREATE TRIGGER album_media_stats_delete
+  AFTER DELETE ON public.album_media
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION public.album_media_stats_after_delete();
+
+-- ── media: size changes move total_bytes. Deleting media cascades to
+-- album_media, whose delete trigger above takes care of the rest.
+
+CREATE OR REPLACE FUNCTION public.media_stats_after_update()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  PERFORM public.refresh_album_stats(ARRAY(
+    SELECT DISTINCT am.album_id
+    FROM new_rows n
+    JOIN old_rows o ON o.id = n.id
+    JOIN public.album_media am ON am.media_id = n.id
+    WHERE n.size_bytes IS DISTINCT FROM o.size_bytes
+  ));
+  RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER media_stats_update
+  AFTER UPDATE ON public.media
+  REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION public.media_stats_after_update();
+
+-- ── albums: an explicit cover wins over the first-added fallback
+
+CREATE OR REPLACE FUNCTION public.albums_effective_cover()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+BEGIN
+  NEW.cover_media_id_effective := COALESCE(
+    NEW.cover_media_id,
+    (SELECT am.media_id FROM public.album_media am
+     WHERE am.album_id = NEW.id
+     ORDER BY am.added_at ASC
+     LIMIT 1)
+  );
+  RETURN NEW;
+END;
+$$;
+
+CREATE TRIGGER albums_effective_cover
+  BEFORE UPDATE OF cover_media_id ON public.albums
+  FOR EACH ROW EXECUTE FUNCTION public.albums_effective_cover();
+
+-- Existing rows are filled in by backend/scripts/backfill_album_stats.py,
+-- which calls refresh_album_stats in batches.
@@ -0,0 +1,110 @@
+-- ── 008: Trash ──────────────────────────────────────────────────────
+-- Deleting media or an album only stamps deleted_at; the API stops
+-- returning the row at once and backend/scripts/purge_trash.py later
+-- removes the S3 objects and hard-deletes the rows once the retention
+-- window has passed. Until then the delete can be undone.
+
+ALTER TABLE public.media  ADD COLUMN deleted_at TIMESTAMPTZ;
+ALTER TABLE public.albums ADD COLUMN deleted_at TIMESTAMPTZ;
+
+-- Live listings: partial indexes only cover rows that are not trashed
+CREATE INDEX IF NOT EXISTS media_user_live_created_idx
+  ON public.media (user_id, created_at DESC, id DESC)
+  WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS albums_user_live_created_idx
+  ON public.albums (user_id, created_at DESC)
+  WHERE deleted_at IS NULL;
+
+DROP INDEX IF EXISTS public.albums_user_media_count_idx;
+DROP INDEX IF EXISTS public.albums_user_last_added_idx;
+DROP INDEX IF EXISTS public.albums_user_total_bytes_idx;
+CREATE INDEX IF NOT EXISTS albums_user_media_count_idx
+  ON public.albums (user_id, media_count DESC, created_at DESC)
+  WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS albums_user_last_added_idx
+  ON public.albums (user_id, last_added_at DESC NULLS LAST, created_at DESC)
+  WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS albums_user_total_bytes_idx
+  ON public.albums (user_id, total_bytes DESC, created_at DESC)
+  WHERE deleted_at IS NULL;
+
+-- Purge worker: oldest trash first
+CREATE INDEX IF NOT EXISTS media_trash_idx
+  ON public.media (deleted_at)
+  WHERE deleted_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS albums_trash_idx
+  ON public.albums (deleted_at)
+  WHERE deleted_at IS NOT NULL;
+
+-- ── Album stats ignore trashed media ────────────────────────────────
+
+CREATE OR REPLACE FUNCTION public.refresh_album_stats(album_ids UUID[])
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  UPDATE public.albums a
+  SET media_count              = COALESCE(s.media_count, 0),
+      total_bytes              = COALESCE(s.total_bytes, 0),
+      last_added_at            = s.last_added_at,
+      cover_media_id_effective = COALESCE(
+        (SELECT m.id FROM public.media m WHERE m.id = a.cover_media_id AND m.deleted_at IS NULL),
+        s.first_media_id
+      )
+  FROM unnest(album_ids) AS ids(id)
+  LEFT JOIN LATERAL (
+    SELECT count(*)::INT                                    AS media_count,
+           COALESCE(sum(m.size_bytes), 0)::BIGINT           AS total_bytes,
+           max(am.added_at)                                 AS last_added_at,
+           (array_agg(am.media_id ORDER BY am.added_at))[1] AS first_media_id
+    FROM public.album_media am
+    JOIN public.media m ON m.id = am.media_id
+    WHERE am.album_id = ids.id
+      AND m.deleted_at IS NULL
+  ) s ON TRUE
+  WHERE a.id = ids.id;
+$$;
+
+-- CREATE OR REPLACE keeps 007's privileges; repeated so the revoke holds
+-- however this function was first created
+REVOKE EXECUTE ON FUNCTION public.refresh_album_stats(UUID[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.refresh_album_stats(UUID[]) TO service_role;
+
+-- Trashing or restoring media moves the stats just like a size change
+CREATE OR REPLACE FUNCTION public.media_stats_after_update()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  PERFORM public.refresh_album_stats(ARRAY(
+    SELECT DISTINCT am.album_id
+    FROM new_rows n
+    JOIN old_rows o ON o.id = n.id
+    JOIN public.album_media am ON am.media_id = n.id
+    WHERE n.size_bytes IS DISTINCT FROM o.size_bytes
+       OR n.deleted_at IS DISTINCT FROM o.deleted_at
+  ));
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.albums_effective_cover()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+BEGIN
+  NEW.cover_media_id_effective := COALESCE(
+    (SELECT m.id FROM public.media m WHERE m.id = NEW.cover_media_id AND m.deleted_at IS NULL),
+    (SELECT am.media_id FROM public.album_media am
+     JOIN public.media m ON m.id = am.media_id
+     WHERE am.album_id = NEW.id AND m.deleted_at IS NULL
+     ORDER BY am.added_at ASC
+     LIMIT 1)
+  );
+  RETURN NEW;
+END;
+$$;
@@ -0,0 +1,26 @@
+-- ── 009: Image derivatives ──────────────────────────────────────────
+-- WebP thumbnails and previews rendered after upload (see
+-- app/services/derivative_service.py). Until derivatives_status is
+-- 'ready' the API falls back to the original for thumb_url/preview_url.
+-- Whoever renders an image first claims it by switching it to
+-- 'processing', so the POST /media background task and the worker never
+-- render the same one; scripts/process_derivatives.py requeues claims
+-- older than DERIVATIVES_CLAIM_SECONDS.
+
+ALTER TABLE public.media
+  ADD COLUMN thumb_key          TEXT,
+  ADD COLUMN preview_key        TEXT,
+  ADD COLUMN derivatives_status TEXT
+    CHECK (derivatives_status IN ('pending', 'processing', 'ready', 'failed')),
+  ADD COLUMN derivatives_claimed_at TIMESTAMPTZ;
+
+-- Existing images are queued for scripts/process_derivatives.py
+UPDATE public.media SET derivatives_status = 'pending' WHERE type = 'image';
+
+CREATE INDEX IF NOT EXISTS media_derivatives_pending_idx
+  ON public.media (created_at)
+  WHERE derivatives_status = 'pending';
+
+CREATE INDEX IF NOT EXISTS media_derivatives_processing_idx
+  ON public.media (derivatives_claimed_at)
+  WHERE derivatives_status = 'processing';
@@ -0,0 +1,19 @@
+-- ── 010: HLS packaging for videos ───────────────────────────────────
+-- scripts/process_videos.py transcodes pending videos into an HLS ladder
+-- under hls_prefix and renders a poster frame into thumb_key/preview_key
+-- (see 009). The API serves the playlists itself, signing segment URLs on
+-- the fly, so only the rendition list is kept here.
+
+ALTER TABLE public.media
+  ADD COLUMN video_status   TEXT
+    CHECK (video_status IN ('pending', 'ready', 'failed')),
+  ADD COLUMN hls_prefix     TEXT,
+  -- [{"name": "720p", "bandwidth": 3000000, "resolution": "1280x720"}, ...]
+  ADD COLUMN hls_renditions JSONB;
+
+-- Existing videos are queued for the worker
+UPDATE public.media SET video_status = 'pending' WHERE type = 'video';
+
+CREATE INDEX IF NOT EXISTS media_video_pending_idx
+  ON public.media (created_at)
+  WHERE video_status = 'pending';
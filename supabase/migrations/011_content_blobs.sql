@@ -0,0 +1,97 @@
+-- ── 011: Content-addressed, reference-counted uploads ───────────────
+-- Uploads that come with a SHA-256 are stored once per uploader at
+-- family-album/{user_id}/sha256/{hex}. A family member uploading the same
+-- file is pointed at that object instead of storing another copy, and
+-- every media row referencing it counts towards blobs.ref_count.
+--
+-- The count only drops when a media row is hard-deleted (trash purge), so
+-- trashed media stays restorable. backend/scripts/purge_trash.py deletes
+-- the object once ref_count has been 0 for a grace period, which covers
+-- uploads presigned just before the last reference went away.
+--
+-- The worker claims a released blob (purging_at) before deleting its
+-- object and deletes the row only if the claim survived. A new reference
+-- clears the claim; the API refuses to reference a claimed blob, and the
+-- worker skips any blob whose claim is gone by the time it deletes.
+
+ALTER TABLE public.media ADD COLUMN sha256 TEXT;
+
+CREATE TABLE IF NOT EXISTS public.blobs (
+  s3_key      TEXT        PRIMARY KEY,
+  sha256      TEXT        NOT NULL,
+  owner_id    UUID        NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+  size_bytes  BIGINT,
+  ref_count   INT         NOT NULL DEFAULT 0 CHECK (ref_count >= 0),
+  released_at TIMESTAMPTZ, -- when ref_count last dropped to 0
+  purging_at  TIMESTAMPTZ, -- set while the purge worker deletes the object
+  created_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Only the API (service role) reads or writes blobs
+ALTER TABLE public.blobs ENABLE ROW LEVEL SECURITY;
+
+-- Presign lookup: is this hash already stored by someone in the caller's family?
+CREATE INDEX IF NOT EXISTS blobs_sha256_owner_idx
+  ON public.blobs (sha256, owner_id)
+  WHERE ref_count > 0;
+-- Purge worker: released blobs, oldest first
+CREATE INDEX IF NOT EXISTS blobs_released_idx
+  ON public.blobs (released_at)
+  WHERE ref_count = 0;
+
+-- ── Reference counting: statement-level, so a purge batch updates each blob once
+
+CREATE OR REPLACE FUNCTION public.media_blobs_after_insert()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO public.blobs (s3_key, sha256, owner_id, size_bytes, ref_count)
+  SELECT s3_key,
+         min(sha256),
+         split_part(s3_key, '/', 2)::UUID,
+         max(size_bytes),
+         count(*)
+  FROM new_rows
+  WHERE sha256 IS NOT NULL
+  GROUP BY s3_key
+  ON CONFLICT (s3_key) DO UPDATE
+    SET ref_count   = public.blobs.ref_count + EXCLUDED.ref_count,
+        released_at = NULL,
+        purging_at  = NULL;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.media_blobs_after_delete()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  UPDATE public.blobs b
+  SET ref_count   = b.ref_count - d.refs,
+      released_at = CASE WHEN b.ref_count - d.refs = 0 THEN now() ELSE b.released_at END
+  FROM (
+    SELECT s3_key, count(*)::INT AS refs
+    FROM old_rows
+    WHERE sha256 IS NOT NULL
+    GROUP BY s3_key
+  ) d
+  WHERE b.s3_key = d.s3_key;
+  RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER media_blobs_insert
+  AFTER INSERT ON public.media
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION public.media_blobs_after_insert();
+
+CREATE TRIGGER media_blobs_delete
+  AFTER DELETE ON public.media
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION public.media_blobs_after_delete();
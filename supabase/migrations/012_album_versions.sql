@@ -0,0 +1,59 @@
+-- ── 012: Album content versions ─────────────────────────────────────
+-- albums.content_version changes whenever anything an album response is
+-- rendered from changes: the album row itself (which includes the stats
+-- that 007/008 refresh on every album_media insert or delete and on
+-- trashing media), or a field of one of its media that the API returns.
+-- The API derives ETags from it, so a conditional GET costs one row read.
+--
+-- updated_at was never maintained; it now moves with the version.
+
+ALTER TABLE public.albums ADD COLUMN content_version BIGINT NOT NULL DEFAULT 1;
+
+-- Named to sort after albums_effective_cover, so it sees the final row
+CREATE OR REPLACE FUNCTION public.albums_bump_version()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+BEGIN
+  IF NEW IS DISTINCT FROM OLD THEN
+    NEW.content_version := OLD.content_version + 1;
+    NEW.updated_at      := now();
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+CREATE TRIGGER albums_version_bump
+  BEFORE UPDATE ON public.albums
+  FOR EACH ROW EXECUTE FUNCTION public.albums_bump_version();
+
+-- Media fields that show up in album listings; trashing and size changes
+-- already reach the album through refresh_album_stats
+CREATE OR REPLACE FUNCTION public.media_touch_albums()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  UPDATE public.albums a
+  SET content_version = a.content_version + 1
+  WHERE a.id IN (
+    SELECT am.album_id
+    FROM new_rows n
+    JOIN old_rows o ON o.id = n.id
+    JOIN public.album_media am ON am.media_id = n.id
+    WHERE n.filename     IS DISTINCT FROM o.filename
+       OR n.thumb_key    IS DISTINCT FROM o.thumb_key
+       OR n.preview_key  IS DISTINCT FROM o.preview_key
+       OR n.video_status IS DISTINCT FROM o.video_status
+  );
+  RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER media_touch_albums
+  AFTER UPDATE ON public.media
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION public.media_touch_albums();
@@ -0,0 +1,15 @@
+-- ── 013: Video processing claims ────────────────────────────────────
+-- A worker claims a pending video by switching it to 'processing' with a
+-- conditional update, so two workers never transcode the same one. The
+-- claim time lets scripts/process_videos.py requeue claims left behind
+-- by a worker that died mid-transcode (VIDEO_CLAIM_SECONDS).
+
+ALTER TABLE public.media
+  DROP CONSTRAINT IF EXISTS media_video_status_check,
+  ADD CONSTRAINT media_video_status_check
+    CHECK (video_status IN ('pending', 'processing', 'ready', 'failed')),
+  ADD COLUMN video_claimed_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS media_video_processing_idx
+  ON public.media (video_claimed_at)
+  WHERE video_status = 'processing';